@@ -3,58 +3,54 @@ import streamlit as st
 from dataclasses import dataclass, asdict, field
 import pandas as pd
 import os
-import re
 from typing import List, Optional, Dict
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 import logging
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
-import requests
-from utils import get_proxies
-from itertools import cycle
+from utils import get_proxy_health, USER_AGENTS
 import undetected_chromedriver as uc
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
 from urllib.parse import urljoin
 import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Queue, Empty
+from queue import Queue, Empty, Full
 from threading import Thread
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import random
 import multiprocessing
+import enrichment
+from enrichment_cache import get_cache
+from dedup import DedupIndex
+from driver_pool import get_shared_pool
+from entity_resolution import EntityResolver
+from maps_capture import NetworkCapture, enable_performance_logging
+from maps_dom import extract_cards, place_key, wait_for_new_cards
+from job_journal import DETAILED, DONE, QUEUED, open_journal
+from query_planner import (
+    MAX_SEARCH_ATTEMPTS, RESULTS_PER_QUERY, PostalPlanner, canadian_provinces, plan_queries, plan_shortfall,
+)
+from viewport_search import ViewportPlanner, region_bounds
+from proxy_pool import ProxyPool, is_ban, proxy_url
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-proxy_pool = cycle(get_proxies())
-
-# Replace the fake-useragent import with a simple list of user agents
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.190 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.141 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.3 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/86.0.4240.198 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.2 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.1 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/84.0.4147.135 Safari/537.36',
-]
+# Where the browsers find Google Maps; point at standin_server.py for offline runs
+MAPS_BASE_URL = os.environ.get('MAPS_BASE_URL', 'https://www.google.com/maps').rstrip('/')
+
+USE_PROXIES = False  # Route browsers (and, with ENRICH_THROUGH_PROXIES, enrichment) through proxy_pool
+ENRICH_THROUGH_PROXIES = False  # Business websites rarely block, so crawl them directly
+
+# Scored proxy rotation shared by the browsers and enrichment; utils.get_proxy_health
+# re-probes stale entries first, and the ones that failed start benched
+proxy_pool = ProxyPool.from_health(get_proxy_health()) if USE_PROXIES else ProxyPool([])
+if USE_PROXIES and not proxy_pool.available():
+    logging.warning("USE_PROXIES is set but no proxy passed its probe; browsers will run without one")
 
 # Update the Business class to use proper dataclass syntax
 @dataclass
@@ -70,6 +66,7 @@ class Business:
     social_media: Dict[str, str] = field(default_factory=dict)
     business_hours: Optional[str] = None
     categories: List[str] = field(default_factory=list)
+    place_url: Optional[str] = None
 
 class BusinessList:
     def __init__(self):
@@ -104,15 +101,52 @@ class BusinessList:
 
 # Add these constants at the top of the file
 MAX_WORKERS = multiprocessing.cpu_count() * 2  # Number of worker threads
-MAX_SEARCH_WORKERS = 1  # Single search thread to avoid duplicates
-MAX_PROCESS_WORKERS = 3  # Three processing threads is optimal
+MAX_SEARCH_WORKERS = 2  # Search threads working through the job's sub-queries; seen places are shared
+MAX_PROCESS_WORKERS = 3  # Detail threads, each on its own browser separate from the search one
+MAX_ENRICH_WORKERS = 1  # Enrichment threads, each running its own event loop
+MAX_ENRICH_IN_FLIGHT = 50  # Websites crawled concurrently per enrichment thread
 QUEUE_TIMEOUT = 2  # Longer timeout to prevent issues
+MAX_EMPTY_SCROLLS = 3  # Scrolls in a row that load nothing (each waits up to FEED_WAIT_TIMEOUT) before search stops
+DRIVER_RELEASE_TIMEOUT = 15  # Seconds to wait for a thread before its driver is discarded
+DRIVER_MAX_RSS_MB = 1500  # Browser process tree size at which a detail driver is recycled
+DRIVER_MAX_PLACES = 250  # Places a detail driver opens before it is recycled
+MAX_WORK_ATTEMPTS = 3  # Times a place is handed out before a crashing browser gives up on it
+JOB_TIMEOUT = 300  # Seconds a run may take; it returns what it has, and rerunning the search resumes it
+EXECUTION_MODE = 'threads'  # 'processes' runs browser and enrichment workers in their own processes (orchestrator.py)
+QUERY_PLAN = 'postal'  # 'viewport' covers the region with map tiles, split only where results saturate
+FUZZY_DEDUP = True  # Also drop businesses entity_resolution matches to one already found
+CAPTURE_MODE = 'dom'  # 'network' decodes results from Maps XHR payloads instead of clicking each place
+# Headless, and skip downloading images, fonts, media and map tiles. Opt-in until
+# benchmarks/bench_lean_browser.py has been run and its results are committed
+LEAN_BROWSER = False
+LEAN_WINDOW_SIZE = '1366,900'  # Headless windows need an explicit size for the feed to lay out
+
+# Requests a lean browser never makes; we only read text from the sidebar and place panel
+BLOCKED_URL_PATTERNS = [
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*.mp4*', '*.webm*', '*.mp3*',
+    '*/maps/vt*',  # Map tiles
+    '*/kh/v=*', '*khms*.google.com*',  # Satellite tiles
+    '*streetviewpixels*', '*googleusercontent.com/p/*', '*googleusercontent.com/gps-cs*',  # Place photos
+    '*fonts.gstatic.com*',
+]
 
 class BusinessQueue:
     def __init__(self, total_results):
+        self.sub_queries = Queue()  # query_planner.SubQuery items for the search threads
+        self.search_reports = Queue()  # (sub_query, results listed or None if it failed) for the planner
+        self.is_planning = True  # False once the planner has nothing left to hand out
+        # Places claimed by the searches and businesses in the results
+        self.dedup = DedupIndex(resolver=EntityResolver() if FUZZY_DEDUP else None)
+        self.active_searches = 0
+        self.journal = None  # job_journal.JobJournal recording the run's progress
         self.to_process = Queue(maxsize=total_results * 2)  # Double buffer
+        self.to_enrich = Queue(maxsize=total_results * 2)
         self.processed = Queue(maxsize=total_results * 2)
         self.is_searching = True
+        self.is_processing = True
+        self.stopped = threading.Event()  # Set when the job ends, even mid-queue
         self.total_results = total_results
         self.processed_count = 0
         self.search_lock = threading.Lock()
@@ -137,350 +171,440 @@ def find_sidebar(driver):
 
 def find_new_entries(driver, processed_names):
     """Find new business entries that haven't been processed yet."""
-    entries = []
-    entry_selectors = [
-        'div[role="article"]',
-        'div.Nv2PK',
-        'a[href^="/maps/place"]'
-    ]
+    new_entries_data = []
+    try:
+        cards = extract_cards(driver)
+    except Exception as e:
+        logging.error("Error reading result cards: %s", str(e))
+        return new_entries_data
     
-    for selector in entry_selectors:
+    for card in cards:
+        if card['href'] and place_key(card['href']) not in processed_names:
+            new_entries_data.append({
+                **card,
+                'index': len(processed_names)
+            })
+    
+    return new_entries_data
+
+def put_until_stopped(queue: BusinessQueue, stage: Queue, item) -> bool:
+    """Put ``item`` on a bounded stage queue, giving up once the job has stopped"""
+    # A plain put blocks a thread on a full queue past the end of the job
+    while not queue.stopped.is_set():
         try:
-            new_entries = WebDriverWait(driver, 5).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector))
-            )
-            entries.extend(new_entries)
-        except:
+            stage.put(item, timeout=QUEUE_TIMEOUT)
+            return True
+        except Full:
             continue
-    
-    new_entries_data = []
-    for entry in entries:
+    return False
+
+def queue_business(queue: BusinessQueue, business: Business, key=None):
+    """Hand a finished Maps record to the next stage"""
+    if queue.journal and key:
+        queue.journal.place_detailed(key, business)
+    # Businesses with a website go through the enrichment stage
+    if not put_until_stopped(queue, queue.to_enrich if business.url else queue.processed, business):
+        return
+    with queue.process_lock:
+        queue.processed_count += 1
+
+def record_to_business(record) -> Business:
+    """Build a Business from a record decoded by maps_capture"""
+    return Business(
+        name=record['name'],
+        address=record['address'],
+        url=record['url'],
+        phone_number=record['phone_number'],
+        reviews_count=record['reviews_count'],
+        reviews_average=record['reviews_average'],
+        categories=record['categories'],
+        place_url=record['place_url']
+    )
+
+def claim_place(queue: BusinessQueue, key) -> bool:
+    """Mark a place as taken; False if another search (or sub-query) already queued it"""
+    return queue.dedup.claim(key)
+
+def capture_new_businesses(capture: NetworkCapture, queue: BusinessQueue) -> int:
+    """Queue every business found in payloads since the last poll; returns how many were new"""
+    added = 0
+    for record in capture.poll():
+        if not record['name'] or not claim_place(queue, record['place_id']):
+            continue
+        queue_business(queue, record_to_business(record), record['place_id'])
+        added += 1
+        logging.info("Captured from network: %s", record['name'])
+    return added
+
+def queue_new_cards(queue: BusinessQueue, cards) -> int:
+    """Queue cards not seen before as work units; returns how many were new"""
+    added = 0
+    for card in cards:
+        # The place URL is the work unit: any detail driver can open it,
+        # and chains sharing a name stay separate
+        if not card['href'] or not claim_place(queue, place_key(card['href'])):
+            continue
+        work = {
+            **card,
+            'index': len(queue.dedup)
+        }
+        if queue.journal:
+            queue.journal.place_queued(place_key(card['href']), work)
+        put_until_stopped(queue, queue.to_process, work)
+        added += 1
+        logging.info("Added to queue: %s", card['name'])
+    return added
+
+def make_planner(search_query: str, location: str, total_results: int):
+    """Sub-query plan for a job, following QUERY_PLAN; a postal plan too small for the job gives way to map tiles"""
+    bounds = region_bounds(location)
+    sub_queries = plan_queries(search_query, location, total_results)
+    shortfall = plan_shortfall(sub_queries, total_results)
+    use_tiles = bool(bounds) and total_results > RESULTS_PER_QUERY and (QUERY_PLAN == 'viewport' or shortfall > 0)
+    if shortfall and QUERY_PLAN != 'viewport':
+        # The bundled lists only hold a few codes for some states
+        logging.warning(f"{len(sub_queries)} sub-queries for '{location}' are expected to list about "
+                        f"{total_results - shortfall} of the {total_results} results asked for"
+                        f"{'; searching map tiles instead' if use_tiles else ''}")
+    if use_tiles:
+        # Postal searches pick up what tiles still saturated at the deepest split leave out
+        return ViewportPlanner(search_query, bounds, MAPS_BASE_URL, fallback=sub_queries)
+    return PostalPlanner(sub_queries)
+
+def search_worker_count(planner) -> int:
+    if planner.finished:
+        # A resumed job that has searched everything
+        return 0
+    # A viewport plan starts with one tile but fans out as soon as it splits
+    if isinstance(planner, PostalPlanner):
+        return min(MAX_SEARCH_WORKERS, len(planner.sub_queries))
+    return MAX_SEARCH_WORKERS
+
+def plan_searches(queue: BusinessQueue, planner):
+    """Feed finished searches back to the planner and queue the follow-up sub-queries"""
+    while True:
         try:
-            name = None
-            for selector in [
-                'span.fontHeadlineSmall',
-                'div.qBF1Pd',
-                'div[role="heading"]',
-                'div.fontHeadlineSmall'
-            ]:
-                try:
-                    name_element = entry.find_element(By.CSS_SELECTOR, selector)
-                    name = name_element.text.strip()
-                    if name:
-                        break
-                except:
-                    continue
-            
-            if name and name not in processed_names:
-                new_entries_data.append({
-                    'name': name,
-                    'index': len(processed_names)
-                })
-        except Exception as e:
-            logging.error("Error processing entry: %s", str(e))  # Fixed logging syntax
+            sub_query, listed = queue.search_reports.get_nowait()
+        except Empty:
+            break
+        if listed is None:
+            retries = planner.failed(sub_query)
+            if not retries:
+                # Never recorded as searched, so the next run of the job tries it again
+                logging.error(f"Giving up on '{sub_query.text}' after {MAX_SEARCH_ATTEMPTS} failed searches")
+            for retry in retries:
+                queue.sub_queries.put(retry)
             continue
-    
-    return new_entries_data
+        follow_ups = planner.report(sub_query, listed)
+        if queue.journal:
+            queue.journal.search_done(sub_query, listed, follow_ups)
+        for follow_up in follow_ups:
+            queue.sub_queries.put(follow_up)
+    if planner.finished:
+        queue.is_planning = False
+
+def start_job(queue: BusinessQueue, planner, journal) -> List[Business]:
+    """Queue a fresh plan, or what is left of one an earlier run journaled.
+
+    Returns the businesses that run already finished. Places it found are
+    marked seen so no search queues them again; resume_work hands the
+    unfinished ones back once the workers are running.
+    """
+    queue.journal = journal
+    if not journal.planned:
+        sub_queries = planner.initial()
+        journal.plan(sub_queries)
+        finished = []
+    else:
+        sub_queries = planner.resume(journal.pending_sub_queries(), journal.sub_queries())
+        for key in journal.place_keys():
+            queue.dedup.claim(key)
+        finished = [business for business in (Business(**fields) for fields in journal.places(DONE))
+                    if queue.dedup.add(business)]
+        logging.info("Resuming job %s: %d businesses done, %d sub-queries left",
+                     journal.job, len(finished), len(sub_queries))
+    for sub_query in sub_queries:
+        queue.sub_queries.put(sub_query)
+    queue.processed_count = len(finished)
+    return finished
+
+def finish_job(journal, planner, business_list, total_results, timed_out):
+    """Mark a job finished once it is full, or once every sub-query was searched and the work drained"""
+    if len(business_list.business_list) >= total_results or \
+            not timed_out and planner.finished and not journal.pending_sub_queries():
+        journal.finish()
+
+def search_finished(queue: BusinessQueue):
+    """Count one search out; the stage is done when the last one is"""
+    with queue.search_lock:
+        queue.active_searches -= 1
+        if queue.active_searches <= 0:
+            queue.is_searching = False
+
+def resume_work(queue: BusinessQueue, journal):
+    """Hand places an earlier run left unfinished back to their stage.
+
+    Counts as one of ``queue.active_searches`` until it returns, so detail
+    workers of a job with nothing left to search wait for its places.
+    """
+    try:
+        for fields in journal.places(DETAILED):
+            queue_business(queue, Business(**fields))
+        for work in journal.places(QUEUED):
+            put_until_stopped(queue, queue.to_process, work)
+    finally:
+        search_finished(queue)
+
+def drain_processed(queue: BusinessQueue, journal, business_list, total_results, progress_callback=None, timeout=0):
+    """Add every business waiting in ``queue.processed`` to the list, up to ``total_results``
+
+    The first get waits up to ``timeout`` seconds; the rest take only what is already there.
+    """
+    while len(business_list.business_list) < total_results:
+        try:
+            business = queue.processed.get(timeout=timeout) if timeout else queue.processed.get_nowait()
+        except Empty:
+            return
+        timeout = 0
+        if not business:
+            continue
+        journal.place_done(business)
+        if queue.dedup.add(business):
+            business_list.business_list.append(business)
+            if progress_callback:
+                progress_callback({
+                    'count': len(business_list.business_list),
+                    'name': business.name,
+                    'df': business_list.dataframe()
+                })
+
+def parallel_search(pool, drivers, slot: int, queue: BusinessQueue, search_id: int):
+    """Search thread: runs sub-queries from the queue until the plan runs out or the job is full.
+
+    Runs on ``drivers[slot]``, swapping in a fresh browser from ``pool``
+    when the current one dies or its proxy is benched.
+    """
+    logging.info(f"Search thread {search_id} started")
+    driver = drivers[slot]
+    try:
+        while queue.processed_count < queue.total_results and not queue.stopped.is_set():
+            try:
+                sub_query = queue.sub_queries.get(timeout=QUEUE_TIMEOUT)
+            except Empty:
+                # A search still running elsewhere may yet be split into more
+                if queue.is_planning:
+                    continue
+                break
+            found_before = len(queue.dedup)
+            listed = run_search(driver, queue, sub_query)
+            queue.search_reports.put((sub_query, listed))
+            if listed is not None:
+                logging.info(f"Search thread {search_id}: '{sub_query.text}' listed {listed}, "
+                             f"{len(queue.dedup) - found_before} new places")
+            if not pool.is_healthy(driver):
+                reason = "browser stopped responding"
+            else:
+                # Long feed scrolls grow Chrome the most; a sub-query boundary is the safe point to check
+                reason = pool.retire_reason(driver)
+            if reason and not queue.stopped.is_set():
+                logging.info("Search thread %d: recycling browser (%s)", search_id, reason)
+                drivers[slot] = None
+                driver = drivers[slot] = pool.recycle(driver)
+    except Exception as e:
+        logging.error("Search thread %d error: %s", search_id, str(e))
+    finally:
+        search_finished(queue)
+        logging.info(f"Search thread {search_id} completed")
 
-def parallel_search(driver, queue: BusinessQueue, search_id: int, search_term: str, location: str):
-    """Single search thread to find and queue businesses"""
-    logging.info("Search thread started")
+def run_search(driver, queue: BusinessQueue, sub_query) -> Optional[int]:
+    """Run one Maps search and queue its results; returns how many results it listed, None if it failed"""
+    known_cards = 0
     try:
         # Navigate to Google Maps with error handling
         max_attempts = 3
         for attempt in range(max_attempts):
             try:
-                driver.get("https://www.google.com/maps")
-                time.sleep(3)
-                
-                # Find and fill search box
-                search_box = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "searchboxinput"))
-                )
-                search_box.clear()
-                time.sleep(1)
-                
-                # Type search term slowly
-                for char in f"{search_term} in {location}":
-                    search_box.send_keys(char)
-                    time.sleep(random.uniform(0.1, 0.3))
-                
-                time.sleep(1)
-                
-                # Click search button
-                search_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "searchbox-searchbutton"))
-                )
-                driver.execute_script("arguments[0].click();", search_button)
-                
-                # Wait for results
-                time.sleep(5)
+                load_start = time.time()
+                if sub_query.url:
+                    # Viewport searches open the results for their map area directly
+                    capture = NetworkCapture(driver) if CAPTURE_MODE == 'network' else None
+                    driver.get(sub_query.url)
+                else:
+                    driver.get(MAPS_BASE_URL)
+                    
+                    # Find and fill search box as soon as it renders
+                    search_box = WebDriverWait(driver, 15).until(
+                        EC.element_to_be_clickable((By.ID, "searchboxinput"))
+                    )
+                    if getattr(driver, 'proxy', None):
+                        proxy_pool.report_success(driver.proxy, time.time() - load_start)
+                    capture = NetworkCapture(driver) if CAPTURE_MODE == 'network' else None
+                    search_box.clear()
+                    time.sleep(1)
+                    
+                    # Type search term slowly
+                    for char in sub_query.text:
+                        search_box.send_keys(char)
+                        time.sleep(random.uniform(0.1, 0.3))
+                    
+                    time.sleep(1)
+                    
+                    # Click search button
+                    search_button = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.ID, "searchbox-searchbutton"))
+                    )
+                    driver.execute_script("arguments[0].click();", search_button)
                 
-                # Find results container
-                sidebar = WebDriverWait(driver, 10).until(
+                # Wait for the results container itself rather than a fixed time
+                sidebar = WebDriverWait(driver, 15).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
                 )
+                if sub_query.url and getattr(driver, 'proxy', None):
+                    proxy_pool.report_success(driver.proxy, time.time() - load_start)
                 
-                processed_names = set()
                 scroll_attempts = 0
-                last_count = 0
+                known_cards = 0
                 
-                while queue.processed_count < queue.total_results and scroll_attempts < 5:
+                while (queue.processed_count < queue.total_results and scroll_attempts < MAX_EMPTY_SCROLLS and
+                       not queue.stopped.is_set()):
                     try:
-                        # Scroll with dynamic wait
-                        driver.execute_script(
-                            'arguments[0].scrollTop = arguments[0].scrollHeight', 
-                            sidebar
-                        )
-                        time.sleep(random.uniform(2, 3))
-                        
-                        # Find entries with multiple selectors
-                        entries = []
-                        for selector in ['div[role="article"]', 'div.Nv2PK']:
-                            try:
-                                new_entries = driver.find_elements(By.CSS_SELECTOR, selector)
-                                entries.extend(new_entries)
-                            except:
-                                continue
-                        
-                        if not entries:
+                        # Scroll, then return as soon as the feed grows or reports its end
+                        feed_state = wait_for_new_cards(driver, sidebar, known_cards)
+                        if feed_state['count'] > known_cards:
+                            known_cards = feed_state['count']
+                            scroll_attempts = 0
+                        else:
                             scroll_attempts += 1
-                            continue
-                        
-                        new_entries_found = False
-                        for entry in entries:
-                            try:
-                                name = None
-                                for selector in [
-                                    'div.fontHeadlineSmall',
-                                    'span.fontHeadlineSmall',
-                                    'div[role="heading"]'
-                                ]:
-                                    try:
-                                        name_elem = entry.find_element(By.CSS_SELECTOR, selector)
-                                        name = name_elem.text.strip()
-                                        if name:
-                                            break
-                                    except:
-                                        continue
-                                
-                                if name and name not in processed_names:
-                                    queue.to_process.put({
-                                        'name': name,
-                                        'element': entry,
-                                        'index': len(processed_names)
-                                    })
-                                    processed_names.add(name)
-                                    new_entries_found = True
-                                    logging.info("Added to queue: %s", name)
-                            except Exception as e:
-                                logging.error("Error processing entry: %s", str(e))
-                                continue
                         
-                        # Check if we're still finding new entries
-                        current_count = len(processed_names)
-                        if current_count == last_count:
-                            scroll_attempts += 1
+                        # Network mode: the payloads already hold every detail, no clicks needed
+                        if capture is not None:
+                            capture_new_businesses(capture, queue)
                         else:
-                            scroll_attempts = 0
-                            last_count = current_count
+                            # Read every card in the feed with a single WebDriver call
+                            queue_new_cards(queue, extract_cards(driver))
+                        
+                        if feed_state['end']:
+                            logging.info("Reached end of results list")
+                            break
                             
                     except Exception as e:
                         logging.error("Error during search: %s", str(e))
                         scroll_attempts += 1
-                        
-                    time.sleep(random.uniform(1, 2))
                 
                 break  # Break out of retry loop if successful
                 
             except Exception as e:
                 logging.error("Search attempt %d failed: %s", attempt + 1, str(e))
-                if attempt < max_attempts - 1:
+                if getattr(driver, 'proxy', None):
+                    try:
+                        banned = is_ban(url=driver.current_url)
+                    except Exception:
+                        banned = False
+                    proxy_pool.report_failure(driver.proxy, banned=banned)
+                # Retrying through a benched proxy only fails again; the caller swaps the browser
+                if attempt < max_attempts - 1 and not proxy_retire_reason(driver):
                     time.sleep(random.uniform(2, 4))
                     driver.delete_all_cookies()
                     continue
                 raise
                 
     except Exception as e:
-        logging.error("Search thread error: %s", str(e))
-    finally:
-        queue.is_searching = False
-        logging.info("Search completed")
+        logging.error("Search for '%s' failed: %s", sub_query.text, str(e))
+        # Cards it got to are queued, but a partial count would settle the sub-query
+        return None
+    return known_cards
+
+def requeue_work(queue: BusinessQueue, business_data) -> bool:
+    """Hand an unfinished work unit back to the queue, unless it has failed too often"""
+    attempts = business_data.get('attempts', 0) + 1
+    if attempts >= MAX_WORK_ATTEMPTS:
+        logging.error("Giving up on %s after %d attempts", business_data['name'], attempts)
+        return False
+    return put_until_stopped(queue, queue.to_process, {**business_data, 'attempts': attempts})
+
+def parallel_process(pool, drivers, slot: int, queue: BusinessQueue, process_id: int):
+    """Parallel processing function for multiple process threads.
 
-def parallel_process(driver, queue: BusinessQueue, session, process_id: int):
-    """Parallel processing function for multiple process threads"""
+    Runs on ``drivers[slot]``. A browser that dies is replaced and its
+    place goes back to the queue; one that outgrows the pool's memory or
+    use limits is recycled between places. The replacement is written back
+    to ``drivers[slot]`` so the job returns it to the pool at the end.
+    """
     logging.info(f"Process thread {process_id} started")
+    driver = drivers[slot]
     try:
-        while queue.is_searching or not queue.to_process.empty():
+        while (queue.is_searching or not queue.to_process.empty()) and not queue.stopped.is_set():
             try:
                 business_data = queue.to_process.get(timeout=QUEUE_TIMEOUT)
-                if business_data:
-                    business = process_business(driver, business_data, session)
-                    if business:
-                        queue.processed.put(business)
-                        with queue.process_lock:
-                            queue.processed_count += 1
-                            logging.info(f"Process thread {process_id}: Processed {business.name}")
             except Empty:
                 time.sleep(0.5)
-                continue 
+                continue
+            try:
+                if business_data:
+                    business = process_business(driver, business_data)
+                    if business:
+                        queue_business(queue, business, place_key(business_data['href']))
+                        logging.info(f"Process thread {process_id}: Processed {business.name}")
             except Exception as e:
                 logging.error("Process thread %d error: %s", process_id, str(e))
-                continue 
+                business = None
+            
+            broken = "browser stopped responding" if not pool.is_healthy(driver) else proxy_retire_reason(driver)
+            if broken:
+                reason = broken
+                if business_data and business is None:
+                    requeue_work(queue, business_data)
+            else:
+                reason = pool.record_use(driver)
+            if reason and not queue.stopped.is_set():
+                logging.info("Process thread %d: recycling browser (%s)", process_id, reason)
+                drivers[slot] = None
+                driver = drivers[slot] = pool.recycle(driver)
     except Exception as e:
         logging.error("Process thread %d error: %s", process_id, str(e))
 
-# Create a session manager for requests
-def create_scraper_session():
-    session = requests.Session()
-    
-    # Configure retry strategy
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=0.5,
-        status_forcelist=[429, 500, 502, 503, 504],
-    )
-    
-    # Use smaller pool size to prevent connection issues
-    adapter = HTTPAdapter(
-        pool_connections=10,
-        pool_maxsize=10,
-        max_retries=retry_strategy,
-        pool_block=False
-    )
-    
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    
-    return session
+def parallel_enrich(queue: BusinessQueue, enrich_id: int):
+    """Enrichment stage: fill in website details for businesses emitted by the browser threads"""
+    logging.info(f"Enrichment thread {enrich_id} started")
+
+    async def run():
+        pool = proxy_pool if USE_PROXIES and ENRICH_THROUGH_PROXIES else None
+        async with enrichment.EnrichmentEngine(cache=get_cache(), proxy_pool=pool) as engine:
+            await enrichment.drain_queue(
+                engine,
+                queue.to_enrich,
+                queue.processed,
+                keep_running=lambda: queue.is_processing,
+                max_in_flight=MAX_ENRICH_IN_FLIGHT
+            )
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        logging.error("Enrichment thread %d error: %s", enrich_id, str(e))
 
 # Update the email extraction function
 def extract_email_from_website(url, max_retries=3, session=None):
-    """Enhanced email extraction with connection pool management"""
+    """Extract the first valid email from a business website.
+
+    The homepage and contact pages are crawled concurrently by the asyncio
+    engine in enrichment.py. ``session`` is accepted for backwards
+    compatibility and no longer used.
+    """
     if not url:
         return None
-        
-    if session is None:
-        session = create_scraper_session()
-    
-    # Rotate user agents
-    headers = {
-        'User-Agent': random.choice(USER_AGENTS),
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
-    
-    email_patterns = [
-        r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}',  # Standard email
-        r'mailto:[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}',  # Mailto links
-        r'[A-Za-z0-9._%+-]+\s*[\[\(]\s*at\s*[\]\)]\s*[A-Za-z0-9.-]+\s*[\[\(]\s*dot\s*[\]\)]\s*[A-Z|a-z]{2,}',  # Protected emails
-    ]
-    
-    contact_pages = [
-        '/contact', '/contact-us', '/about', '/about-us', 
-        '/reach-us', '/get-in-touch', '/connect'
-    ]
-    
-    emails = set()
-    
-    def clean_email(email):
-        """Clean and validate email address"""
-        email = email.lower().strip()
-        email = email.replace('mailto:', '')
-        email = email.split('?')[0]  # Remove parameters
-        if '@' in email and '.' in email.split('@')[1]:
-            return email
-        return None
-    
-    def is_valid_email(email):
-        """Additional email validation"""
-        if not email:
-            return False
-        
-        # Check for common false positives
-        invalid_domains = [
-            'example.com', 'domain.com', 'email.com', 'wordpress',
-            'yourdomain', 'company.com', 'website.com'
-        ]
-        
-        return not any(domain in email.lower() for domain in invalid_domains)
-    
-    for attempt in range(max_retries):
-        try:
-            # Add random delay between requests
-            time.sleep(random.uniform(1, 3))
-            
-            # Try main page
-            response = session.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Method 1: Direct regex search
-            for pattern in email_patterns:
-                found_emails = re.findall(pattern, soup.text)
-                emails.update(clean_email(email) for email in found_emails)
-            
-            # Method 2: Check mailto links
-            mailto_links = soup.find_all('a', href=re.compile(r'^mailto:'))
-            for link in mailto_links:
-                href = link.get('href', '')
-                email = clean_email(href)
-                if email:
-                    emails.add(email)
-            
-            # Method 3: Check contact pages with delay between requests
-            base_url = url.rstrip('/')
-            for contact_page in contact_pages:
-                try:
-                    time.sleep(random.uniform(0.5, 1.5))
-                    contact_url = f"{base_url}{contact_page}"
-                    contact_response = session.get(contact_url, headers=headers, timeout=5)
-                    if contact_response.status_code == 200:
-                        contact_soup = BeautifulSoup(contact_response.text, 'html.parser')
-                        
-                        # Search for emails in contact page
-                        for pattern in email_patterns:
-                            found_emails = re.findall(pattern, contact_soup.text)
-                            emails.update(clean_email(email) for email in found_emails)
-                except:
-                    continue
-            
-            # Filter and validate emails
-            valid_emails = {email for email in emails if is_valid_email(email)}
-            
-            if valid_emails:
-                logging.info(f"Found {len(valid_emails)} valid emails for {url}")
-                return list(valid_emails)[0]  # Return first valid email
-                
-        except Exception as e:
-            logging.error(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(random.uniform(2, 4))
-            continue
-    
-    return None
+    return enrichment.extract_email(url, max_retries=max_retries)
 
 def extract_additional_info(url):
+    """Social media, business hours and categories of a business website.
+
+    Shares the single-fetch crawl (and its cache) with the email extraction.
+    """
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        social_media = {
-            'facebook': soup.find('a', href=re.compile(r'facebook\.com')),
-            'twitter': soup.find('a', href=re.compile(r'twitter\.com')),
-            'instagram': soup.find('a', href=re.compile(r'instagram\.com')),
-            'linkedin': soup.find('a', href=re.compile(r'linkedin\.com'))
-        }
-        social_media = {k: v['href'] if v else None for k, v in social_media.items()}
-        
-        business_hours = soup.find('div', class_=re.compile(r'hours|schedule|time'))
-        business_hours = business_hours.text.strip() if business_hours else None
-        
-        categories = [tag.text for tag in soup.find_all('a', href=re.compile(r'category|tag'))]
-        
-        return social_media, business_hours, categories
+        info = enrichment.enrich_site(url)
+        if info is None:
+            return {}, None, []
+        return info.social_media, info.business_hours, info.categories
     except Exception as e:
         logging.error(f"Error extracting additional info from {url}: {e}")
         return {}, None, []
@@ -620,138 +744,60 @@ def search_businesses(driver, queue: BusinessQueue):
         logging.error(f"Error in search thread: {str(e)}", exc_info=True)
         queue.is_searching = False
 
-def verify_business_data(business: Business, existing_businesses: List[Business]) -> bool:
+def verify_business_data(business: Business, existing: DedupIndex) -> bool:
     """Verify business data is unique and valid"""
     if not business.name or not business.address:
         return False
     
-    # Check for duplicates
-    for existing in existing_businesses:
-        if (business.name == existing.name and 
-                business.address == existing.address):
-            return False
-            
-        # Check for similar names to catch variations
-        if (business.name and existing.name and
-            (business.name in existing.name or existing.name in business.name) and
-            business.address == existing.address):
-            return False
-    
-    return True
+    # Same place, or a similar name at the same address or phone number
+    return not existing.is_duplicate(business)
+
+def process_business(driver, business_data):
+    """Open a business's place page and read its details.
 
-def process_business(driver, business_data, session):
-    """Process a single business entry"""
+    Works on any driver: the work unit carries the card's /maps/place/ URL,
+    so nothing depends on the search results being loaded in this browser.
+    """
     name = business_data['name']
+    href = business_data.get('href')
+    if not href:
+        logging.error("No place URL for: %s", name)
+        return None
     
     try:
         logging.info("Processing: %s", name)
+        load_start = time.time()
+        driver.get(href)
         
-        # Find and click the business entry using multiple strategies
-        entry = None
-        try:
-            # Try exact match first
-            entry = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, 
-                    f"//div[normalize-space(text())='{name}']"
-                ))
-            )
-        except:
-            try:
-                # Try contains match
-                entry = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, 
-                        f"//div[contains(text(), '{name}')]"
-                    ))
-                )
-            except:
-                # Try clicking parent element
-                entries = driver.find_elements(By.CSS_SELECTOR, 'div[role="article"]')
-                for e in entries:
-                    if name in e.text:
-                        entry = e
-                        break
-        
-        if not entry:
-            logging.error("Could not find entry for: %s", name)
-            return None
-            
-        # Click with retry mechanism
-        click_successful = False
-        for _ in range(3):
-            try:
-                driver.execute_script("arguments[0].scrollIntoView(true);", entry)
-                time.sleep(1)
-                driver.execute_script("arguments[0].click();", entry)
-                click_successful = True
-                break
-            except:
-                try:
-                    ActionChains(driver).move_to_element(entry).click().perform()
-                    click_successful = True
-                    break
-                except:
-                    time.sleep(1)
-        
-        if not click_successful:
-            logging.error("Failed to click: %s", name)
-            return None
-            
-        time.sleep(2)
-        
-        # Extract business details
-        details = {}
-        
+        # The address button renders with the rest of the place panel
         try:
-            details['address'] = WebDriverWait(driver, 5).until(
+            address = WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, 
                     'button[data-item-id*="address"]'
                 ))
             ).text.strip()
-        except:
-            details['address'] = None
-
-        try:
-            details['phone'] = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 
-                    'button[data-item-id*="phone"]'
-                ))
-            ).text.strip()
-        except:
-            details['phone'] = None
-
-        try:
-            website_elem = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 
-                    'a[data-item-id*="authority"]'
-                ))
-            )
-            details['website'] = website_elem.get_attribute('href')
-            
-            if details['website']:
-                details['email'] = extract_email_from_website(
-                    details['website'], 
-                    session=session
-                )
-            else:
-                details['email'] = None
-        except:
-            details['website'] = None
-            details['email'] = None
-
-        # Go back to results
-        try:
-            ActionChains(driver).send_keys(Keys.ESCAPE).perform()
-        except:
-            pass
-        time.sleep(1)
+        except TimeoutException:
+            if getattr(driver, 'proxy', None) and is_ban(url=driver.current_url):
+                proxy_pool.report_failure(driver.proxy, banned=True)
+            logging.error("Place page did not load for: %s", name)
+            return None
+        if getattr(driver, 'proxy', None):
+            proxy_pool.report_success(driver.proxy, time.time() - load_start)
+        
+        # Phone and website are either there already or missing, so don't wait for them
+        phone = driver.find_elements(By.CSS_SELECTOR, 'button[data-item-id*="phone"]')
+        website = driver.find_elements(By.CSS_SELECTOR, 'a[data-item-id*="authority"]')
 
         # Create business object
         business = Business(
             name=name,
-            address=details['address'],
-            url=details['website'],
-            phone_number=details['phone'],
-            email=details['email']
+            address=address or None,
+            url=website[0].get_attribute('href') if website else None,
+            phone_number=phone[0].text.strip() if phone else None,
+            reviews_count=business_data.get('reviews'),
+            reviews_average=business_data.get('rating'),
+            categories=[business_data['category']] if business_data.get('category') else [],
+            place_url=href
         )
         
         if business.name and business.address:
@@ -762,15 +808,17 @@ def process_business(driver, business_data, session):
         
     except Exception as e:
         logging.error("Error processing %s: %s", name, str(e))
-        try:
-            ActionChains(driver).send_keys(Keys.ESCAPE).perform()
-        except:
-            pass
-        time.sleep(1)
         return None
 
-def create_driver_with_options():
-    """Create a new Chrome driver with optimized options"""
+def create_driver_with_options(proxy=None, lean=None, performance_log=None):
+    """Create a new Chrome driver with optimized options.
+
+    ``lean`` (default LEAN_BROWSER) runs headless and blocks heavy resources;
+    ``performance_log`` (default: on in network capture mode) keeps DevTools
+    network events for maps_capture and the benchmarks.
+    """
+    lean = LEAN_BROWSER if lean is None else lean
+    performance_log = CAPTURE_MODE == 'network' if performance_log is None else performance_log
     options = uc.ChromeOptions()
     
     # Essential options for stability and anti-detection
@@ -779,98 +827,174 @@ def create_driver_with_options():
     options.add_argument('--disable-blink-features=AutomationControlled')
     options.add_argument('--disable-notifications')
     options.add_argument('--disable-popup-blocking')
-    options.add_argument('--start-maximized')
+    if lean:
+        options.add_argument('--headless=new')
+        options.add_argument(f'--window-size={LEAN_WINDOW_SIZE}')
+    else:
+        options.add_argument('--start-maximized')
     options.add_argument('--disable-gpu')
     options.add_argument('--disable-infobars')
     options.add_argument('--disable-extensions')
     options.add_argument('--disable-default-apps')
     options.add_argument(f'--user-agent={random.choice(USER_AGENTS)}')
+    if proxy:
+        options.add_argument(f'--proxy-server={proxy_url(proxy)}')
     
     # Additional preferences
     options.add_experimental_option('excludeSwitches', ['enable-automation'])
     options.add_experimental_option('useAutomationExtension', False)
+    if lean:
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+    if performance_log:
+        enable_performance_logging(options)
     
     try:
         driver = uc.Chrome(options=options, version_main=119)  # Specify Chrome version
         driver.set_page_load_timeout(30)
+        if lean:
+            # Prefs only cover images; fonts, media and tiles are cut off at the network layer
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        driver.proxy = proxy  # Remembered so failures can be reported back to the pool
         return driver
     except Exception as e:
         logging.error("Error creating driver: %s", str(e))
+        if proxy:
+            proxy_pool.report_failure(proxy)
         raise
 
-def get_business_data(search_query: str, location: str, total_results: int, progress_callback=None):
-    """Main function to get business data"""
-    drivers = []
-    sessions = []
+def create_pooled_driver():
+    """Driver factory for the shared pool, each browser on its own proxy"""
+    return create_driver_with_options(
+        proxy=proxy_pool.acquire() if USE_PROXIES else None
+    )
+
+def proxy_retire_reason(driver) -> Optional[str]:
+    """Why a browser should be replaced because of its proxy, if it should"""
+    proxy = getattr(driver, 'proxy', None)
+    if proxy and proxy_pool.is_benched(proxy):
+        return f"proxy {proxy} benched"
+    return None
+
+def get_business_data(search_query: str, location: str, total_results: int, progress_callback=None,
+                      timeout=JOB_TIMEOUT, resume=True):
+    """Main function to get business data.
+
+    Progress is journaled as the job runs; with ``resume`` a run of a job
+    that timed out or crashed carries on from where that one stopped.
+    """
+    # One search stops at ~120 results; bigger jobs fan out over postal codes or map tiles
+    planner = make_planner(search_query, location, total_results)
+    journal = open_journal(search_query, location, total_results, f"{QUERY_PLAN}/{CAPTURE_MODE}", resume)
+    queue = BusinessQueue(total_results)
+    finished = start_job(queue, planner, journal)
     
-    # Create browser instances with retry
-    for i in range(MAX_PROCESS_WORKERS):
-        max_attempts = 3
-        for attempt in range(max_attempts):
-            try:
-                driver = create_driver_with_options()
-                session = create_scraper_session()
-                logging.info(f"Created browser instance {i+1}")
-                drivers.append(driver)
-                sessions.append(session)
-                time.sleep(2)  # Delay between driver creation
-                break
-            except Exception as e:
-                logging.error(f"Error creating browser instance {i+1} (attempt {attempt+1}): {str(e)}")
-                if attempt == max_attempts - 1:
-                    raise
-                time.sleep(random.uniform(2, 4))
+    # Initialize results
+    business_list = BusinessList()
+    business_list.business_list.extend(finished)
+    if len(business_list.business_list) >= total_results:
+        journal.finish()
+        journal.close()
+        return business_list
+    if finished and progress_callback:
+        progress_callback({
+            'count': len(business_list.business_list),
+            'name': finished[-1].name,
+            'df': business_list.dataframe()
+        })
     
-    if not drivers:
-        raise Exception("Failed to create any browser instances")
+    search_workers = search_worker_count(planner)
     
+    # Network mode reads details from the search payloads, so only dom mode needs detail browsers
+    detail_workers = MAX_PROCESS_WORKERS if CAPTURE_MODE == 'dom' else 0
+    
+    # Borrow warm browsers from the long-lived pool instead of starting new ones
+    pool = get_shared_pool(
+        search_workers + detail_workers,
+        create_pooled_driver,
+        max_rss=DRIVER_MAX_RSS_MB * 1024 * 1024,
+        max_uses=DRIVER_MAX_PLACES,
+        retire_check=proxy_retire_reason
+    )
+    drivers = []
+    try:
+        for i in range(search_workers + detail_workers):
+            drivers.append(pool.acquire())
+            logging.info(f"Acquired browser instance {i+1}")
+    except Exception:
+        for driver in drivers:
+            pool.release(driver)
+        raise
+    
+    threads = []
+    queue.active_searches = search_workers + 1  # resume_work is the last "search"
+    queue.is_searching = True
     try:
-        # Initialize queue and results
-        queue = BusinessQueue(total_results)
-        business_list = BusinessList()
-        processed_businesses = []
+        # Search browsers only scroll feeds; detail browsers open place URLs
+        # (slots search_workers onwards); both are swapped in place when recycled
         
-        # Start search thread
-        search_thread = Thread(
-            target=parallel_search,
-            args=(drivers[0], queue, 0, search_query, location)
-        )
-        search_thread.daemon = True
-        search_thread.start()
+        # Start search threads
+        search_threads = []
+        for i in range(search_workers):
+            thread = Thread(
+                target=parallel_search,
+                args=(pool, drivers, i, queue, i)
+            )
+            thread.daemon = True
+            thread.start()
+            search_threads.append(thread)
+            threads.append((thread, [i]))
         
         # Start processing threads
         process_threads = []
-        for i in range(len(drivers)):
+        for i, slot in enumerate(range(search_workers, len(drivers))):
             thread = Thread(
                 target=parallel_process,
-                args=(drivers[i], queue, sessions[i], i)
+                args=(pool, drivers, slot, queue, i)
             )
             thread.daemon = True
             thread.start()
             process_threads.append(thread)
+            threads.append((thread, [slot]))
+        
+        # Start enrichment threads, independent of the browsers
+        enrich_threads = []
+        for i in range(MAX_ENRICH_WORKERS):
+            thread = Thread(
+                target=parallel_enrich,
+                args=(queue, i)
+            )
+            thread.daemon = True
+            thread.start()
+            enrich_threads.append(thread)
+        
+        # Unfinished places from an earlier run; the workers are already draining the queues
+        resume_work(queue, journal)
         
         # Monitor progress with timeout
         start_time = time.time()
-        timeout = 300  # 5 minutes timeout
         
         while (time.time() - start_time < timeout and 
-               (search_thread.is_alive() or not queue.to_process.empty() or 
-                any(t.is_alive() for t in process_threads))):
+               (any(t.is_alive() for t in search_threads) or not queue.to_process.empty() or 
+                any(t.is_alive() for t in process_threads) or
+                any(t.is_alive() for t in enrich_threads) or
+                not queue.processed.empty())):
             try:
-                if not queue.processed.empty():
-                    business = queue.processed.get_nowait()
-                    if business and business not in processed_businesses:
-                        business_list.business_list.append(business)
-                        processed_businesses.append(business)
-                        if progress_callback:
-                            progress_callback({
-                                'count': len(business_list.business_list),
-                                'name': business.name,
-                                'df': business_list.dataframe()
-                            })
+                plan_searches(queue, planner)
+                
+                # Browser stages are done once search and processing threads exit
+                if queue.is_processing and not any(t.is_alive() for t in search_threads) and \
+                        not any(t.is_alive() for t in process_threads):
+                    queue.is_processing = False
+                
+                drain_processed(queue, journal, business_list, total_results, progress_callback)
                 
                 if len(business_list.business_list) >= total_results:
                     queue.is_searching = False
+                    queue.is_processing = False
                     break
                 
                 time.sleep(0.1)
@@ -881,16 +1005,29 @@ def get_business_data(search_query: str, location: str, total_results: int, prog
                 logging.error("Error in main loop: %s", str(e))
                 continue
         
+        finish_job(journal, planner, business_list, total_results, time.time() - start_time >= timeout)
         return business_list
         
     finally:
-        # Clean up drivers
-        for driver in drivers:
-            try:
-                driver.quit()
-                time.sleep(0.5)
-            except:
-                pass
+        # Stop the browser threads and hand their drivers back to the pool
+        queue.is_searching = False
+        queue.is_processing = False
+        queue.stopped.set()
+        busy = set()
+        for thread, slots in threads:
+            thread.join(timeout=DRIVER_RELEASE_TIMEOUT)
+            if thread.is_alive():
+                busy.update(slots)
+        for slot, driver in enumerate(drivers):
+            if driver is None:
+                # Retired mid-job and no replacement could be borrowed
+                continue
+            if slot in busy:
+                # Still in use by a stuck thread; never lend it to another job
+                pool.discard(driver)
+            else:
+                pool.release(driver)
+        journal.close()
 
 def main():
     st.title("Google Maps Business Scraper")
@@ -906,11 +1043,12 @@ def main():
         "Pennsylvania", "Rhode Island", "South Carolina", "South Dakota", 
         "Tennessee", "Texas", "Utah", "Vermont", "Virginia", "Washington", 
         "West Virginia", "Wisconsin", "Wyoming"
-    ]
+    ] + canadian_provinces()
     
     search_term = st.text_input("Enter search term:")
     location = st.selectbox("Select location:", locations) 
     total_results = st.number_input("Number of businesses to scrape:", min_value=1, max_value=5000, value=100) 
+    resume = st.checkbox("Resume an interrupted run of this search", value=True)
 
     results_placeholder = st.empty()
     progress_text = st.empty()
@@ -922,7 +1060,12 @@ def main():
                 progress_text.text("Starting scraper...")
                 progress_bar.progress(0) 
 
-                business_list = get_business_data(
+                run = get_business_data
+                if EXECUTION_MODE == 'processes':
+                    # Imported here because orchestrator imports this module
+                    from orchestrator import run_job as run
+
+                business_list = run(
                     search_term,
                     location,
                     total_results, 
@@ -932,7 +1075,8 @@ def main():
                         progress_bar,
                         results_placeholder,
                         total_results
-                    )
+                    ),
+                    resume=resume
                 )
                 
                 # Show download buttons when done 
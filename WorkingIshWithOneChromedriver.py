@@ -21,7 +21,7 @@ from itertools import cycle
 import undetected_chromedriver as uc
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
-from urllib.parse import urljoin
+import enrichment
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -74,55 +74,14 @@ class BusinessList:
         return file_path
 
 def extract_email_from_website(url):
+    """Extract the first valid email from a business website.
+
+    Uses the same link-driven contact-page discovery as the multithreaded
+    version (see enrichment.py).
+    """
     if not url:
         return None
-        
-    try:
-        # Try direct website first
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Look for emails in various ways
-        email_regex = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}'
-        emails = set()  # Use set to avoid duplicates
-        
-        # Method 1: Direct text search
-        text_emails = re.findall(email_regex, soup.text)
-        emails.update(text_emails)
-        
-        # Method 2: Check mailto links
-        mailto_links = soup.find_all('a', href=re.compile(r'^mailto:'))
-        for link in mailto_links:
-            href = link.get('href', '')
-            email = href.replace('mailto:', '').split('?')[0]
-            if re.match(email_regex, email):
-                emails.add(email)
-                
-        # Method 3: Check contact page if exists
-        contact_links = soup.find_all('a', href=re.compile(r'contact|about', re.I))
-        for link in contact_links:
-            try:
-                contact_url = urljoin(url, link['href'])
-                contact_response = requests.get(contact_url, timeout=5)
-                contact_soup = BeautifulSoup(contact_response.text, 'html.parser')
-                contact_emails = re.findall(email_regex, contact_soup.text)
-                emails.update(contact_emails)
-            except:
-                continue
-                
-        # Filter out common false positives
-        filtered_emails = {
-            email for email in emails 
-            if not any(false_positive in email.lower() for false_positive in [
-                'example.com', 'domain.com', 'email.com', 'wordpress'
-            ])
-        }
-        
-        return list(filtered_emails)[0] if filtered_emails else None
-        
-    except Exception as e:
-        logging.error(f"Error extracting email from {url}: {str(e)}")
-        return None
+    return enrichment.extract_email(url)
 
 def extract_additional_info(url):
     try:
@@ -0,0 +1,104 @@
+"""Compare the "@"-anchored email scanner with the old BeautifulSoup path.
+
+Usage:
+    python benchmarks/bench_email_scanner.py [--corpus DIR] [--repeat N]
+
+DIR holds saved pages (*.html / *.htm). Without it a synthetic corpus of
+business homepages is generated.
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from enrichment import clean_email, scan_emails
+
+LEGACY_PATTERNS = [
+    r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}',
+    r'mailto:[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}',
+    r'[A-Za-z0-9._%+-]+\s*[\[\(]\s*at\s*[\]\)]\s*[A-Za-z0-9.-]+\s*[\[\(]\s*dot\s*[\]\)]\s*[A-Z|a-z]{2,}',
+]
+
+
+def legacy_find_emails(body):
+    """The per-page work extract_email_from_website used to do"""
+    soup = BeautifulSoup(body.decode('utf-8', errors='replace'), 'html.parser')
+    emails = set()
+    for pattern in LEGACY_PATTERNS:
+        emails.update(clean_email(email) for email in re.findall(pattern, soup.text))
+    for link in soup.find_all('a', href=re.compile(r'^mailto:')):
+        email = clean_email(link.get('href', ''))
+        if email:
+            emails.add(email)
+    emails.discard(None)
+    return emails
+
+
+def synthetic_page(rng, paragraphs=60):
+    """A homepage-sized document with nav, filler text and a contact block"""
+    words = ['plumbing', 'service', 'family', 'owned', 'since', 'quality', 'call', 'today',
+             'licensed', 'insured', 'free', 'estimate', 'local', 'trusted', 'team']
+    parts = ['<html><head><title>Business</title><style>@media (max-width:600px){}</style></head><body>',
+             '<nav>' + ''.join(f'<a href="/page{i}">Page {i}</a>' for i in range(20)) + '</nav>']
+    for _ in range(paragraphs):
+        parts.append('<p>' + ' '.join(rng.choice(words) for _ in range(80)) + '</p>')
+    parts.append('<img src="/img/logo@2x.png">')
+    if rng.random() < 0.6:
+        parts.append(f'<a href="mailto:info{rng.randint(1, 999)}@business.com">Email us</a>')
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def load_corpus(corpus_dir, size=200):
+    if corpus_dir:
+        paths = glob.glob(os.path.join(corpus_dir, '*.htm*'))
+        pages = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return pages
+    rng = random.Random(42)
+    return [synthetic_page(rng) for _ in range(size)]
+
+
+def bench(fn, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in pages:
+            fn(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help='Directory of saved HTML pages')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit("No pages found in corpus")
+    megabytes = sum(len(body) for body in pages) / 1e6
+
+    # Both paths must agree before their timings mean anything
+    mismatches = sum(1 for body in pages if scan_emails(body) - legacy_find_emails(body))
+    legacy = bench(legacy_find_emails, pages, args.repeat)
+    scanner = bench(scan_emails, pages, args.repeat)
+
+    print(f"{len(pages)} pages, {megabytes:.1f} MB")
+    print(f"legacy (BeautifulSoup + 3 regexes): {len(pages) / legacy:10.1f} pages/s")
+    print(f"scanner (anchored on @ and [at]):   {len(pages) / scanner:10.1f} pages/s")
+    print(f"speedup: {legacy / scanner:.1f}x, pages with extra scanner hits: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Micro-benchmarks for the scraper's pure-Python hot paths.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--corpus DIR] [--sizes 1000,10000,100000]
+                                         [--only NAME] [--label LABEL] [--baseline LABEL]
+
+Every case is reported as ops/sec (best of --repeat timeit runs) and peak
+traced memory (tracemalloc, one separate call). Results are saved to
+benchmarks/results/LABEL.json, LABEL defaulting to the current git commit,
+and compared with --baseline (default: the most recent earlier result).
+Cases that got slower or hungrier than --threshold are flagged and make
+the script exit with status 1.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_email_scanner import load_corpus
+from dedup import DedupIndex
+from enrichment import clean_email, extract_page_info, is_valid_email, scan_emails
+from entity_resolution import EntityResolver
+from MultiThreadVersion import Business, BusinessList, verify_business_data
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = (1000, 10000, 100000)
+VERIFY_SIZES = (100, 1000, 10000)  # Existing businesses in the index each verify_business_data call checks
+REGRESSION_THRESHOLD = 0.15
+
+
+def make_businesses(count, seed=7):
+    """Businesses shaped like real output, with a website and social links on some"""
+    rng = random.Random(seed)
+    words = ['Reliable', 'Golden', 'Summit', 'Metro', 'Liberty', "Joe's", 'Valley', 'Premier']
+    kinds = ['Plumbing', 'Dental', 'Cafe', 'Auto Repair', 'Bakery', 'Electric']
+    streets = ['Main St', 'Oak Ave', 'Broadway', 'Elm St', 'Park Blvd']
+    businesses = []
+    for i in range(count):
+        name = f"{rng.choice(words)} {rng.choice(kinds)} {i}"
+        has_site = rng.random() < 0.7
+        businesses.append(Business(
+            name=name,
+            address=f"{rng.randint(1, 9999)} {rng.choice(streets)}, Denver, CO 80{rng.randint(200, 299)}",
+            url=f"https://www.business{i}.com" if has_site else None,
+            phone_number=f"({rng.randint(200, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+            email=f"info@business{i}.com" if has_site and rng.random() < 0.5 else None,
+            reviews_count=rng.randint(0, 3000),
+            reviews_average=round(rng.uniform(1, 5), 1),
+            social_media={'facebook': f"https://facebook.com/business{i}", 'twitter': None} if has_site else {},
+            business_hours='Mon-Fri 8-6' if rng.random() < 0.4 else None,
+            categories=[rng.choice(kinds)]
+        ))
+    return businesses
+
+
+def build_cases(pages, sizes, only=None):
+    """name -> zero-argument callable; each call is one op"""
+    cases = {}
+    candidates = [email for body in pages for email in scan_emails(body)]
+    candidates += ['mailto:Info@Business.com', 'user@example.com', 'john.doe@yourdomain.net', ' sales@shop.co ']
+
+    def scan_corpus():
+        for body in pages:
+            scan_emails(body)
+
+    def clean_and_validate():
+        for email in candidates:
+            is_valid_email(clean_email(email))
+
+    def parse_corpus():
+        for body in pages:
+            extract_page_info(body)
+
+    cases['scan_emails/corpus'] = scan_corpus
+    cases['clean_email+is_valid_email/candidates'] = clean_and_validate
+    cases['extract_page_info/corpus'] = parse_corpus
+
+    for size in VERIFY_SIZES:
+        existing = DedupIndex()
+        for business in make_businesses(size):
+            existing.add(business)
+        # A new business is the common case; it used to cost a scan of every existing one
+        fresh = make_businesses(1, seed=size)[0]
+        cases[f'verify_business_data/{size}'] = lambda existing=existing, fresh=fresh: \
+            verify_business_data(fresh, existing)
+
+    for size in sizes:
+        records = make_businesses(size)
+
+        def resolve(records=records):
+            resolver = EntityResolver()
+            for business in records:
+                resolver.add(business)
+
+        cases[f'entity_resolution/{size}'] = resolve
+
+    save_dir = tempfile.mkdtemp(prefix='bench_hot_paths_')
+    for size in sizes:
+        business_list = BusinessList()
+        business_list.business_list = make_businesses(size)
+        business_list.save_at = save_dir
+        cases[f'dataframe/{size}'] = business_list.dataframe
+        cases[f'save_to_csv/{size}'] = lambda business_list=business_list: business_list.save_to_csv('bench')
+        cases[f'save_to_excel/{size}'] = lambda business_list=business_list: business_list.save_to_excel('bench')
+
+    if only:
+        cases = {name: fn for name, fn in cases.items() if only in name}
+    return cases
+
+
+def measure(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'ops_per_sec': number / best, 'peak_kb': peak / 1024}
+
+
+def git_label():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime('%Y%m%d-%H%M%S')
+
+
+def load_baseline(label, exclude):
+    if label:
+        path = os.path.join(RESULTS_DIR, f"{label}.json")
+    else:
+        paths = sorted((p for p in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if p != exclude),
+                       key=os.path.getmtime)
+        path = paths[-1] if paths else None
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold):
+    """Print the change against the baseline per case; returns the names of regressed cases"""
+    regressions = []
+    print(f"\ncompared with {baseline['label']} ({baseline['created']})")
+    for name, current in results.items():
+        previous = baseline['results'].get(name)
+        if not previous:
+            continue
+        speed = current['ops_per_sec'] / previous['ops_per_sec'] - 1
+        memory = current['peak_kb'] / previous['peak_kb'] - 1 if previous['peak_kb'] else 0.0
+        flag = ''
+        if speed < -threshold or memory > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:45} speed {speed:+7.1%}  memory {memory:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help='Directory of saved HTML pages')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Row counts for the BusinessList cases')
+    parser.add_argument('--only', help='Run only cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--label', help='Name of this result set (default: git commit)')
+    parser.add_argument('--baseline', help='Result set to compare with (default: most recent)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit("No pages found in corpus")
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    results = {}
+    print(f"{'case':45} {'ops/sec':>12} {'peak KB':>12}")
+    for name, fn in build_cases(pages, sizes, args.only).items():
+        results[name] = measure(fn, args.repeat)
+        print(f"{name:45} {results[name]['ops_per_sec']:12.2f} {results[name]['peak_kb']:12.1f}")
+
+    label = args.label or git_label()
+    path = os.path.join(RESULTS_DIR, f"{label}.json")
+    baseline = load_baseline(args.baseline, exclude=path)
+    if not args.no_save:
+        if not os.path.exists(RESULTS_DIR):
+            os.makedirs(RESULTS_DIR)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'label': label,
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'pages': len(pages),
+                'results': results,
+            }, f, indent=2)
+        print(f"\nsaved {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            sys.exit(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
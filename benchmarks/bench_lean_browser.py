@@ -0,0 +1,118 @@
+"""Measure browser memory and bandwidth per place, full profile vs lean profile.
+
+Usage:
+    python benchmarks/bench_lean_browser.py [--query Q] [--location L] [--places N]
+
+Set MAPS_BASE_URL to a standin_server.py address to measure offline.
+
+Each profile gets a fresh driver that runs the same search and opens the
+same number of place pages the way the detail workers do. Reported are the
+peak RSS of the driver's Chrome and chromedriver processes and the bytes
+received (from the DevTools performance log), plus the requests the lean
+profile blocked.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from driver_pool import driver_rss
+from maps_dom import extract_cards
+from MultiThreadVersion import MAPS_BASE_URL, create_driver_with_options, process_business
+
+
+class TrafficMeter:
+    """Tallies bytes received and requests blocked from the performance log"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.bytes = 0
+        self.requests = 0
+        self.blocked = 0
+
+    def drain(self):
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            params = message.get('params', {})
+            if message.get('method') == 'Network.loadingFinished':
+                self.bytes += params.get('encodedDataLength', 0)
+                self.requests += 1
+            elif message.get('method') == 'Network.loadingFailed' and params.get('blockedReason'):
+                self.blocked += 1
+
+
+def scroll_feed(driver, rounds=3):
+    feed = WebDriverWait(driver, 20).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
+    )
+    for _ in range(rounds):
+        driver.execute_script('arguments[0].scrollTop = arguments[0].scrollHeight', feed)
+        time.sleep(2)
+
+
+def measure(lean, query, location, places):
+    driver = create_driver_with_options(lean=lean, performance_log=True)
+    try:
+        meter = TrafficMeter(driver)
+        peak_rss = driver_rss(driver)
+
+        driver.get(f"{MAPS_BASE_URL}/search/{quote(f'{query} in {location}')}")
+        scroll_feed(driver)
+        cards = [card for card in extract_cards(driver) if card['href']][:places]
+        meter.drain()
+        search_bytes = meter.bytes
+        peak_rss = max(peak_rss, driver_rss(driver))
+
+        opened = 0
+        for card in cards:
+            if process_business(driver, card):
+                opened += 1
+            meter.drain()
+            peak_rss = max(peak_rss, driver_rss(driver))
+
+        return {
+            'places': opened,
+            'peak_rss_mb': peak_rss / 1e6,
+            'search_mb': search_bytes / 1e6,
+            'kb_per_place': (meter.bytes - search_bytes) / 1e3 / max(opened, 1),
+            'requests': meter.requests,
+            'blocked': meter.blocked,
+        }
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--query', default='plumbers')
+    parser.add_argument('--location', default='Denver, Colorado')
+    parser.add_argument('--places', type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for name, lean in (('full', False), ('lean', True)):
+        results[name] = measure(lean, args.query, args.location, args.places)
+
+    print(f"{'profile':8} {'places':>6} {'peak RSS MB':>12} {'search MB':>10} {'KB/place':>9} {'requests':>9} {'blocked':>8}")
+    for name, r in results.items():
+        print(f"{name:8} {r['places']:6d} {r['peak_rss_mb']:12.1f} {r['search_mb']:10.2f} "
+              f"{r['kb_per_place']:9.1f} {r['requests']:9d} {r['blocked']:8d}")
+    full, lean = results['full'], results['lean']
+    if lean['peak_rss_mb'] and lean['kb_per_place']:
+        print(f"memory: {full['peak_rss_mb'] / lean['peak_rss_mb']:.1f}x less, "
+              f"bandwidth per place: {full['kb_per_place'] / lean['kb_per_place']:.1f}x less")
+
+
+if __name__ == '__main__':
+    main()
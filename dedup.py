@@ -0,0 +1,184 @@
+"""Hash-indexed duplicate detection for places and businesses.
+
+One DedupIndex serves both ends of a job. The search stage claims place
+identities as cards turn up, so a place listed by several sub-queries is
+queued once. The results stage adds each finished business, which is
+rejected if its place, its address or its phone number already belongs
+to a business of the same name, or one whose words contain the other's.
+A phone number alone never joins two distinct listings, or two postal
+codes, since chain locations share one 1-800 number. Every check is a
+hash lookup plus a comparison against the few names filed under that
+key, instead of a scan over every business kept so far.
+"""
+import re
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from maps_dom import HREF_PLACE_ID_PATTERN
+
+PLACE_ID_PATTERN = re.compile(r'0x[0-9a-f]+:0x([0-9a-f]+)')
+CID_PATTERN = re.compile(r'[?&]cid=(\d+)')
+MIN_PHONE_DIGITS = 7  # Shorter numbers are too generic to identify a business
+
+# Spelled-out forms of the abbreviations Maps and business websites mix freely
+ADDRESS_WORDS = {
+    'st': 'street', 'ave': 'avenue', 'av': 'avenue', 'rd': 'road', 'blvd': 'boulevard',
+    'dr': 'drive', 'ln': 'lane', 'ct': 'court', 'pl': 'place', 'sq': 'square',
+    'hwy': 'highway', 'pkwy': 'parkway', 'fwy': 'freeway', 'cir': 'circle', 'ter': 'terrace',
+    'trl': 'trail', 'cres': 'crescent', 'mt': 'mount', 'ste': 'suite', 'apt': 'apartment',
+    'n': 'north', 's': 'south', 'e': 'east', 'w': 'west',
+    'ne': 'northeast', 'nw': 'northwest', 'se': 'southeast', 'sw': 'southwest',
+}
+# "Suite 200", "Unit B", "#4" and the like; the same business moves between them or omits them
+UNIT_PATTERN = re.compile(r'(?:\b(?:suite|ste|unit|apt|apartment|room|rm|floor|fl|bldg|building)\b\.?|#)\s*[\w-]+')
+US_ZIP_PATTERN = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+CA_POSTAL_PATTERN = re.compile(r'\b([a-z]\d[a-z])\s?(\d[a-z]\d)\b', re.IGNORECASE)
+
+
+def place_identity(ref) -> Optional[str]:
+    """Canonical id of a place from a card link, a place id or a ?cid= URL.
+
+    The second half of a place id is the listing's CID, so the DOM and
+    network capture modes, which see different forms, agree on one key.
+    """
+    if not ref:
+        return None
+    match = HREF_PLACE_ID_PATTERN.search(ref)
+    if match:
+        ref = match.group(1)
+    match = PLACE_ID_PATTERN.fullmatch(ref)
+    if match:
+        return f"cid:{int(match.group(1), 16)}"
+    match = CID_PATTERN.search(ref)
+    if match:
+        return f"cid:{match.group(1)}"
+    return ref.split('?', 1)[0]
+
+
+def normalize_text(text) -> str:
+    text = (text or '').lower().replace('&', ' and ')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+def normalize_address(address) -> str:
+    """Lowercase address with abbreviations spelled out and unit numbers dropped"""
+    address = UNIT_PATTERN.sub(' ', (address or '').lower())
+    return ' '.join(ADDRESS_WORDS.get(word, word) for word in normalize_text(address).split())
+
+
+def normalize_phone(phone) -> Optional[str]:
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def postal_code(address) -> Optional[str]:
+    """The last US zip code or Canadian postal code in an address"""
+    if not address:
+        return None
+    matches = CA_POSTAL_PATTERN.findall(address)
+    if matches:
+        return ''.join(matches[-1]).upper()
+    matches = US_ZIP_PATTERN.findall(address)
+    return matches[-1] if matches else None
+
+
+def _same_name(words, names) -> bool:
+    # Whole words, so "Joe's Pizza" matches "Joe's Pizza - Downtown" but "A" not "Bank of America"
+    return any(words <= other or other <= words for other in names)
+
+
+class DedupIndex:
+    """Place, address and phone keys of everything seen so far.
+
+    ``places`` holds the claimed place identities and may be any object
+    with ``in``, ``add`` and ``len``, such as a set shared between
+    processes; pass a matching ``lock`` with it. With a ``resolver``
+    (entity_resolution.EntityResolver) businesses that pass the exact
+    keys are also matched fuzzily. Safe to share between threads.
+    """
+
+    def __init__(self, places=None, lock=None, resolver=None):
+        self.places = places if places is not None else set()
+        self.lock = lock if lock is not None else threading.Lock()
+        self.resolver = resolver
+        self.accepted = set()  # Place identities of businesses in the results
+        self.by_address: Dict[str, List[FrozenSet[str]]] = {}  # Normalized address -> name words
+        # Normalized phone -> (name words, place identity, postal code)
+        self.by_phone: Dict[str, List[Tuple[FrozenSet[str], Optional[str], Optional[str]]]] = {}
+
+    def __getstate__(self):
+        # Worker processes only claim places; the results side stays with the parent
+        state = self.__dict__.copy()
+        state.update(accepted=set(), by_address={}, by_phone={}, resolver=None)
+        return state
+
+    def __len__(self):
+        return len(self.places)
+
+    def __contains__(self, ref):
+        return place_identity(ref) in self.places
+
+    def claim(self, ref) -> bool:
+        """Mark a place as taken; False if it was claimed before"""
+        key = place_identity(ref)
+        with self.lock:
+            if key in self.places:
+                return False
+            self.places.add(key)
+            return True
+
+    def _same_phone(self, place, words, phone, postal) -> bool:
+        for other_words, other_place, other_postal in self.by_phone.get(phone, ()):
+            # Chain locations share one number but are listings (and places) of their own
+            if place and other_place and place != other_place:
+                continue
+            if postal and other_postal and postal != other_postal:
+                continue
+            if _same_name(words, [other_words]):
+                return True
+        return False
+
+    def _is_duplicate(self, business, place, words, address, phone, postal) -> bool:
+        if place and place in self.accepted:
+            return True
+        if not words:
+            return False
+        if address and _same_name(words, self.by_address.get(address, ())):
+            return True
+        if phone and self._same_phone(place, words, phone, postal):
+            return True
+        return self.resolver is not None and self.resolver.match(business) is not None
+
+    def is_duplicate(self, business) -> bool:
+        """True if ``business`` matches one already added"""
+        keys = self._keys(business)
+        with self.lock:
+            return self._is_duplicate(business, *keys)
+
+    def add(self, business) -> bool:
+        """Add a finished business; False (and nothing added) if it is a duplicate"""
+        place, words, address, phone, postal = self._keys(business)
+        with self.lock:
+            if self._is_duplicate(business, place, words, address, phone, postal):
+                return False
+            if self.resolver is not None:
+                self.resolver.add(business)
+            if place:
+                self.accepted.add(place)
+            if words and address:
+                self.by_address.setdefault(address, []).append(words)
+            if words and phone:
+                self.by_phone.setdefault(phone, []).append((words, place, postal))
+            return True
+
+    @staticmethod
+    def _keys(business):
+        return (
+            place_identity(business.place_url),
+            frozenset(normalize_text(business.name).split()),
+            normalize_address(business.address),
+            normalize_phone(business.phone_number),
+            postal_code(business.address),
+        )
@@ -0,0 +1,232 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from queue import Queue, Empty
+
+import psutil
+
+DRIVER_CREATE_ATTEMPTS = 3
+ACQUIRE_TIMEOUT = 120  # Seconds to wait for a free browser
+DRIVER_MAX_RSS = 1500 * 1024 * 1024  # Bytes a browser's process tree may hold before it is retired
+DRIVER_MAX_USES = 250  # Places a browser handles before it is retired
+RSS_SAMPLE_EVERY = 10  # Places between memory samples
+
+
+def _driver_pids(driver):
+    # undetected_chromedriver starts Chrome itself, so it is not under chromedriver
+    pids = [getattr(driver, 'browser_pid', None)]
+    try:
+        pids.append(driver.service.process.pid)
+    except AttributeError:
+        pass
+    return [pid for pid in pids if pid]
+
+
+def driver_rss(driver) -> int:
+    """Resident memory, in bytes, of a driver's Chrome and chromedriver process trees"""
+    processes = {}
+    for pid in _driver_pids(driver):
+        try:
+            root = psutil.Process(pid)
+            for process in [root] + root.children(recursive=True):
+                processes[process.pid] = process
+        except psutil.Error:
+            continue
+    total = 0
+    for process in processes.values():
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+class DriverPool:
+    """Long-lived pool of warm Chrome drivers lent out to scraping jobs.
+
+    Browsers are started ahead of time on a background thread, one after
+    another, because undetected_chromedriver patches its binary on startup
+    and concurrent launches race on it. Drivers are health-checked when
+    lent out and reset (extra tabs closed, cookies cleared) when returned;
+    dead ones are replaced.
+
+    Chrome grows steadily over long sessions, so the pool also acts as a
+    watchdog: workers call ``record_use`` after every place, and a browser
+    that has handled ``max_uses`` places or whose process tree exceeds
+    ``max_rss`` bytes should be swapped for a fresh one with ``recycle``.
+    ``retire_check(driver)`` may name a reason of its own, such as the
+    browser's proxy having been benched; it is consulted on every borrow too.
+    """
+
+    def __init__(self, size, factory, max_rss=DRIVER_MAX_RSS, max_uses=DRIVER_MAX_USES, retire_check=None):
+        self.size = size
+        self.factory = factory
+        self.max_rss = max_rss
+        self.max_uses = max_uses
+        self.retire_check = retire_check
+        self.idle = Queue()
+        self.lock = threading.Lock()
+        self._fill_lock = threading.Lock()
+        self.created = 0
+        self.closed = False
+        self.uses = {}  # id(driver) -> places handled, kept across jobs
+
+    def start(self):
+        """Warm up the pool without blocking the caller"""
+        thread = threading.Thread(target=self._fill, daemon=True)
+        thread.start()
+        return thread
+
+    def _fill(self):
+        # One filler at a time; re-check after releasing in case a browser died meanwhile
+        while not self.closed and self.created < self.size:
+            if not self._fill_lock.acquire(blocking=False):
+                return
+            try:
+                while not self.closed:
+                    with self.lock:
+                        if self.created >= self.size:
+                            break
+                        self.created += 1
+                    driver = self._create()
+                    if driver is None:
+                        with self.lock:
+                            self.created -= 1
+                        return
+                    self.idle.put(driver)
+            finally:
+                self._fill_lock.release()
+
+    def _create(self):
+        for attempt in range(DRIVER_CREATE_ATTEMPTS):
+            try:
+                driver = self.factory()
+                logging.info("Driver pool: started browser (%d/%d)", self.created, self.size)
+                return driver
+            except Exception as e:
+                logging.error(f"Driver pool: error creating browser (attempt {attempt+1}): {str(e)}")
+                time.sleep(random.uniform(2, 4))
+        return None
+
+    def resize(self, size):
+        """Grow the pool; extra browsers start in the background"""
+        if size > self.size:
+            self.size = size
+            self.start()
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """Borrow a healthy driver, waiting up to ``timeout`` seconds for one"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                driver = self.idle.get(timeout=max(0.1, min(5, deadline - time.time())))
+            except Empty:
+                # Browsers may have died; make sure the pool is refilling
+                self.start()
+                continue
+            if self.is_healthy(driver) and self.retire_reason(driver) is None:
+                return driver
+            self.discard(driver)
+        raise Exception("No browser available from the driver pool")
+
+    def record_use(self, driver):
+        """Count a place handled by ``driver``; returns why it should be retired, if it should"""
+        with self.lock:
+            uses = self.uses[id(driver)] = self.uses.get(id(driver), 0) + 1
+        return self.retire_reason(driver, sample_rss=uses % RSS_SAMPLE_EVERY == 0)
+
+    def retire_reason(self, driver, sample_rss=True):
+        if self.retire_check is not None:
+            reason = self.retire_check(driver)
+            if reason:
+                return reason
+        uses = self.uses.get(id(driver), 0)
+        if self.max_uses and uses >= self.max_uses:
+            return f"handled {uses} places"
+        if self.max_rss and sample_rss:
+            rss = driver_rss(driver)
+            if rss >= self.max_rss:
+                return f"using {rss / 1e6:.0f} MB"
+        return None
+
+    def recycle(self, driver, timeout=ACQUIRE_TIMEOUT):
+        """Retire ``driver`` and borrow a fresh one in its place"""
+        self.discard(driver)
+        return self.acquire(timeout)
+
+    def release(self, driver):
+        """Return a driver after a job, resetting it for the next one"""
+        if self.closed:
+            self._quit(driver)
+            return
+        try:
+            self.reset(driver)
+            self.idle.put(driver)
+        except Exception as e:
+            logging.error("Driver pool: reset failed, replacing browser: %s", str(e))
+            self.discard(driver)
+
+    def discard(self, driver):
+        """Quit a broken or retired driver and start a replacement"""
+        self._quit(driver)
+        with self.lock:
+            self.uses.pop(id(driver), None)
+            self.created -= 1
+        if not self.closed:
+            self.start()
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            return driver.execute_script('return 1') == 1 and len(driver.window_handles) > 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def reset(driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.get('about:blank')
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self._quit(self.idle.get_nowait())
+            except Empty:
+                break
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(size, factory, max_rss=DRIVER_MAX_RSS, max_uses=DRIVER_MAX_USES,
+                    retire_check=None) -> DriverPool:
+    """Process-wide pool that outlives individual jobs (and Streamlit reruns)"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool.closed:
+            _shared_pool = DriverPool(size, factory, max_rss=max_rss, max_uses=max_uses,
+                                      retire_check=retire_check)
+            _shared_pool.start()
+            atexit.register(_shared_pool.close)
+        else:
+            _shared_pool.resize(size)
+            _shared_pool.max_rss = max_rss
+            _shared_pool.max_uses = max_uses
+            _shared_pool.retire_check = retire_check
+        return _shared_pool
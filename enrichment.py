@@ -0,0 +1,553 @@
+import asyncio
+import html
+import logging
+import random
+import re
+import time
+from queue import Empty
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from enrichment_cache import domain_key, get_cache, registered_domain
+from host_scheduler import HostScheduler
+from proxy_pool import is_ban, proxy_url
+from utils import USER_AGENTS
+
+# Concurrency limits for the enrichment engine
+MAX_CONCURRENT_SITES = 200  # Sites in flight at once
+MAX_CONCURRENT_REQUESTS = 400  # Open connections across all hosts
+MAX_REQUESTS_PER_HOST = 4  # Open connections to a single host
+PAGE_TIMEOUT = 10  # Seconds per page fetch
+PAGE_BUDGET = 3  # Pages fetched per site, homepage included
+MAX_PAGE_BYTES = 512 * 1024  # Bytes read from a response before giving up on the rest
+CHUNK_SIZE = 16 * 1024  # Bytes per streamed read
+
+# Anything else (PDFs, images, video, JS bundles) is dropped before the body is read
+ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain', 'text/xml', 'application/xml')
+
+# Addresses are found from their "@" (or "[at]") outwards: a pattern opening
+# on the local part would be tried, and backtrack, at every word in the page
+EMAIL_LOCAL = re.compile(rb'[A-Za-z0-9._%+-]{1,64}\Z')  # Searched up to the "@", so it ends there
+EMAIL_DOMAIN = re.compile(rb'[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+OBFUSCATED_AT = re.compile(rb'[\[\(]\s*at\s*[\]\)]', re.IGNORECASE)
+OBFUSCATED_DOMAIN = re.compile(rb'\s*([A-Za-z0-9.-]+)\s*[\[\(]\s*dot\s*[\]\)]\s*([A-Za-z]{2,})', re.IGNORECASE)
+LOCAL_PART_LENGTH = 64  # Longest local part looked for before an "@"
+
+# What may still follow a match when the body is cut off after it, e.g. info@shop.co|m
+EMAIL_TAIL = re.compile(rb'[A-Za-z0-9._%+-]*')
+
+# "@" written as an HTML entity, decoded without building a DOM
+ENTITY_AT = re.compile(rb'&#0*64;|&#x0*40;|&commat;', re.IGNORECASE)
+
+# "@" between an address character and a tag, e.g. info@<span>shop.com</span> or
+# <b>info</b>@shop.com; only this needs a DOM. "<style>@media" is not one
+TAG_AFTER_AT = re.compile(rb'\s*<[a-z/]', re.IGNORECASE)
+ADDRESS_BYTES = frozenset(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-')
+
+# Retina assets such as logo@2x.png look like addresses in raw markup
+ASSET_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.css', '.js')
+
+# Category and tag archive links, e.g. /category/plumbing or tags/bakery
+CATEGORY_LINK_PATTERN = re.compile(r'(?:^|/)(?:categor(?:y|ies)|tags?)/', re.IGNORECASE)
+
+# Keywords that mark a link as a likely contact page, with their weight
+CONTACT_KEYWORDS = [
+    ('contact', 10), ('get-in-touch', 8), ('get in touch', 8), ('reach', 7),
+    ('kontakt', 7), ('impressum', 6), ('connect', 5), ('about', 5),
+    ('team', 3), ('location', 2), ('support', 2),
+]
+
+# Probed only when neither the homepage nor the sitemap links anywhere useful
+FALLBACK_PAGES = ['/contact', '/about']
+
+LINK_PATTERN = re.compile(rb'<a\s[^>]*?href\s*=\s*["\']([^"\'#]+)["\'][^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+SITEMAP_LOC_PATTERN = re.compile(rb'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+INVALID_EMAIL_DOMAINS = [
+    'example.com', 'domain.com', 'email.com', 'wordpress',
+    'yourdomain', 'company.com', 'website.com'
+]
+
+
+def build_headers():
+    """Browser-like request headers with a random user agent"""
+    return {
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'DNT': '1',
+        'Upgrade-Insecure-Requests': '1',
+    }
+
+
+def clean_email(email):
+    """Clean and validate email address"""
+    email = email.lower().strip()
+    email = email.replace('mailto:', '')
+    email = email.split('?')[0]  # Remove parameters
+    if '@' in email and '.' in email.split('@')[1]:
+        return email
+    return None
+
+
+def is_valid_email(email):
+    """Additional email validation"""
+    if not email:
+        return False
+
+    # Check for common false positives
+    return not any(domain in email.lower() for domain in INVALID_EMAIL_DOMAINS)
+
+
+def _local_part(body, at, after):
+    """The local part ending at offset ``at``, not reaching back before ``after``"""
+    match = EMAIL_LOCAL.search(body, max(after, at - LOCAL_PART_LENGTH), at)
+    return match.group() if match else None
+
+
+def _addresses(body):
+    """(address, end offset) of every plain or mailto: address, then every "[at]"/"[dot]" one"""
+    found = []
+    end = 0
+    at = body.find(b'@')
+    while at != -1:
+        local = _local_part(body, at, end)
+        domain = EMAIL_DOMAIN.match(body, at + 1) if local else None
+        if domain:
+            found.append((b'%s@%s' % (local, domain.group()), domain.end()))
+            end = domain.end()
+        at = body.find(b'@', max(at + 1, end))
+    # The bracket is rare in markup, so this search rarely stops at all
+    end = 0
+    for match in OBFUSCATED_AT.finditer(body):
+        if match.start() < end:
+            continue
+        before = match.start()
+        while before > end and body[before - 1:before].isspace():
+            before -= 1
+        local = _local_part(body, before, end)
+        domain = OBFUSCATED_DOMAIN.match(body, match.end()) if local else None
+        if domain:
+            found.append((b'%s@%s.%s' % (local, domain.group(1), domain.group(2)), domain.end()))
+            end = domain.end()
+    return found
+
+
+def _scan(body, partial=False):
+    """Emails in ``body``; with ``partial`` more of it may follow, so matches that could continue are skipped"""
+    emails = set()
+    for address, end in _addresses(body):
+        if partial and EMAIL_TAIL.fullmatch(body, end):
+            continue
+        email = clean_email(address.decode('ascii').lower())
+        if email and not email.endswith(ASSET_SUFFIXES):
+            emails.add(email)
+    return emails
+
+
+def _split_by_tag(body) -> bool:
+    """True if some "@" sits between part of an address and a tag"""
+    at = body.find(b'@')
+    while at != -1:
+        after = body[at + 1:at + 2]
+        if at and body[at - 1] in ADDRESS_BYTES and TAG_AFTER_AT.match(body, at + 1):
+            return True
+        before = at
+        while before and body[before - 1:before].isspace():
+            before -= 1
+        if before and body[before - 1:before] == b'>' and after and after[0] in ADDRESS_BYTES:
+            opening = body.rfind(b'<', 0, before)
+            if opening > 0 and body[opening - 1] in ADDRESS_BYTES:
+                return True
+        at = body.find(b'@', at + 1)
+    return False
+
+
+def scan_emails(body: bytes):
+    """Collect every email address in a raw response body.
+
+    Addresses are read outwards from each "@" in the bytes. Entity-encoded pages are
+    unescaped and rescanned, and a DOM is only built when an address is
+    split across inline tags.
+    """
+    emails = _scan(body)
+    if emails:
+        return emails
+
+    if ENTITY_AT.search(body):
+        text = html.unescape(body.decode('utf-8', errors='replace'))
+        emails = _scan(text.encode('utf-8', errors='ignore'))
+        if emails:
+            return emails
+
+    if _split_by_tag(body):
+        text = BeautifulSoup(body, 'html.parser').get_text('')
+        emails = _scan(text.encode('utf-8', errors='ignore'))
+
+    return emails
+
+
+def score_link(href, text=''):
+    """How likely a link is to lead to contact details; 0 means not at all"""
+    haystack = f"{urlsplit(href).path} {text}".lower()
+    return sum(weight for keyword, weight in CONTACT_KEYWORDS if keyword in haystack)
+
+
+def rank_contact_pages(base_url, body=None, sitemap=None):
+    """Same-site pages worth visiting for contact details, best first.
+
+    Candidates come from the homepage's own links and the sitemap's
+    <loc> entries, so nothing is probed blindly.
+    """
+    site = registered_domain(base_url)
+    home = base_url.rstrip('/')
+    scores = {}
+
+    def consider(href, text=''):
+        href = href.strip()
+        if href.lower().startswith(('mailto:', 'tel:', 'javascript:')):
+            return
+        page_url = urljoin(base_url, href).split('#')[0]
+        if not page_url.startswith('http') or page_url.rstrip('/') == home:
+            return
+        if registered_domain(page_url) != site:
+            return
+        score = score_link(page_url, text)
+        if score:
+            scores[page_url] = max(score, scores.get(page_url, 0))
+
+    if body:
+        for href, text in LINK_PATTERN.findall(body):
+            text = TAG_PATTERN.sub(' ', text.decode('utf-8', errors='ignore'))
+            consider(href.decode('utf-8', errors='ignore'), text)
+    if sitemap:
+        for loc in SITEMAP_LOC_PATTERN.findall(sitemap):
+            consider(loc.decode('utf-8', errors='ignore'))
+
+    # Highest score first, shorter urls break ties (/contact before /contact/form)
+    return sorted(scores, key=lambda page_url: (-scores[page_url], len(page_url)))
+
+
+def valid_emails_in(body):
+    return sorted(email for email in scan_emails(body) if is_valid_email(email))
+
+
+@dataclass
+class SiteInfo:
+    """Everything the enrichment stage learns from one business website"""
+    emails: List[str] = field(default_factory=list)
+    social_media: Dict[str, Optional[str]] = field(default_factory=dict)
+    business_hours: Optional[str] = None
+    categories: List[str] = field(default_factory=list)
+
+    @property
+    def email(self) -> Optional[str]:
+        return self.emails[0] if self.emails else None
+
+
+def extract_page_info(body):
+    """Social media links, business hours and categories from one parsed page"""
+    soup = BeautifulSoup(body, 'html.parser')
+
+    social_media = {
+        'facebook': soup.find('a', href=re.compile(r'facebook\.com')),
+        'twitter': soup.find('a', href=re.compile(r'twitter\.com')),
+        'instagram': soup.find('a', href=re.compile(r'instagram\.com')),
+        'linkedin': soup.find('a', href=re.compile(r'linkedin\.com'))
+    }
+    social_media = {k: v['href'] if v else None for k, v in social_media.items()}
+
+    business_hours = soup.find('div', class_=re.compile(r'hours|schedule|time'))
+    business_hours = business_hours.text.strip() if business_hours else None
+
+    # Path segments only; "instagram.com" holds "tag" too
+    categories = [tag.text for tag in soup.find_all('a', href=CATEGORY_LINK_PATTERN)]
+
+    return social_media, business_hours, categories
+
+
+class EnrichmentEngine:
+    """Crawl business websites concurrently on a single event loop.
+
+    A global semaphore caps the number of sites in flight, and the
+    connector caps open connections overall and per host. Pacing comes
+    from a per-host token bucket (host_scheduler.HostScheduler), so only
+    repeat hits on one host wait. Each site costs
+    at most ``page_budget`` requests: the homepage, then the best-ranked
+    pages it links to, stopping at the first valid email. The homepage is
+    fetched once and every extractor (emails, social media, hours,
+    categories) runs on that one body. Results are kept per domain in
+    ``cache`` (an enrichment_cache.DomainCache), and branches of one chain
+    that are in flight together share a single crawl.
+    """
+
+    def __init__(self, max_sites=MAX_CONCURRENT_SITES, max_requests=MAX_CONCURRENT_REQUESTS,
+                 max_per_host=MAX_REQUESTS_PER_HOST, timeout=PAGE_TIMEOUT, cache=None,
+                 page_budget=PAGE_BUDGET, max_page_bytes=MAX_PAGE_BYTES, proxy_pool=None):
+        self.max_sites = max_sites
+        self.max_requests = max_requests
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.page_budget = page_budget
+        self.max_page_bytes = max_page_bytes
+        self.proxy_pool = proxy_pool
+        self.session = None
+        self._site_limit = None
+        self.scheduler = None
+        self._in_flight = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_requests,
+            limit_per_host=self.max_per_host,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._site_limit = asyncio.Semaphore(self.max_sites)
+        self.scheduler = HostScheduler(max_concurrent=self.max_requests)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch(self, url, stop_on_email=False) -> Optional[bytes]:
+        """Fetch a page and return its raw body, or None on any failure.
+
+        The body is streamed and cut off at ``max_page_bytes``, and
+        non-HTML responses are dropped unread. With ``stop_on_email`` the
+        chunks are scanned as they arrive and the connection is closed as
+        soon as a valid address shows up.
+        """
+        proxy = self.proxy_pool.acquire() if self.proxy_pool is not None else None
+        try:
+            async with self.scheduler.slot(url):
+                start = time.time()
+                async with self.session.get(url, headers=build_headers(), allow_redirects=True,
+                                            proxy=proxy_url(proxy) if proxy else None) as response:
+                    if proxy:
+                        if is_ban(response.status, str(response.url)):
+                            self.proxy_pool.report_failure(proxy, banned=True)
+                        else:
+                            self.proxy_pool.report_success(proxy, time.time() - start)
+                    if response.status != 200:
+                        return None
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if content_type and content_type not in ALLOWED_CONTENT_TYPES:
+                        logging.debug("Skipping %s (%s)", url, content_type)
+                        return None
+
+                    chunks = []
+                    size = 0
+                    tail = b''
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= self.max_page_bytes:
+                            break
+                        if stop_on_email:
+                            # Keep a little of the previous chunk so split addresses still match
+                            window = tail + chunk
+                            if any(is_valid_email(email) for email in _scan(window, partial=True)):
+                                break
+                            tail = window[-256:]
+
+                    return b''.join(chunks)[:self.max_page_bytes]
+        except (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError) as e:
+            self.proxy_pool.report_failure(proxy)
+            logging.debug("Proxy %s failed for %s: %s", proxy, url, str(e))
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.debug("Fetch failed for %s: %s", url, str(e))
+            return None
+
+    async def enrich_site(self, url, max_retries=3) -> Optional[SiteInfo]:
+        """Crawl a site once and return everything found, or None if unreachable"""
+        if not url:
+            return None
+
+        domain = domain_key(url)
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached and cached['emails'] is not None and cached['social_media'] is not None:
+                return SiteInfo(
+                    emails=cached['emails'],
+                    social_media=cached['social_media'],
+                    business_hours=cached['business_hours'],
+                    categories=cached['categories'] or [],
+                )
+
+        # Another branch of the same business is already being crawled
+        if domain in self._in_flight:
+            return await asyncio.shield(self._in_flight[domain])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[domain] = future
+        try:
+            info = await self._crawl_site(url, max_retries)
+            future.set_result(info)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del self._in_flight[domain]
+
+        if info is not None and self.cache is not None:
+            self.cache.put(
+                url,
+                emails=info.emails,
+                social_media=info.social_media,
+                business_hours=info.business_hours,
+                categories=info.categories,
+            )
+        return info
+
+    async def extract_email(self, url, max_retries=3) -> Optional[str]:
+        """Return the first valid email found on a site, or None"""
+        info = await self.enrich_site(url, max_retries)
+        return info.email if info else None
+
+    async def _crawl_site(self, url, max_retries) -> Optional[SiteInfo]:
+        async with self._site_limit:
+            homepage = None
+            for attempt in range(max_retries):
+                # Read the whole homepage: the other extractors need all of it
+                homepage = await self.fetch(url)
+                if homepage is not None:
+                    break
+                # Homepage unreachable, back off and retry
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(random.uniform(2, 4))
+
+            if homepage is None:
+                logging.error(f"All {max_retries} attempts failed for {url}")
+                return None
+
+            info = SiteInfo(emails=valid_emails_in(homepage))
+            try:
+                info.social_media, info.business_hours, info.categories = extract_page_info(homepage)
+            except Exception as e:
+                logging.error(f"Error extracting additional info from {url}: {e}")
+
+            emails = info.emails
+            budget = self.page_budget - 1
+
+            candidates = rank_contact_pages(url, homepage)
+            if not emails and not candidates and budget > 1:
+                sitemap = await self.fetch(urljoin(url, '/sitemap.xml'))
+                budget -= 1
+                candidates = rank_contact_pages(url, sitemap=sitemap)
+            if not candidates:
+                candidates = [urljoin(url, page) for page in FALLBACK_PAGES]
+
+            # Visit pages best-first and stop at the first one with an email
+            for page_url in candidates[:budget]:
+                if emails:
+                    break
+                body = await self.fetch(page_url, stop_on_email=True)
+                if body:
+                    emails = valid_emails_in(body)
+
+            if emails:
+                logging.info(f"Found {len(emails)} valid emails for {url}")
+            info.emails = emails
+            return info
+
+    async def extract_emails(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Crawl many sites concurrently and map each url to its email"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        results = await asyncio.gather(*(self.extract_email(url) for url in urls))
+        return dict(zip(urls, results))
+
+
+async def _enrich_sites(urls, max_retries):
+    async with EnrichmentEngine(cache=get_cache()) as engine:
+        return await asyncio.gather(*(engine.enrich_site(url, max_retries) for url in urls))
+
+
+def enrich_site(url, max_retries=3) -> Optional[SiteInfo]:
+    """Blocking wrapper around EnrichmentEngine.enrich_site"""
+    if not url:
+        return None
+    return asyncio.run(_enrich_sites([url], max_retries))[0]
+
+
+async def _extract_emails(urls, max_retries):
+    async with EnrichmentEngine(cache=get_cache()) as engine:
+        return await asyncio.gather(*(engine.extract_email(url, max_retries) for url in urls))
+
+
+def extract_email(url, max_retries=3) -> Optional[str]:
+    """Blocking wrapper for callers outside an event loop"""
+    if not url:
+        return None
+    return asyncio.run(_extract_emails([url], max_retries))[0]
+
+
+def extract_emails(urls: List[str], max_retries=3) -> Dict[str, Optional[str]]:
+    """Blocking wrapper that enriches a whole batch of sites at once"""
+    urls = list(dict.fromkeys(url for url in urls if url))
+    if not urls:
+        return {}
+    results = asyncio.run(_extract_emails(urls, max_retries))
+    return dict(zip(urls, results))
+
+
+def apply_site_info(business, info):
+    """Copy website findings onto a business without clobbering Maps data"""
+    business.email = business.email or info.email
+    business.social_media = {**info.social_media, **(business.social_media or {})}
+    business.business_hours = business.business_hours or info.business_hours
+    business.categories = business.categories or info.categories
+
+
+async def drain_queue(engine, in_queue, out_queue, keep_running, max_in_flight=MAX_CONCURRENT_SITES):
+    """Enrich businesses from ``in_queue`` and pass them on to ``out_queue``.
+
+    Items are Business records; their email, social media, hours and
+    categories are filled in from a single crawl of their website. Up to
+    ``max_in_flight`` of them are crawled at once; the loop exits once
+    ``keep_running()`` is false and nothing is left to do.
+    """
+    pending = set()
+
+    async def enrich(business):
+        try:
+            info = await engine.enrich_site(business.url) if business.url else None
+            if info:
+                apply_site_info(business, info)
+        except Exception as e:
+            logging.error(f"Error enriching {business.url}: {str(e)}")
+        out_queue.put(business)
+
+    while keep_running() or not in_queue.empty() or pending:
+        if len(pending) >= max_in_flight:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            continue
+        try:
+            business = in_queue.get_nowait()
+        except Empty:
+            if pending:
+                await asyncio.wait(pending, timeout=0.5, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(0.5)
+            continue
+        task = asyncio.create_task(enrich(business))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
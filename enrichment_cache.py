@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+CACHE_PATH = os.path.join("cache", "enrichment_cache.sqlite3")
+CACHE_TTL = 30 * 24 * 3600  # Seconds before a domain is crawled again
+CACHE_MAX_ENTRIES = 200000  # Least recently used domains are evicted past this
+
+# Public suffixes with two labels, so "shop.co.uk" maps to "shop.co.uk" not "co.uk"
+SECOND_LEVEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk',
+    'com.au', 'net.au', 'org.au', 'co.nz', 'org.nz', 'co.za', 'co.jp',
+    'com.br', 'com.mx', 'com.ar', 'com.cn', 'com.sg', 'com.tr', 'co.in',
+    'ab.ca', 'bc.ca', 'mb.ca', 'nb.ca', 'nl.ca', 'ns.ca', 'nt.ca', 'nu.ca',
+    'on.ca', 'pe.ca', 'qc.ca', 'sk.ca', 'yk.ca',
+}
+
+# Site builders that give each business its own subdomain
+SHARED_HOSTING_DOMAINS = {
+    'wixsite.com', 'business.site', 'godaddysites.com', 'square.site', 'weebly.com',
+    'wordpress.com', 'blogspot.com', 'squarespace.com', 'webflow.io', 'carrd.co',
+    'netlify.app', 'myshopify.com', 'github.io',
+}
+
+# Platforms where the business is identified by the first path segment
+PATH_KEYED_DOMAINS = {
+    'facebook.com', 'instagram.com', 'linktr.ee', 'yelp.com', 'linkedin.com',
+    'twitter.com', 'x.com', 'tiktok.com', 'google.com',
+}
+
+
+def registered_domain(url) -> Optional[str]:
+    """Normalize a url or host to its registered domain, e.g. 'shop.example.com' -> 'example.com'"""
+    if not url:
+        return None
+    if '//' not in url:
+        url = '//' + url
+    host = (urlsplit(url).hostname or '').lower().rstrip('.')
+    if not host:
+        return None
+    labels = host.split('.')
+    if host.replace('.', '').isdigit() or len(labels) <= 2:
+        return host
+    if '.'.join(labels[-2:]) in SECOND_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def domain_key(url) -> Optional[str]:
+    """Cache key for a business website.
+
+    Usually the registered domain, so every branch of a chain shares one
+    entry. Sites on shared builders keep their own subdomain, and pages on
+    social platforms keep their first path segment.
+    """
+    domain = registered_domain(url)
+    if domain in SHARED_HOSTING_DOMAINS:
+        host = (urlsplit(url if '//' in url else '//' + url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+    if domain in PATH_KEYED_DOMAINS:
+        path = urlsplit(url if '//' in url else '//' + url).path.strip('/').split('/')[0].lower()
+        return f"{domain}/{path}" if path else domain
+    return domain
+
+
+class DomainCache:
+    """Persistent per-domain store of enrichment results.
+
+    Each row holds the emails and the social media, hours and category data
+    found for one domain (see ``domain_key``). Rows older than ``ttl`` are
+    treated as missing, and the least recently used rows are evicted once
+    the table grows past ``max_entries``. Safe to share between threads.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                emails TEXT,
+                social_media TEXT,
+                business_hours TEXT,
+                categories TEXT,
+                updated_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS domains_accessed ON domains (accessed_at)")
+        self.conn.commit()
+
+    def get(self, url) -> Optional[dict]:
+        """Return the cached record for a url's domain, or None if missing or expired"""
+        domain = domain_key(url)
+        if not domain:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT emails, social_media, business_hours, categories, updated_at "
+                "FROM domains WHERE domain = ?", (domain,)
+            ).fetchone()
+            if row is None or now - row[4] > self.ttl:
+                return None
+            self.conn.execute("UPDATE domains SET accessed_at = ? WHERE domain = ?", (now, domain))
+            self.conn.commit()
+        emails, social_media, business_hours, categories, _ = row
+        return {
+            'emails': json.loads(emails) if emails is not None else None,
+            'social_media': json.loads(social_media) if social_media is not None else None,
+            'business_hours': json.loads(business_hours) if business_hours is not None else None,
+            'categories': json.loads(categories) if categories is not None else None,
+        }
+
+    def put(self, url, emails=None, social_media=None, business_hours=None, categories=None):
+        """Store the results of a fresh crawl of a url's domain, replacing what was cached.
+
+        The whole row shares one timestamp, so no field outlives the TTL
+        by riding along with a newer crawl.
+        """
+        domain = domain_key(url)
+        if not domain:
+            return
+        now = time.time()
+        values = [json.dumps(value) if value is not None else None
+                  for value in (emails, social_media, business_hours, categories)]
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO domains
+                    (domain, emails, social_media, business_hours, categories, updated_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (domain, *values, now, now))
+            self.conn.commit()
+            self._writes += 1
+            # Checking the row count on every write is wasted work
+            if self._writes % 100 == 0:
+                self._evict()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM domains").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM domains WHERE domain IN "
+                "(SELECT domain FROM domains ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.conn.commit()
+            logging.info(f"Evicted {excess} domains from enrichment cache")
+
+    def evict(self):
+        """Drop expired rows and trim the table to ``max_entries``"""
+        with self.lock:
+            self.conn.execute("DELETE FROM domains WHERE updated_at < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+            self._evict()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> DomainCache:
+    """Process-wide cache shared by every enrichment thread"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DomainCache()
+            _default_cache.evict()
+        return _default_cache
@@ -0,0 +1,266 @@
+"""Fuzzy matching of business records that refer to the same place.
+
+Comparing every pair of records cannot scale to merged national exports,
+so records are first filed under blocking keys: their phone number, and
+the first letters of their name combined with their postal code or their
+house number. String similarity (difflib) only runs between records that
+share a block, which keeps each comparison set to a handful of rows.
+Names and addresses are normalized first, so "123 Main St., Suite 200"
+and "123 Main Street" compare equal.
+
+EntityResolver works incrementally as records arrive (DedupIndex uses it
+that way during a job), and resolve_file runs it over an existing CSV or
+Parquet export:
+    python entity_resolution.py output/plumbers_Texas_results.csv --dedupe
+"""
+import argparse
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from difflib import SequenceMatcher
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from dedup import normalize_address, normalize_phone, normalize_text, place_identity, postal_code
+
+NAME_THRESHOLD = 0.85  # Name similarity needed along with a matching address
+ADDRESS_THRESHOLD = 0.85  # Address similarity that counts as the same location
+PHONE_NAME_THRESHOLD = 0.6  # Name similarity enough when the phone numbers agree
+NAME_PREFIX_LENGTH = 4  # Letters of the first name token in the postal code block key
+MAX_BLOCK_SIZE = 500  # Larger blocks are too generic to be worth comparing against
+BATCH_CHUNK_ROWS = 100000  # CSV rows read at a time by resolve_file
+
+# Words that say nothing about which business a record is
+NAME_STOPWORDS = {'the', 'and', 'of', 'inc', 'llc', 'ltd', 'co', 'corp', 'company', 'incorporated', 'pllc'}
+
+
+class Entry(NamedTuple):
+    name: str
+    tokens: frozenset
+    address: str
+    phone: Optional[str]
+    postal_code: Optional[str]
+    place: Optional[str]
+
+
+def _field(record, name):
+    if isinstance(record, Mapping):
+        value = record.get(name)
+    else:
+        value = getattr(record, name, None)
+    # Empty CSV cells come back from pandas as NaN
+    return value if isinstance(value, str) else None
+
+
+def make_entry(record) -> Entry:
+    """Normalized name, address, phone and postal code of a Business or a dict of its fields"""
+    # "Joe's" and "Joes" should share a block
+    name = (_field(record, 'name') or '').replace("'", '').replace('\u2019', '')
+    tokens = [token for token in normalize_text(name).split() if token not in NAME_STOPWORDS]
+    address = _field(record, 'address')
+    return Entry(
+        name=' '.join(tokens),
+        tokens=frozenset(tokens),
+        address=normalize_address(address),
+        phone=normalize_phone(_field(record, 'phone_number')),
+        postal_code=postal_code(address),
+        place=place_identity(_field(record, 'place_url')),
+    )
+
+
+def blocking_keys(entry: Entry) -> List[str]:
+    keys = []
+    if entry.phone:
+        keys.append(f"phone:{entry.phone}")
+    if not entry.name:
+        return keys
+    prefix = entry.name.replace(' ', '')[:NAME_PREFIX_LENGTH]
+    if entry.postal_code:
+        keys.append(f"postal:{entry.postal_code}:{prefix}")
+    # House number, for records where one side lacks the postal code
+    if entry.address:
+        keys.append(f"street:{entry.address.split()[0]}:{prefix}")
+    return keys
+
+
+def similar(left, right, threshold) -> bool:
+    """True if difflib rates two strings at least ``threshold`` alike"""
+    if not left or not right:
+        return False
+    if left == right:
+        return True
+    matcher = SequenceMatcher(None, left, right)
+    # The quick ratios are cheap upper bounds of ratio(); most pairs fail on them
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+
+def house_number(address) -> Optional[str]:
+    """Leading number of a normalized address, such as 1200 or 12b"""
+    first = address.split(' ', 1)[0] if address else ''
+    return first if first[:1].isdigit() else None
+
+
+def same_location(left, right) -> bool:
+    # "12 main street" and "21 main street" are as alike as strings go, but a block apart
+    left_number, right_number = house_number(left), house_number(right)
+    if left_number and right_number and left_number != right_number:
+        return False
+    # "123 main street denver" is the same place as "123 main street denver co 80202"
+    if left and right and (left.startswith(right) or right.startswith(left)):
+        return True
+    return similar(left, right, ADDRESS_THRESHOLD)
+
+
+def is_match(left: Entry, right: Entry) -> bool:
+    """True if two entries look like the same business"""
+    if not left.name or not right.name:
+        return False
+    if left.postal_code and right.postal_code and left.postal_code != right.postal_code:
+        return False
+    # Two Maps listings are two places, however alike; chain locations even share phone numbers
+    if left.place and right.place and left.place != right.place:
+        return False
+    if left.phone and left.phone == right.phone and similar(left.name, right.name, PHONE_NAME_THRESHOLD):
+        return True
+    if not same_location(left.address, right.address):
+        return False
+    # One name's words contained in the other's, e.g. "Joe's Pizza" and "Joe's Pizza Downtown"
+    return (left.tokens <= right.tokens or right.tokens <= left.tokens
+            or similar(left.name, right.name, NAME_THRESHOLD))
+
+
+class EntityResolver:
+    """Groups records into entities as they are added.
+
+    Each record is compared only with the records sharing one of its
+    blocking keys. A record matching several entities joins them into the
+    oldest one (union-find), so ``entity`` of an earlier record can change
+    as more arrive. Safe to share between threads.
+    """
+
+    def __init__(self, max_block=MAX_BLOCK_SIZE):
+        self.max_block = max_block
+        self.entries: List[Entry] = []
+        self.parents: List[int] = []
+        self.blocks: Dict[str, List[int]] = {}
+        self.lock = threading.Lock()
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _find(self, index) -> int:
+        root = index
+        while self.parents[root] != root:
+            root = self.parents[root]
+        # Path compression keeps later lookups flat
+        while self.parents[index] != root:
+            self.parents[index], index = root, self.parents[index]
+        return root
+
+    def _matches(self, entry, keys) -> List[int]:
+        matched = set()
+        compared = set()
+        for key in keys:
+            block = self.blocks.get(key, ())
+            if len(block) >= self.max_block:
+                continue
+            for index in block:
+                if index in compared:
+                    continue
+                compared.add(index)
+                if is_match(entry, self.entries[index]):
+                    matched.add(self._find(index))
+        self.comparisons += len(compared)
+        return sorted(matched)
+
+    def match(self, record) -> Optional[int]:
+        """Entity an incoming record belongs to, without adding it; None if it is new"""
+        entry = make_entry(record)
+        with self.lock:
+            matched = self._matches(entry, blocking_keys(entry))
+        return matched[0] if matched else None
+
+    def add(self, record) -> int:
+        """Add a record and return the id of the entity it belongs to"""
+        entry = make_entry(record)
+        keys = blocking_keys(entry)
+        with self.lock:
+            matched = self._matches(entry, keys)
+            index = len(self.entries)
+            self.entries.append(entry)
+            self.parents.append(index)
+            for key in keys:
+                block = self.blocks.setdefault(key, [])
+                if len(block) < self.max_block:
+                    block.append(index)
+            if not matched:
+                return index
+            for root in matched:
+                self.parents[root] = matched[0]
+            self.parents[index] = matched[0]
+            return matched[0]
+
+    def entity(self, index) -> int:
+        """Current entity id of the record added ``index``-th"""
+        with self.lock:
+            return self._find(index)
+
+
+def _read_chunks(path, chunksize):
+    if path.endswith('.parquet'):
+        yield pd.read_parquet(path)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str)
+
+
+def resolve_file(path, output=None, dedupe=False, chunksize=BATCH_CHUNK_ROWS) -> str:
+    """Add an entity_id column to a CSV or Parquet export; ``dedupe`` keeps one row per entity.
+
+    CSV input is read in chunks twice: once to build the entities and once
+    to write the rows, so the export never has to fit in memory. Returns
+    the path written, by default next to the input.
+    """
+    if output is None:
+        root, extension = os.path.splitext(path)
+        output = f"{root}_{'deduped' if dedupe else 'entities'}{extension}"
+    resolver = EntityResolver()
+    for chunk in _read_chunks(path, chunksize):
+        for record in chunk.to_dict('records'):
+            resolver.add(record)
+    logging.info(f"Resolved {len(resolver)} records with {resolver.comparisons} comparisons")
+
+    written = set()
+    row = 0
+    frames = []
+    for i, chunk in enumerate(_read_chunks(path, chunksize)):
+        chunk = chunk.assign(entity_id=[resolver.entity(index) for index in range(row, row + len(chunk))])
+        row += len(chunk)
+        if dedupe:
+            keep = ~chunk['entity_id'].duplicated() & ~chunk['entity_id'].isin(written)
+            chunk = chunk[keep]
+            written.update(chunk['entity_id'])
+        if output.endswith('.parquet'):
+            frames.append(chunk)
+        else:
+            chunk.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    if output.endswith('.parquet'):
+        pd.concat(frames, ignore_index=True).to_parquet(output, index=False)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='CSV or Parquet export, with name, address and phone_number columns')
+    parser.add_argument('--output', help='Where to write the result (default: next to the input)')
+    parser.add_argument('--dedupe', action='store_true', help='Keep only the first row of each entity')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(resolve_file(args.path, args.output, args.dedupe))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+HOST_RATE = 1.0  # Sustained requests per second to any one host
+HOST_BURST = 2  # Requests a host that has been quiet may receive back to back
+MAX_CONCURRENT_REQUESTS = 400  # Requests in flight across all hosts
+IDLE_BUCKET_TTL = 300  # Seconds before an idle host's bucket is forgotten
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    ``reserve`` always takes a token and returns how long the caller must
+    wait for it, letting the balance go negative. Callers on one event
+    loop are therefore served strictly in arrival order.
+    """
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def reserve(self, now=None) -> float:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(now, self.updated)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostScheduler:
+    """Politeness for many hosts at once.
+
+    Every host gets its own token bucket, so only repeat hits on the same
+    host are spaced out. Requests to different hosts go straight through,
+    subject only to a global concurrency limit. Use from a single event loop.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_REQUESTS, rate=HOST_RATE, burst=HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self._global = asyncio.Semaphore(max_concurrent)
+        self._last_prune = time.monotonic()
+
+    @staticmethod
+    def host_of(url):
+        host = (urlsplit(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def delay_for(self, url) -> float:
+        """Reserve a request to ``url``'s host and return the wait before sending it"""
+        now = time.monotonic()
+        if now - self._last_prune > IDLE_BUCKET_TTL:
+            self._prune(now)
+        host = self.host_of(url)
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.rate, self.burst, now)
+        return bucket.reserve(now)
+
+    def _prune(self, now):
+        # A bucket idle this long is full again, so dropping it changes nothing
+        self.buckets = {host: bucket for host, bucket in self.buckets.items()
+                        if now - bucket.updated < IDLE_BUCKET_TTL}
+        self._last_prune = now
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """Wait for the host's turn, then hold one of the global request slots"""
+        delay = self.delay_for(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with self._global:
+            yield
@@ -0,0 +1,262 @@
+"""Crash-safe record of a scraping job, so an interrupted run can resume.
+
+A job is identified by its search term, location, result count and
+query plan (``job_id``), so running the same search again finds the
+journal of the earlier run. The journal holds every sub-query the planner
+issued and the number of results it listed, and every place found along
+with how far it got: queued for a detail browser, detailed and waiting
+for enrichment, or done. A resumed run reloads the finished businesses,
+hands the unfinished ones back to their stage and only searches the
+sub-queries never run, so no browser or HTTP work is repeated. Only jobs
+that never finished and started less than JOB_RESUME_TTL ago are resumed;
+anything else starts over, since its results have gone stale.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Dict, List
+
+from query_planner import SubQuery
+from viewport_search import Tile
+
+JOURNAL_PATH = os.path.join("jobs", "job_journal.sqlite3")
+JOB_RESUME_TTL = 24 * 3600  # Seconds after its start that an unfinished job may still be resumed
+
+QUEUED = 'queued'  # Work unit waiting for a detail browser
+DETAILED = 'detailed'  # Business read from Maps, waiting for enrichment
+DONE = 'done'  # Business handed to the results
+
+
+def job_id(search_query, location, total_results, plan) -> str:
+    """Stable id of a job; the result count is part of it because it decides the query plan"""
+    key = json.dumps([search_query.strip().lower(), location.strip().lower(), total_results, plan])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _sub_query_key(sub_query: SubQuery) -> str:
+    return sub_query.url or sub_query.text
+
+
+class JobJournal:
+    """SQLite journal of one job's sub-queries and places.
+
+    Every write is committed before the work it records is passed on, and
+    the database runs in WAL mode, so a crash loses at most the step in
+    flight. Safe to share between threads; pickles down to its path and
+    job id, so worker processes open their own connection to it.
+    """
+
+    def __init__(self, job, path=JOURNAL_PATH):
+        self.job = job
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = self._connect()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # Worker processes write too; wait for their transactions instead of failing
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sub_queries (
+                job_id TEXT NOT NULL,
+                sub_query_key TEXT NOT NULL,
+                term TEXT NOT NULL,
+                location TEXT NOT NULL,
+                postal_code TEXT,
+                url TEXT,
+                tile TEXT,
+                listed INTEGER,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, sub_query_key)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS places (
+                job_id TEXT NOT NULL,
+                place_key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                place_url TEXT,
+                work TEXT,
+                business TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, place_key)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS places_url ON places (job_id, place_url)")
+        conn.commit()
+        return conn
+
+    def __getstate__(self):
+        return {'job': self.job, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['job'], state['path'])
+
+    # Job
+
+    def start(self):
+        """Record the job's start, unless a run of it is already on record"""
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO jobs (job_id, started_at) VALUES (?, ?)",
+                              (self.job, time.time()))
+            self.conn.commit()
+
+    def finish(self):
+        """Mark the job complete, so its next run starts from scratch"""
+        with self.lock:
+            self.conn.execute("UPDATE jobs SET finished_at = ? WHERE job_id = ?", (time.time(), self.job))
+            self.conn.commit()
+
+    def resumable(self, ttl=JOB_RESUME_TTL) -> bool:
+        """True if an earlier run started within ``ttl`` seconds and never finished"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT started_at, finished_at FROM jobs WHERE job_id = ?", (self.job,)
+            ).fetchone()
+        return row is not None and row[1] is None and time.time() - row[0] < ttl
+
+    # Sub-queries
+
+    def plan(self, sub_queries: List[SubQuery]):
+        """Record sub-queries the planner has handed out"""
+        now = time.time()
+        rows = [(self.job, _sub_query_key(sub_query), sub_query.term, sub_query.location,
+                 sub_query.postal_code, sub_query.url,
+                 json.dumps([sub_query.tile.south, sub_query.tile.west, sub_query.tile.north,
+                             sub_query.tile.east, sub_query.tile.depth]) if sub_query.tile else None,
+                 now)
+                for sub_query in sub_queries]
+        with self.lock:
+            self.conn.executemany("""
+                INSERT OR IGNORE INTO sub_queries
+                    (job_id, sub_query_key, term, location, postal_code, url, tile, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self.conn.commit()
+
+    def search_done(self, sub_query: SubQuery, listed: int, follow_ups: List[SubQuery]):
+        """Record a finished search together with the sub-queries it led to"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE sub_queries SET listed = ?, updated_at = ? WHERE job_id = ? AND sub_query_key = ?",
+                (listed, time.time(), self.job, _sub_query_key(sub_query))
+            )
+            self.conn.commit()
+        # A crash in between only leaves a search to run again, never a tile lost
+        if follow_ups:
+            self.plan(follow_ups)
+
+    @property
+    def planned(self) -> bool:
+        """True once an earlier run of this job has recorded its plan"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM sub_queries WHERE job_id = ? LIMIT 1", (self.job,)
+            ).fetchone()
+        return row is not None
+
+    def sub_queries(self, pending_only=False) -> List[SubQuery]:
+        """Sub-queries handed out, in the order they were planned; ``pending_only`` skips finished ones"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT term, location, postal_code, url, tile FROM sub_queries "
+                "WHERE job_id = ?" + (" AND listed IS NULL" if pending_only else "") + " ORDER BY rowid",
+                (self.job,)
+            ).fetchall()
+        return [SubQuery(term, location, postal_code, url, Tile(*json.loads(tile)) if tile else None)
+                for term, location, postal_code, url, tile in rows]
+
+    def pending_sub_queries(self) -> List[SubQuery]:
+        """Sub-queries handed out but never finished, in the order they were planned"""
+        return self.sub_queries(pending_only=True)
+
+    # Places
+
+    def place_queued(self, key, work: dict):
+        """Record a place found by a search, with the work unit that reads its details"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO places (job_id, place_key, stage, place_url, work, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.job, key, QUEUED, work.get('href'), json.dumps(work), time.time())
+            )
+            self.conn.commit()
+
+    def place_detailed(self, key, business):
+        """Record a business read from Maps; enrichment may still add to it"""
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO places (job_id, place_key, stage, place_url, business, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job_id, place_key) DO UPDATE SET
+                    stage = excluded.stage,
+                    place_url = excluded.place_url,
+                    business = excluded.business,
+                    updated_at = excluded.updated_at
+            """, (self.job, key, DETAILED, business.place_url, json.dumps(asdict(business)), time.time()))
+            self.conn.commit()
+
+    def place_done(self, business):
+        """Record a finished business, found by its place URL"""
+        if not business.place_url:
+            return
+        with self.lock:
+            self.conn.execute(
+                "UPDATE places SET stage = ?, business = ?, updated_at = ? WHERE job_id = ? AND place_url = ?",
+                (DONE, json.dumps(asdict(business)), time.time(), self.job, business.place_url)
+            )
+            self.conn.commit()
+
+    def place_keys(self) -> List[str]:
+        """Every place an earlier run found, whatever its stage"""
+        with self.lock:
+            rows = self.conn.execute("SELECT place_key FROM places WHERE job_id = ?", (self.job,)).fetchall()
+        return [key for key, in rows]
+
+    def places(self, stage) -> List[Dict]:
+        """Work units (QUEUED) or business fields (DETAILED, DONE) of the places at a stage"""
+        column = 'work' if stage == QUEUED else 'business'
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {column} FROM places WHERE job_id = ? AND stage = ? ORDER BY rowid",
+                (self.job, stage)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def clear(self):
+        """Forget this job, so the next run starts from scratch"""
+        with self.lock:
+            removed = sum(self.conn.execute(f"DELETE FROM {table} WHERE job_id = ?", (self.job,)).rowcount
+                          for table in ('jobs', 'sub_queries', 'places'))
+            self.conn.commit()
+        if removed:
+            logging.info(f"Cleared journal of job {self.job}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_journal(search_query, location, total_results, plan, resume=True, path=JOURNAL_PATH,
+                 ttl=JOB_RESUME_TTL) -> JobJournal:
+    """Journal of a job; earlier progress is kept only with ``resume`` and while ``resumable``"""
+    journal = JobJournal(job_id(search_query, location, total_results, plan), path)
+    if not resume or not journal.resumable(ttl):
+        journal.clear()
+    journal.start()
+    return journal
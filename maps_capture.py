@@ -0,0 +1,193 @@
+"""Read Google Maps results out of the page's own network traffic.
+
+The results feed is filled from XHR payloads (``/search?tbm=map`` for
+result pages, ``/maps/preview/place`` for single places) that already hold
+everything process_business clicks through the UI for. With Chrome's
+performance log enabled, NetworkCapture collects those payloads while the
+feed scrolls and decode_payload turns them into plain business dicts.
+
+Decode a recorded payload with:
+    python maps_capture.py payload.json
+"""
+import base64
+import json
+import logging
+import os
+import re
+import sys
+import time
+from typing import Iterator, List, Optional
+
+# XHRs that carry place data
+PAYLOAD_URL_PATTERN = re.compile(r'/search\?tbm=map|/maps/preview/place|/maps/search\?')
+
+# Anti-JSON-hijacking prefix Google puts in front of every payload
+XSSI_PREFIX = ")]}'"
+
+PLACE_ID_PATTERN = re.compile(r'^0x[0-9a-f]+:0x[0-9a-f]+$')
+
+
+def enable_performance_logging(options):
+    """Ask chromedriver to keep DevTools network events in the performance log"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def _get(data, *path):
+    """Index into nested lists, returning None on any missing level"""
+    for key in path:
+        if not isinstance(data, list) or not isinstance(key, int) or key >= len(data):
+            return None
+        data = data[key]
+    return data
+
+
+def _loads(text):
+    text = text.strip()
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):].lstrip()
+    # Search responses carry a trailing /*""*/ after the JSON
+    return json.JSONDecoder().raw_decode(text)[0]
+
+
+def _is_place(node):
+    return (isinstance(node, list) and len(node) > 11 and
+            isinstance(node[10], str) and PLACE_ID_PATTERN.match(node[10]) and
+            isinstance(node[11], str))
+
+
+def _find_places(node, found, depth=0):
+    """Collect every place record in a payload, wherever the layout put it"""
+    if not isinstance(node, list) or depth > 12:
+        return
+    if _is_place(node):
+        found.append(node)
+        return
+    for child in node:
+        _find_places(child, found, depth + 1)
+
+
+def decode_place(place) -> dict:
+    """Map one place record onto Business field names"""
+    place_id = place[10]
+    # The second half of the place id is the listing's CID, which makes a stable link
+    cid = int(place_id.split(':')[1], 16)
+    address = _get(place, 39)
+    if not address:
+        parts = _get(place, 2)
+        address = ', '.join(parts) if isinstance(parts, list) else None
+    categories = _get(place, 13)
+    return {
+        'name': place[11],
+        'address': address,
+        'url': _get(place, 7, 0),
+        'phone_number': _get(place, 178, 0, 0),
+        'reviews_count': _get(place, 4, 8),
+        'reviews_average': _get(place, 4, 7),
+        'categories': [c for c in categories if isinstance(c, str)] if isinstance(categories, list) else [],
+        'place_id': place_id,
+        'place_url': f"https://www.google.com/maps?cid={cid}",
+        'latitude': _get(place, 9, 2),
+        'longitude': _get(place, 9, 3),
+    }
+
+
+def decode_payload(text) -> List[dict]:
+    """Decode a search or place XHR body into business dicts, in feed order"""
+    try:
+        data = _loads(text)
+    except ValueError:
+        return []
+    # Search responses wrap the real payload as a string under "d"
+    if isinstance(data, dict) and isinstance(data.get('d'), str):
+        try:
+            data = _loads(data['d'])
+        except ValueError:
+            return []
+
+    places = []
+    _find_places(data, places)
+    records = []
+    seen = set()
+    for place in places:
+        try:
+            record = decode_place(place)
+        except (TypeError, ValueError, IndexError) as e:
+            logging.debug("Skipping undecodable place: %s", str(e))
+            continue
+        if record['place_id'] not in seen:
+            seen.add(record['place_id'])
+            records.append(record)
+    return records
+
+
+class NetworkCapture:
+    """Collect Maps data payloads from a driver's DevTools performance log.
+
+    The driver must be created with enable_performance_logging. Each call
+    to ``poll`` drains the log and returns the businesses decoded from
+    payloads that finished loading since the last call. With ``record_dir``
+    every raw payload is also saved there, for use as a test fixture.
+    """
+
+    def __init__(self, driver, record_dir=None):
+        self.driver = driver
+        self.record_dir = record_dir
+        self.pending = {}  # requestId -> url of payloads still loading
+        self.payloads = 0
+        if record_dir and not os.path.exists(record_dir):
+            os.makedirs(record_dir)
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        # Drop events left over from whatever the driver did before
+        self.driver.get_log('performance')
+
+    def _events(self) -> Iterator[dict]:
+        for entry in self.driver.get_log('performance'):
+            try:
+                yield json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+
+    def _body(self, request_id) -> Optional[str]:
+        try:
+            response = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception as e:
+            logging.debug("No body for request %s: %s", request_id, str(e))
+            return None
+        body = response.get('body')
+        if body and response.get('base64Encoded'):
+            # Chrome hands over bodies it does not take for text as base64
+            try:
+                body = base64.b64decode(body).decode('utf-8')
+            except ValueError as e:
+                logging.debug("Undecodable body for request %s: %s", request_id, str(e))
+                return None
+        return body
+
+    def poll(self) -> List[dict]:
+        records = []
+        for event in self._events():
+            method = event.get('method')
+            params = event.get('params', {})
+            if method == 'Network.responseReceived':
+                url = params.get('response', {}).get('url', '')
+                if PAYLOAD_URL_PATTERN.search(url):
+                    self.pending[params['requestId']] = url
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self.pending:
+                self.pending.pop(params['requestId'])
+                body = self._body(params['requestId'])
+                if not body:
+                    continue
+                self.payloads += 1
+                if self.record_dir:
+                    path = os.path.join(self.record_dir, f"payload_{int(time.time() * 1000)}_{self.payloads}.json")
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(body)
+                records.extend(decode_payload(body))
+        return records
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for record in decode_payload(f.read()):
+                print(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,153 @@
+"""JavaScript helpers that read the Maps results feed in one WebDriver call.
+
+Looking cards up element by element costs a WebDriver round trip per card
+and per fallback selector. These snippets run inside the page instead and
+hand back plain data.
+"""
+import re
+
+# Returns every card in the feed as {name, href, rating, reviews, category}
+EXTRACT_CARDS_JS = r"""
+const feed = document.querySelector('div[role="feed"]') || document;
+const cards = [];
+const seen = new Set();
+for (const node of feed.querySelectorAll('div.Nv2PK, div[role="article"]')) {
+    const card = node.closest('div.Nv2PK') || node;
+    if (seen.has(card)) continue;
+    seen.add(card);
+
+    const link = card.querySelector('a[href*="/maps/place"]');
+    const heading = card.querySelector(
+        'div.fontHeadlineSmall, span.fontHeadlineSmall, div.qBF1Pd, div[role="heading"]'
+    );
+    let name = heading ? heading.textContent.trim() : '';
+    if (!name && link) name = (link.getAttribute('aria-label') || '').trim();
+    if (!name) continue;
+
+    const stars = card.querySelector('span[role="img"][aria-label]');
+    const rating = card.querySelector('span.MW4etd');
+    const reviews = card.querySelector('span.UY7F9');
+
+    // The first plain text span in the details block is the category
+    let category = null;
+    for (const span of card.querySelectorAll('div.W4Efsd span')) {
+        const text = span.textContent.trim();
+        if (span.children.length === 0 && text && text !== '·' && !/^[\d(.,]/.test(text)) {
+            category = text;
+            break;
+        }
+    }
+
+    cards.push({
+        name: name,
+        href: link ? link.href : null,
+        rating: rating ? rating.textContent : null,
+        reviews: reviews ? reviews.textContent : null,
+        stars: stars ? stars.getAttribute('aria-label') : null,
+        category: category
+    });
+}
+return cards;
+"""
+
+NUMBER_PATTERN = re.compile(r'\d[\d,.]*')
+
+# Place ids are embedded in card links as !1s0x...:0x...
+HREF_PLACE_ID_PATTERN = re.compile(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)')
+
+
+def _number(text, cast):
+    if not text:
+        return None
+    match = NUMBER_PATTERN.search(text)
+    if not match:
+        return None
+    digits = match.group(0)
+    # Thousands separators vary by locale; ratings only ever have one decimal
+    digits = re.sub(r'[,.]', '', digits) if cast is int else digits.replace(',', '.')
+    try:
+        return cast(digits)
+    except ValueError:
+        return None
+
+
+def parse_card(raw) -> dict:
+    """Normalize a card from EXTRACT_CARDS_JS, e.g. rating '4,5' -> 4.5, reviews '(1,204)' -> 1204"""
+    rating = _number(raw.get('rating'), float)
+    reviews = _number(raw.get('reviews'), int)
+    # Fall back to the star icon's label, e.g. "4.5 stars 1,204 Reviews"
+    stars = raw.get('stars') or ''
+    if rating is None and 'star' in stars:
+        rating = _number(stars, float)
+    if reviews is None and 'review' in stars.lower():
+        numbers = NUMBER_PATTERN.findall(stars)
+        if len(numbers) > 1:
+            reviews = _number(numbers[1], int)
+    return {
+        'name': raw['name'],
+        'href': raw.get('href'),
+        'rating': rating,
+        'reviews': reviews,
+        'category': raw.get('category'),
+    }
+
+
+def place_key(href):
+    """Stable identity of a card link: its place id, or the URL without tracking parameters"""
+    if not href:
+        return None
+    match = HREF_PLACE_ID_PATTERN.search(href)
+    return match.group(1) if match else href.split('?', 1)[0]
+
+
+def extract_cards(driver):
+    """Every result card currently in the feed, in a single round trip"""
+    return [parse_card(raw) for raw in driver.execute_script(EXTRACT_CARDS_JS) or []]
+
+
+# Scrolls the feed, then resolves once it holds more than arguments[1] result
+# links or shows its end-of-list marker, or after arguments[2] milliseconds
+WAIT_FOR_FEED_JS = r"""
+const feed = arguments[0];
+const known = arguments[1];
+const timeout = arguments[2];
+const done = arguments[arguments.length - 1];
+
+const count = () => feed.querySelectorAll('a[href*="/maps/place"]').length;
+const atEnd = () => !!feed.querySelector('span.HlvSq') ||
+    /end of the list/i.test(feed.lastElementChild ? feed.lastElementChild.textContent : '');
+const finish = (timedOut) => done({count: count(), end: atEnd(), timed_out: timedOut});
+
+feed.scrollTop = feed.scrollHeight;
+if (count() > known || atEnd()) {
+    finish(false);
+    return;
+}
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (count() > known || atEnd()) {
+        observer.disconnect();
+        clearTimeout(timer);
+        finish(false);
+    }
+});
+observer.observe(feed, {childList: true, subtree: true});
+timer = setTimeout(() => {
+    observer.disconnect();
+    finish(true);
+}, timeout);
+"""
+
+FEED_WAIT_TIMEOUT = 8  # Seconds to wait for a scroll to load more results
+
+
+def wait_for_new_cards(driver, feed, known_count, timeout=FEED_WAIT_TIMEOUT) -> dict:
+    """Scroll the feed and return {count, end, timed_out} as soon as it changes.
+
+    Returns immediately once more than ``known_count`` result links are
+    loaded or the end-of-list marker shows, and after ``timeout`` seconds
+    at the latest.
+    """
+    driver.set_script_timeout(timeout + 5)
+    state = driver.execute_async_script(WAIT_FOR_FEED_JS, feed, known_count, int(timeout * 1000))
+    return state or {'count': known_count, 'end': False, 'timed_out': True}
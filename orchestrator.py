@@ -0,0 +1,272 @@
+"""Run a scraping job with every browser worker in its own OS process.
+
+get_business_data runs search, detail and enrichment as threads of the
+Streamlit process, where they share one GIL with page parsing and
+pd.json_normalize. run_job runs the same stage functions in spawned
+worker processes instead, passing work units and Business records over
+multiprocessing queues, and scales the number of detail browsers with
+the machine's cores.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import psutil
+
+from dedup import DedupIndex
+from driver_pool import DriverPool
+from MultiThreadVersion import (
+    BusinessList, DRIVER_MAX_PLACES, DRIVER_MAX_RSS_MB,
+    CAPTURE_MODE, DRIVER_RELEASE_TIMEOUT, FUZZY_DEDUP, JOB_TIMEOUT, MAX_ENRICH_WORKERS, QUERY_PLAN,
+    create_pooled_driver, drain_processed, finish_job, make_planner, parallel_enrich, parallel_process, parallel_search,
+    plan_searches, proxy_retire_reason, resume_work, search_finished, search_worker_count, start_job,
+)
+from entity_resolution import EntityResolver
+from job_journal import open_journal
+
+MIN_DETAIL_PROCESSES = 1
+MAX_DETAIL_PROCESSES = 16  # Each one is a Chrome instance; memory runs out before cores do
+
+
+def default_detail_processes():
+    """One detail browser per core, leaving one core for search and the parent process"""
+    cores = os.cpu_count() or 2
+    return max(MIN_DETAIL_PROCESSES, min(MAX_DETAIL_PROCESSES, cores - 1))
+
+
+class SharedSet:
+    """The slice of set that DedupIndex.claim uses, on a Manager dict every process can see"""
+
+    def __init__(self, manager):
+        self._items = manager.dict()
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        self._items[item] = True
+
+
+class IPCBusinessQueue:
+    """BusinessQueue's interface on multiprocessing primitives.
+
+    The stage functions in MultiThreadVersion only touch the queues, the
+    flags and the processed count, so they run unchanged in a worker
+    process that is handed one of these.
+    """
+
+    def __init__(self, ctx, manager, total_results):
+        self.sub_queries = ctx.Queue()
+        self.search_reports = ctx.Queue()
+        # Claims are shared by every search process; the results side lives in the parent
+        self.dedup = DedupIndex(places=SharedSet(manager), lock=ctx.Lock(),
+                                resolver=EntityResolver() if FUZZY_DEDUP else None)
+        self.journal = None  # Pickled to each worker, which reopens it
+        self.to_process = ctx.Queue(maxsize=total_results * 2)
+        self.to_enrich = ctx.Queue(maxsize=total_results * 2)
+        self.processed = ctx.Queue(maxsize=total_results * 2)
+        self.stopped = ctx.Event()
+        self.total_results = total_results
+        self.search_lock = ctx.Lock()
+        self.process_lock = ctx.Lock()
+        # Shared flags; guarded by process_lock where they are read-modify-written
+        self._searching = ctx.Value('b', True, lock=False)
+        self._processing = ctx.Value('b', True, lock=False)
+        self._processed_count = ctx.Value('i', 0, lock=False)
+        self._active_searches = ctx.Value('i', 0, lock=False)
+        self._planning = ctx.Value('b', True, lock=False)
+
+    @property
+    def is_searching(self):
+        return bool(self._searching.value)
+
+    @is_searching.setter
+    def is_searching(self, value):
+        self._searching.value = bool(value)
+
+    @property
+    def is_processing(self):
+        return bool(self._processing.value)
+
+    @is_processing.setter
+    def is_processing(self, value):
+        self._processing.value = bool(value)
+
+    @property
+    def processed_count(self):
+        return self._processed_count.value
+
+    @processed_count.setter
+    def processed_count(self, value):
+        self._processed_count.value = value
+
+    @property
+    def is_planning(self):
+        return bool(self._planning.value)
+
+    @is_planning.setter
+    def is_planning(self, value):
+        self._planning.value = bool(value)
+
+    @property
+    def active_searches(self):
+        return self._active_searches.value
+
+    @active_searches.setter
+    def active_searches(self, value):
+        self._active_searches.value = value
+
+
+def _launch_driver(launch_lock):
+    # undetected_chromedriver patches its binary on startup; one launch at a time across processes
+    with launch_lock:
+        return create_pooled_driver()
+
+
+def _worker_pool(launch_lock):
+    # A one-browser pool gives a worker the same recycling as in threaded mode
+    pool = DriverPool(
+        1,
+        lambda: _launch_driver(launch_lock),
+        max_rss=DRIVER_MAX_RSS_MB * 1024 * 1024,
+        max_uses=DRIVER_MAX_PLACES,
+        retire_check=proxy_retire_reason
+    )
+    pool.start()
+    return pool
+
+
+def _close_pool(pool, drivers):
+    pool.close()
+    for driver in drivers:
+        if driver is not None:
+            DriverPool._quit(driver)
+
+
+def _search_worker(queue, launch_lock, worker_id):
+    pool = _worker_pool(launch_lock)
+    try:
+        drivers = [pool.acquire()]
+    except Exception as e:
+        logging.error("Search process %d could not start a browser: %s", worker_id, str(e))
+        pool.close()
+        search_finished(queue)
+        return
+    try:
+        parallel_search(pool, drivers, 0, queue, worker_id)
+    finally:
+        _close_pool(pool, drivers)
+
+
+def _detail_worker(queue, launch_lock, worker_id):
+    pool = _worker_pool(launch_lock)
+    try:
+        drivers = [pool.acquire()]
+    except Exception as e:
+        logging.error("Detail process %d could not start a browser: %s", worker_id, str(e))
+        pool.close()
+        return
+    try:
+        parallel_process(pool, drivers, 0, queue, worker_id)
+    finally:
+        _close_pool(pool, drivers)
+
+
+def _enrich_worker(queue, worker_id):
+    parallel_enrich(queue, worker_id)
+
+
+def _terminate(worker):
+    """Stop a stuck worker process along with the chromedriver and Chrome processes it started"""
+    try:
+        children = psutil.Process(worker.pid).children(recursive=True)
+    except psutil.Error:
+        children = []
+    worker.terminate()
+    for child in children:
+        try:
+            child.kill()
+        except psutil.Error:
+            continue
+
+
+def run_job(search_query, location, total_results, progress_callback=None,
+            detail_processes=None, enrich_workers=MAX_ENRICH_WORKERS,
+            enrich_in_processes=True, timeout=JOB_TIMEOUT, resume=True) -> BusinessList:
+    """Drop-in for get_business_data with browsers (and enrichment) in worker processes"""
+    ctx = multiprocessing.get_context('spawn')  # Forking a process with live threads and browsers is unsafe
+    if detail_processes is None:
+        detail_processes = default_detail_processes()
+    if CAPTURE_MODE != 'dom':
+        detail_processes = 0
+
+    planner = make_planner(search_query, location, total_results)
+    journal = open_journal(search_query, location, total_results, f"{QUERY_PLAN}/{CAPTURE_MODE}", resume)
+    business_list = BusinessList()
+    manager = ctx.Manager()
+    queue = IPCBusinessQueue(ctx, manager, total_results)
+    finished = start_job(queue, planner, journal)
+    business_list.business_list.extend(finished)
+    if len(business_list.business_list) >= total_results:
+        manager.shutdown()
+        journal.finish()
+        journal.close()
+        return business_list
+    search_processes = search_worker_count(planner)
+    queue.active_searches = search_processes + 1  # resume_work is the last "search"
+    queue.is_searching = True
+    launch_lock = ctx.Lock()
+
+    searches = [ctx.Process(target=_search_worker, args=(queue, launch_lock, i),
+                            name=f'search-{i}', daemon=True)
+                for i in range(search_processes)]
+    details = [ctx.Process(target=_detail_worker, args=(queue, launch_lock, i),
+                           name=f'detail-{i}', daemon=True)
+               for i in range(detail_processes)]
+    if enrich_in_processes:
+        enrichers = [ctx.Process(target=_enrich_worker, args=(queue, i), name=f'enrich-{i}', daemon=True)
+                     for i in range(enrich_workers)]
+    else:
+        enrichers = [threading.Thread(target=parallel_enrich, args=(queue, i), daemon=True)
+                     for i in range(enrich_workers)]
+    workers = searches + details + enrichers
+    for worker in workers:
+        worker.start()
+    logging.info("Started %d detail and %d enrichment workers", len(details), len(enrichers))
+
+    start_time = time.time()
+    try:
+        resume_work(queue, journal)
+        while time.time() - start_time < timeout:
+            # The planner lives here; searches report back over IPC
+            plan_searches(queue, planner)
+
+            # Browser stages are done once the search and detail processes exit
+            if queue.is_processing and not any(worker.is_alive() for worker in searches) and \
+                    not any(worker.is_alive() for worker in details):
+                queue.is_processing = False
+            if not queue.is_processing and not any(worker.is_alive() for worker in enrichers) and \
+                    queue.processed.empty():
+                break
+
+            drain_processed(queue, journal, business_list, total_results, progress_callback, timeout=0.1)
+            if len(business_list.business_list) >= total_results:
+                break
+        finish_job(journal, planner, business_list, total_results, time.time() - start_time >= timeout)
+        return business_list
+
+    finally:
+        queue.is_searching = False
+        queue.is_processing = False
+        queue.stopped.set()
+        for worker in workers:
+            worker.join(timeout=DRIVER_RELEASE_TIMEOUT)
+            if isinstance(worker, multiprocessing.process.BaseProcess) and worker.is_alive():
+                _terminate(worker)
+        manager.shutdown()
+        journal.close()
@@ -0,0 +1,130 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+EWMA_ALPHA = 0.3  # Weight of the newest sample in latency and error averages
+DEFAULT_LATENCY = 2.0  # Seconds assumed for proxies that have never been measured
+FAILURE_THRESHOLD = 3  # Consecutive failures before the circuit breaker trips
+BREAKER_COOLDOWN = 120  # Seconds a tripped proxy sits out, doubled on every repeat trip
+MAX_BREAKER_COOLDOWN = 3600
+TOP_CANDIDATES = 3  # Load is spread randomly across this many best proxies
+
+# Responses that mean the proxy's IP is blocked rather than the request failing
+BAN_STATUS_CODES = {403, 407, 429}
+
+
+def proxy_url(proxy):
+    """Proxies in proxies.txt are bare host:port entries"""
+    return proxy if '://' in proxy else f"http://{proxy}"
+
+
+def is_ban(status_code=None, url=None):
+    """Google answers blocked IPs with 429s or a redirect to its /sorry/ captcha page"""
+    return status_code in BAN_STATUS_CODES or (url is not None and '/sorry/' in url)
+
+
+@dataclass
+class ProxyStats:
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    bans: int = 0
+    trips: int = 0
+    open_until: float = 0.0
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by the error rate"""
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return latency * (1 + 4 * self.error_rate)
+
+
+class ProxyPool:
+    """Hands out the best-scoring proxies and learns from every request.
+
+    Latency and error rate are tracked as EWMAs per proxy. A proxy that
+    fails ``failure_threshold`` times in a row, or is banned, is taken out
+    of rotation for a cooldown that doubles on every repeat trip, then
+    gets one trial request: a failure benches it again at once, a success
+    restores it. Thread-safe.
+    """
+
+    def __init__(self, proxies: Iterable[str], health: Optional[Dict[str, dict]] = None,
+                 alpha=EWMA_ALPHA, failure_threshold=FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.stats: Dict[str, ProxyStats] = {proxy: ProxyStats() for proxy in proxies}
+
+        # Seed from the prober's health file so known-dead proxies start benched
+        for proxy, record in (health or {}).items():
+            if proxy not in self.stats:
+                continue
+            if record.get('ok'):
+                self.stats[proxy].latency = record.get('latency')
+            else:
+                self._trip(self.stats[proxy], time.time())
+
+    @classmethod
+    def from_health(cls, health: Dict[str, dict], **kwargs):
+        """Pool over every proxy in the prober's results (utils.get_proxy_health)"""
+        return cls(health, health=health, **kwargs)
+
+    def __len__(self):
+        return len(self.stats)
+
+    def available(self) -> List[str]:
+        """Proxies not sitting out a cooldown"""
+        now = time.time()
+        return [proxy for proxy, stats in self.stats.items() if stats.open_until <= now]
+
+    def acquire(self) -> Optional[str]:
+        """Pick a healthy proxy, or None when every proxy is benched"""
+        with self.lock:
+            available = self.available()
+            if not available:
+                return None
+            available.sort(key=lambda proxy: self.stats[proxy].score())
+            return random.choice(available[:TOP_CANDIDATES])
+
+    def is_benched(self, proxy) -> bool:
+        """True while a proxy sits out its circuit breaker cooldown"""
+        stats = self.stats.get(proxy)
+        return stats is not None and stats.open_until > time.time()
+
+    def report_success(self, proxy, latency):
+        if proxy not in self.stats:
+            return
+        with self.lock:
+            stats = self.stats[proxy]
+            stats.latency = latency if stats.latency is None else \
+                self.alpha * latency + (1 - self.alpha) * stats.latency
+            stats.error_rate *= 1 - self.alpha
+            stats.consecutive_failures = 0
+            stats.trips = 0
+
+    def report_failure(self, proxy, banned=False):
+        if proxy not in self.stats:
+            return
+        now = time.time()
+        with self.lock:
+            stats = self.stats[proxy]
+            stats.error_rate = self.alpha + (1 - self.alpha) * stats.error_rate
+            stats.consecutive_failures += 1
+            if banned:
+                stats.bans += 1
+            # A proxy back from a cooldown is half-open: its trial request has to succeed
+            trial = stats.trips > 0 and stats.open_until <= now
+            if banned or trial or stats.consecutive_failures >= self.failure_threshold:
+                self._trip(stats, now)
+                logging.info("Proxy %s benched for %ds (%s)", proxy, stats.open_until - now,
+                             "banned" if banned else "failing")
+
+    def _trip(self, stats, now):
+        stats.open_until = now + min(self.cooldown * 2 ** stats.trips, MAX_BREAKER_COOLDOWN)
+        stats.trips += 1
+        stats.consecutive_failures = 0
+
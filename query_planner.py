@@ -0,0 +1,115 @@
+"""Split a state- or province-wide search into per-postal-code sub-queries.
+
+Maps stops a query at about 120 results, so "plumbers in Texas" can never
+fill a job asking for thousands. plan_queries expands such a job into one
+query per US zip code or Canadian FSA (forward sortation area, the first
+three characters of a postal code) from the bundled code lists. The
+search threads work through them until the job has enough businesses.
+"""
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+US_ZIP_CODES_FILE = os.path.join(DATA_DIR, 'us_zip_codes.json')
+US_ZIP_CODES_REST_FILE = os.path.join(DATA_DIR, 'whats left.json')  # States missing above, as a bare fragment
+CANADA_POSTAL_CODES_FILE = os.path.join(DATA_DIR, 'canada_postal_codes.json')
+
+RESULTS_PER_QUERY = 120  # Where Maps stops returning results for one query
+MAX_SEARCH_ATTEMPTS = 3  # Failed searches of one sub-query before it is left for the next run
+PLAN_HEADROOM = 4  # Neighbouring sub-queries overlap and few fill up, so count on a quarter of each
+
+
+@dataclass(frozen=True)
+class SubQuery:
+    term: str
+    location: str
+    postal_code: Optional[str] = None
+    url: Optional[str] = None  # Opened directly instead of typing ``text`` into the search box
+    tile: Optional[object] = None  # viewport_search.Tile the url covers
+
+    @property
+    def text(self):
+        return f"{self.term} in {self.location}"
+
+
+def _load(path) -> Dict[str, List[str]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        return json.loads(text)
+    except ValueError:
+        # "whats left.json" holds the object's members without the surrounding braces
+        return json.loads('{' + text.strip().rstrip(',') + '}')
+
+
+@lru_cache(maxsize=1)
+def load_postal_codes() -> Dict[str, List[str]]:
+    """Region name -> zip codes (US states) or FSAs (Canadian provinces)"""
+    codes = {}
+    for path in (US_ZIP_CODES_REST_FILE, US_ZIP_CODES_FILE, CANADA_POSTAL_CODES_FILE):
+        for region, region_codes in _load(path).items():
+            codes[region] = list(dict.fromkeys(codes.get(region, []) + region_codes))
+    return codes
+
+
+def canadian_provinces() -> List[str]:
+    return sorted(_load(CANADA_POSTAL_CODES_FILE))
+
+
+def plan_queries(term, location, total_results=RESULTS_PER_QUERY) -> List[SubQuery]:
+    """Sub-queries for a job; a single query when one search can already deliver ``total_results``"""
+    regions = {region.lower(): region for region in load_postal_codes()}
+    region = regions.get(location.strip().lower())
+    if region is None or total_results <= RESULTS_PER_QUERY:
+        return [SubQuery(term, location)]
+    return [SubQuery(term, f"{code}, {region}", code) for code in load_postal_codes()[region]]
+
+
+def plan_shortfall(sub_queries: List[SubQuery], total_results, headroom=PLAN_HEADROOM) -> int:
+    """How many of ``total_results`` a plan is expected to fall short by"""
+    if len(sub_queries) <= 1 and total_results <= RESULTS_PER_QUERY:
+        return 0
+    return max(0, total_results - len(sub_queries) * RESULTS_PER_QUERY // headroom)
+
+
+class PostalPlanner:
+    """A fixed plan: every sub-query from plan_queries is issued up front.
+
+    Same interface as viewport_search.ViewportPlanner, so the search
+    threads treat both alike.
+    """
+
+    def __init__(self, sub_queries: List[SubQuery]):
+        self.sub_queries = sub_queries
+        self.outstanding = len(sub_queries)
+        self.attempts: Dict[SubQuery, int] = {}
+
+    def initial(self) -> List[SubQuery]:
+        return list(self.sub_queries)
+
+    def resume(self, pending: List[SubQuery], planned: Iterable[SubQuery] = ()) -> List[SubQuery]:
+        """Pick up a journaled plan where only ``pending`` is left to search; ``planned`` is unused"""
+        self.sub_queries = list(pending)
+        self.outstanding = len(pending)
+        return list(pending)
+
+    def report(self, sub_query, listed) -> List[SubQuery]:
+        self.outstanding -= 1
+        return []
+
+    def failed(self, sub_query) -> List[SubQuery]:
+        """Record a search that failed; returns it to be retried, or nothing once it is given up on"""
+        self.attempts[sub_query] = self.attempts.get(sub_query, 0) + 1
+        if self.attempts[sub_query] < MAX_SEARCH_ATTEMPTS:
+            return [sub_query]
+        self.outstanding -= 1
+        return []
+
+    @property
+    def finished(self):
+        return self.outstanding <= 0
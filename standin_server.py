@@ -0,0 +1,452 @@
+"""Offline stand-in for Google Maps and the business websites it links to.
+
+Serves the pages the scraper drives, with the same DOM hooks it reads
+(#searchboxinput, div[role="feed"] of div.Nv2PK cards with infinite
+scroll, place pages with the address/phone/authority buttons), plus a
+synthetic website for every business with configurable latency and
+failure modes. Everything is generated from --seed, so runs are
+reproducible; --record saves every response and --replay serves a
+recording back byte for byte.
+
+Usage:
+    python standin_server.py [--port 8765] [--results 120] [--failure-rate 0.1]
+    MAPS_BASE_URL=http://127.0.0.1:8765/maps streamlit run MultiThreadVersion.py
+
+Every site gets its own 127.x.y.z address (Linux routes all of 127/8 to
+loopback), so the domain cache and per-host pacing see distinct websites.
+Where only 127.0.0.1 answers, --single-host serves them all under
+/sites/<n>/ instead, at the cost of every site sharing one host's pacing.
+Clear cache/ before timing enrichment, or cached domains skip the crawl.
+"""
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import random
+import re
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+FAILURE_MODES = ('error', 'slow', 'reset', 'notfound')
+SITE_SPACE = 254 << 16  # Site numbers that map onto distinct 127.x.y.z addresses
+
+ADJECTIVES = ['Reliable', 'Golden', 'Blue Ridge', 'Summit', 'Evergreen', 'Precision', 'Friendly',
+              'Northside', 'Metro', 'Liberty', 'Heritage', 'Pioneer', 'Cornerstone', 'Bright',
+              "Joe's", "O'Malley's", 'Family', 'Premier', 'Urban', 'Valley']
+CATEGORIES = ['Plumber', 'Dentist', 'Cafe', 'Auto repair shop', 'Bakery', 'Electrician',
+              'Hair salon', 'Veterinarian', 'Law firm', 'Florist', 'Roofing contractor', 'Gym']
+CHAINS = ['QuickFix Plumbing', 'Smile Dental Group', 'Bean There Coffee', 'Pep Auto Care']
+STREETS = ['Main St', 'Oak Ave', 'Maple Dr', 'Broadway', 'Elm St', 'Park Blvd', 'Cedar Ln',
+           '2nd St', 'Lakeview Rd', 'Washington Ave']
+CITIES = [('Denver', 'CO', '802'), ('Austin', 'TX', '787'), ('Columbus', 'OH', '432'),
+          ('Portland', 'OR', '972'), ('Raleigh', 'NC', '276'), ('Tampa', 'FL', '336')]
+FILLER = ('family owned and operated since 1987 serving the greater metro area with honest '
+          'pricing licensed insured free estimates same day service call today').split()
+
+
+@dataclass
+class StandinConfig:
+    seed: int = 1
+    results: int = 120  # Results per query; Maps stops around 120
+    page_size: int = 20  # Cards per infinite-scroll page
+    maps_latency: float = 0.2  # Seconds per Maps page or results page
+    site_latency: float = 0.3  # Mean seconds per website page
+    failure_rate: float = 0.1  # Share of websites that fail in one of failure_modes
+    failure_modes: tuple = FAILURE_MODES
+    slow_seconds: float = 20.0  # How long a 'slow' website stalls
+    no_website_rate: float = 0.2
+    spread_hosts: bool = True  # Each site on its own 127.x.y.z host rather than under /sites/<n>/
+    record_dir: Optional[str] = None
+    replay_dir: Optional[str] = None
+
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def search_place_ids(config, query):
+    """Place ids a query returns, in feed order"""
+    query = ' '.join(query.lower().split())
+    ids = []
+    for index in range(config.results):
+        rng = random.Random(f"{config.seed}|{query}|{index}")
+        ids.append(f"0x{rng.getrandbits(60):x}:0x{rng.getrandbits(56):x}")
+    return ids
+
+
+def make_business(config, place_id) -> dict:
+    """Everything about a place, derived from its id (the CID half) alone"""
+    cid = int(place_id.split(':')[1], 16)
+    rng = random.Random(f"{config.seed}|place|{cid}")
+    category = rng.choice(CATEGORIES)
+    if rng.random() < 0.05:
+        # Branches of a chain share a name and one website but not an address
+        name = rng.choice(CHAINS)
+        site = int(hashlib.sha1(name.encode()).hexdigest(), 16) % SITE_SPACE
+    else:
+        name = f"{rng.choice(ADJECTIVES)} {category}"
+        site = cid % SITE_SPACE
+    city, state, zip_prefix = rng.choice(CITIES)
+    area = rng.randint(200, 989)
+    return {
+        'place_id': place_id,
+        'name': name,
+        'category': category,
+        'address': f"{rng.randint(10, 9999)} {rng.choice(STREETS)}, {city}, {state} {zip_prefix}{rng.randint(10, 99)}",
+        'phone': f"({area}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+        'rating': round(rng.uniform(3.0, 5.0), 1),
+        'reviews': rng.randint(0, 3000),
+        'latitude': round(rng.uniform(25, 48), 6),
+        'longitude': round(rng.uniform(-122, -71), 6),
+        'site': None if rng.random() < config.no_website_rate else site,
+    }
+
+
+def make_site(config, site) -> dict:
+    """Where a website keeps its email, and how (or whether) it fails"""
+    rng = random.Random(f"{config.seed}|site|{site}")
+    failure = rng.choice(config.failure_modes) if config.failure_modes and rng.random() < config.failure_rate else None
+    domain = f"{_slug(rng.choice(ADJECTIVES))}-{site}.com"
+    return {
+        'site': site,
+        'domain': domain,
+        'email': f"{rng.choice(['info', 'hello', 'office', 'contact'])}@{domain}",
+        'email_on': rng.choice(['home', 'home', 'contact', 'contact', 'obfuscated', 'none']),
+        'failure': failure,
+        'latency': max(0.0, rng.gauss(config.site_latency, config.site_latency / 3)),
+    }
+
+
+def site_host(site):
+    return f"127.{site // 65536 + 1}.{site // 256 % 256}.{site % 256}"
+
+
+def site_from_host(host) -> Optional[int]:
+    parts = host.split('.')
+    if len(parts) != 4 or parts[0] != '127' or not all(p.isdigit() for p in parts):
+        return None
+    site = (int(parts[1]) - 1) * 65536 + int(parts[2]) * 256 + int(parts[3])
+    return site if 0 <= site < SITE_SPACE else None
+
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 0; }}
+div[role="feed"] {{ height: 80vh; width: 420px; overflow-y: auto; }}
+.Nv2PK {{ height: 110px; padding: 8px; border-bottom: 1px solid #ddd; }}
+</style></head>
+<body>
+<div id="searchbox">
+  <input id="searchboxinput" name="q" value="{query}">
+  <button id="searchbox-searchbutton" aria-label="Search">Search</button>
+</div>
+{content}
+<script>
+document.getElementById('searchbox-searchbutton').addEventListener('click', () => {{
+    const q = document.getElementById('searchboxinput').value.trim();
+    if (q) window.location.href = '/maps/search/' + encodeURIComponent(q);
+}});
+const feed = document.querySelector('div[role="feed"]');
+if (feed) {{
+    let page = 1, loading = false, done = feed.dataset.end === '1';
+    feed.addEventListener('scroll', () => {{
+        if (loading || done || feed.scrollTop + feed.clientHeight < feed.scrollHeight - 50) return;
+        loading = true;
+        fetch('/maps/api/results?q=' + encodeURIComponent(feed.dataset.query) + '&page=' + page)
+            .then(response => response.json())
+            .then(data => {{
+                feed.insertAdjacentHTML('beforeend', data.html);
+                page += 1;
+                done = data.end;
+                loading = false;
+            }})
+            .catch(() => {{ loading = false; }});
+    }});
+}}
+</script>
+</body></html>
+"""
+
+CARD_TEMPLATE = """<div class="Nv2PK" role="article">
+  <a class="hfpxzc" aria-label="{name}" href="/maps/place/{slug}/data=!4m7!3m6!1s{place_id}!8m2!3d{latitude}!4d{longitude}?authuser=0&amp;hl=en"></a>
+  <div class="qBF1Pd fontHeadlineSmall">{name}</div>
+  <span role="img" aria-label="{rating} stars {reviews:,} Reviews"><span class="MW4etd">{rating}</span> <span class="UY7F9">({reviews:,})</span></span>
+  <div class="W4Efsd"><span>{category}</span> <span>&middot;</span> <span>{street}</span></div>
+</div>
+"""
+
+END_MARKER = '<div class="PbZDve"><span class="HlvSq">You\'ve reached the end of the list.</span></div>'
+
+PLACE_TEMPLATE = """<div role="main" aria-label="{name}">
+  <h1 class="DUwDvf">{name}</h1>
+  <button data-item-id="address" aria-label="Address: {address}"><div class="Io6YTe">{address}</div></button>
+  <button data-item-id="phone:tel:{digits}" aria-label="Phone: {phone}"><div class="Io6YTe">{phone}</div></button>
+  {website}
+</div>
+"""
+
+SITE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{name}</title></head>
+<body>
+<nav><a href="./">Home</a> <a href="about">About Us</a> <a href="services">Services</a> <a href="contact">Contact Us</a></nav>
+<h1>{heading}</h1>
+{paragraphs}
+{extra}
+<footer>
+  <div class="hours">Mon-Fri 8:00 AM - 6:00 PM, Sat 9:00 AM - 2:00 PM</div>
+  <a href="category/{category_slug}">{category}</a>
+  <a href="https://www.facebook.com/{slug}">Facebook</a> <a href="https://www.instagram.com/{slug}">Instagram</a>
+</footer>
+</body></html>
+"""
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server: 'StandinServer'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logging.debug("standin: " + format, *args)
+
+    @property
+    def config(self) -> StandinConfig:
+        return self.server.config
+
+    def do_GET(self):
+        host = (self.headers.get('Host') or '').split(':')[0]
+        key = f"{host}{self.path}"
+        if self.config.replay_dir:
+            self._replay(key)
+            return
+
+        start = time.time()
+        status, content_type, body = self._route(host, urlsplit(self.path))
+        if self.config.record_dir:
+            self._record(key, status, content_type, body, time.time() - start)
+        if status is None:
+            self._reset()
+        else:
+            self._send(status, content_type, body)
+
+    def _route(self, host, url):
+        path = unquote(url.path)
+        site = site_from_host(host) if self.config.spread_hosts else None
+        if site is not None and host != self.server.host:
+            return self._site_page(site, path)
+        if path.startswith('/sites/'):
+            parts = path.split('/', 3)
+            if len(parts) > 2 and parts[2].isdigit():
+                return self._site_page(int(parts[2]), '/' + (parts[3] if len(parts) > 3 else ''))
+
+        if path in ('/', '/maps', '/maps/'):
+            time.sleep(self.config.maps_latency)
+            return 200, 'text/html', self._page('Google Maps', '', '')
+        if path.startswith('/maps/search/'):
+            time.sleep(self.config.maps_latency)
+            query = path[len('/maps/search/'):].strip('/')
+            cards, end = self._results(query, 0)
+            feed = (f'<div role="feed" aria-label="Results for {html.escape(query)}" '
+                    f'data-query="{html.escape(query)}" data-end="{int(end)}">{cards}</div>')
+            return 200, 'text/html', self._page(f"{query} - Google Maps", query, feed)
+        if path == '/maps/api/results':
+            time.sleep(self.config.maps_latency)
+            params = parse_qs(url.query)
+            cards, end = self._results(params.get('q', [''])[0], int(params.get('page', ['0'])[0]))
+            return 200, 'application/json', json.dumps({'html': cards, 'end': end})
+        if path.startswith('/maps/place/'):
+            time.sleep(self.config.maps_latency)
+            match = re.search(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)', path)
+            if not match:
+                return 404, 'text/html', 'Unknown place'
+            return 200, 'text/html', self._place(make_business(self.config, match.group(1)))
+        return 404, 'text/html', 'Not found'
+
+    def _page(self, title, query, content):
+        return PAGE_TEMPLATE.format(title=html.escape(title), query=html.escape(query), content=content)
+
+    def _results(self, query, page):
+        place_ids = search_place_ids(self.config, query)
+        start = page * self.config.page_size
+        cards = []
+        for place_id in place_ids[start:start + self.config.page_size]:
+            business = make_business(self.config, place_id)
+            cards.append(CARD_TEMPLATE.format(
+                name=html.escape(business['name']),
+                slug=quote(business['name'].replace(' ', '+'), safe='+'),
+                street=html.escape(business['address'].split(',')[0]),
+                **{k: business[k] for k in ('place_id', 'latitude', 'longitude', 'rating', 'reviews', 'category')}
+            ))
+        end = start + self.config.page_size >= len(place_ids)
+        if end:
+            cards.append(END_MARKER)
+        return ''.join(cards), end
+
+    def _place(self, business):
+        website = ''
+        if business['site'] is not None:
+            url = self.server.site_url(business['site'])
+            website = (f'<a data-item-id="authority" href="{url}">'
+                       f'<div class="Io6YTe">{make_site(self.config, business["site"])["domain"]}</div></a>')
+        content = PLACE_TEMPLATE.format(
+            name=html.escape(business['name']),
+            address=html.escape(business['address']),
+            phone=business['phone'],
+            digits=re.sub(r'\D', '', business['phone']),
+            website=website
+        )
+        return self._page(f"{business['name']} - Google Maps", business['name'], content)
+
+    def _site_page(self, site_number, path):
+        site = make_site(self.config, site_number)
+        failure = site['failure']
+        if failure == 'slow':
+            time.sleep(self.config.slow_seconds)
+        else:
+            time.sleep(site['latency'])
+        if failure == 'error':
+            return 500, 'text/html', 'Internal Server Error'
+        if failure == 'reset':
+            return None, None, None
+        if failure == 'notfound' or path not in ('/', '/about', '/services', '/contact'):
+            return 404, 'text/html', 'Not Found'
+
+        rng = random.Random(f"{self.config.seed}|page|{site_number}|{path}")
+        name = site['domain'].rsplit('-', 1)[0].replace('-', ' ').title()
+        extra = ''
+        if site['email_on'] == 'home' and path == '/' or site['email_on'] == 'contact' and path == '/contact':
+            extra = f'<p>Email us: <a href="mailto:{site["email"]}">{site["email"]}</a></p>'
+        elif site['email_on'] == 'obfuscated' and path == '/contact':
+            user, domain = site['email'].split('@')
+            extra = f'<p>Write to {user} [at] {domain.replace(".", " [dot] ")}</p>'
+        category = CATEGORIES[site_number % len(CATEGORIES)]
+        return 200, 'text/html', SITE_TEMPLATE.format(
+            name=html.escape(name),
+            heading=html.escape(path.strip('/').title() or name),
+            paragraphs=''.join('<p>' + ' '.join(rng.choice(FILLER) for _ in range(60)) + '</p>'
+                               for _ in range(rng.randint(3, 12))),
+            extra=extra,
+            category=category,
+            category_slug=_slug(category),
+            slug=_slug(name)
+        )
+
+    def _send(self, status, content_type, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reset(self):
+        # SO_LINGER of zero makes close() send a RST instead of a FIN
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.close_connection = True
+
+    def _record_path(self, directory, key):
+        return os.path.join(directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _record(self, key, status, content_type, body, elapsed):
+        path = self._record_path(self.config.record_dir, key)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'status': status, 'content_type': content_type,
+                       'body': body, 'elapsed': round(elapsed, 4)}, f)
+
+    def _replay(self, key):
+        path = self._record_path(self.config.replay_dir, key)
+        if not os.path.exists(path):
+            self._send(404, 'text/html', 'Not recorded')
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+        time.sleep(recorded['elapsed'])
+        if recorded['status'] is None:
+            self._reset()
+        else:
+            self._send(recorded['status'], recorded['content_type'], recorded['body'])
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: StandinConfig, host='127.0.0.1', port=8765):
+        # Spread-out sites arrive on 127.x.y.z, which only a wildcard bind accepts
+        super().__init__(('0.0.0.0' if config.spread_hosts else host, port), StandinHandler)
+        self.config = config
+        self.host = host
+        self.port = self.server_address[1]
+        if config.record_dir and not os.path.exists(config.record_dir):
+            os.makedirs(config.record_dir)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/maps"
+
+    def site_url(self, site):
+        if self.config.spread_hosts:
+            return f"http://{site_host(site)}:{self.port}/"
+        return f"http://{self.host}:{self.port}/sites/{site}/"
+
+
+def start_server(config: Optional[StandinConfig] = None, host='127.0.0.1', port=0) -> StandinServer:
+    """Serve in a background thread; port 0 picks a free port (see ``base_url``)"""
+    server = StandinServer(config or StandinConfig(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=StandinConfig.seed)
+    parser.add_argument('--results', type=int, default=StandinConfig.results)
+    parser.add_argument('--page-size', type=int, default=StandinConfig.page_size)
+    parser.add_argument('--maps-latency', type=float, default=StandinConfig.maps_latency)
+    parser.add_argument('--site-latency', type=float, default=StandinConfig.site_latency)
+    parser.add_argument('--failure-rate', type=float, default=StandinConfig.failure_rate)
+    parser.add_argument('--failure-modes', default=','.join(FAILURE_MODES),
+                        help=f"Comma-separated subset of {', '.join(FAILURE_MODES)}")
+    parser.add_argument('--slow-seconds', type=float, default=StandinConfig.slow_seconds)
+    parser.add_argument('--single-host', action='store_true',
+                        help='Serve every website under /sites/<n>/ on --host instead of its own 127.x.y.z host')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='DIR', help='Save every response to DIR')
+    group.add_argument('--replay', metavar='DIR', help='Serve the responses saved in DIR')
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        seed=args.seed,
+        results=args.results,
+        page_size=args.page_size,
+        maps_latency=args.maps_latency,
+        site_latency=args.site_latency,
+        failure_rate=args.failure_rate,
+        failure_modes=tuple(mode for mode in args.failure_modes.split(',') if mode in FAILURE_MODES),
+        slow_seconds=args.slow_seconds,
+        spread_hosts=not args.single_host,
+        record_dir=args.record,
+        replay_dir=args.replay
+    )
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = StandinServer(config, args.host, args.port)
+    logging.info("Stand-in serving; export MAPS_BASE_URL=%s", server.base_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+from dedup import DedupIndex, normalize_address, normalize_phone, place_identity
+
+
+@dataclass
+class Business:
+    name: str
+    address: Optional[str] = None
+    phone_number: Optional[str] = None
+    place_url: Optional[str] = None
+
+
+def place(cid):
+    return f"https://www.google.com/maps?cid={cid}"
+
+
+def test_place_identity_agrees_across_link_forms():
+    href = 'https://www.google.com/maps/place/Joe/data=!4m7!3m6!1s0x8644b5a0d3a1b6c1:0x5f2ad4e3c1b09a77!8m2'
+    assert place_identity(href) == place_identity('0x8644b5a0d3a1b6c1:0x5f2ad4e3c1b09a77')
+    assert place_identity(href) == place_identity(place(0x5f2ad4e3c1b09a77))
+
+
+def test_normalization():
+    assert normalize_address('123 Main St., Suite 200, Denver') == normalize_address('123 Main Street Denver')
+    assert normalize_phone('+1 (303) 555-1234') == normalize_phone('303.555.1234') == '3035551234'
+    assert normalize_phone('911') is None
+
+
+def test_claim_once():
+    index = DedupIndex()
+    assert index.claim(place(1))
+    assert not index.claim(place(1))
+    assert place(1) in index and len(index) == 1
+
+
+def test_same_place_address_or_phone_is_a_duplicate():
+    index = DedupIndex()
+    assert index.add(Business("Joe's Pizza", '123 Main St, Denver, CO 80202', '303-555-1234', place(1)))
+    assert not index.add(Business("Joe's Pizza (old listing)", None, None, place(1)))
+    assert not index.add(Business("Joe's Pizza - Downtown", '123 Main Street, Denver, CO 80202'))
+    assert not index.add(Business("Joe's Pizza", None, '(303) 555-1234'))
+
+
+def test_chain_locations_sharing_a_number_stay_apart():
+    index = DedupIndex()
+    assert index.add(Business('Roto-Rooter Plumbing', '1 Elm St, Austin, TX 78702', '1-800-768-6911', place(1)))
+    assert index.add(Business('Roto-Rooter Plumbing', '9 Oak Ave, Austin, TX 78702', '800-768-6911', place(2)))
+    # Without place ids, different postal codes still keep them apart
+    assert index.add(Business('Roto-Rooter Plumbing', '5 Pine Rd, Dallas, TX 75201', '800-768-6911'))
+    assert not index.add(Business('Roto-Rooter Plumbing & Drain', None, '800-768-6911'))
+
+
+def test_names_match_on_whole_words():
+    index = DedupIndex()
+    assert index.add(Business('Bank of America', '100 Congress Ave, Austin, TX 78701', place_url=place(1)))
+    assert index.add(Business('A', '100 Congress Ave, Austin, TX 78701', place_url=place(2)))
+    assert not index.add(Business('Bank of America Financial Center', '100 Congress Avenue, Austin, TX 78701'))
+
+
+def test_fuzzy_resolver_respects_distinct_places():
+    entity_resolution = pytest.importorskip('entity_resolution')
+    index = DedupIndex(resolver=entity_resolution.EntityResolver())
+    assert index.add(Business('Roto-Rooter Plumbing', '1 Elm St, Austin, TX 78702', '800-768-6911', place(1)))
+    assert index.add(Business('Roto Rooter Plumbing Co', '9 Oak Ave, Austin, TX 78702', '800-768-6911', place(2)))
+    # Spelling variants of a listing already kept are still caught
+    assert not index.add(Business('Rotorooter Plumbing', '1 Elm Street, Austin, TX 78702'))
+
+
+def test_fuzzy_resolver_keeps_neighbouring_chain_locations():
+    entity_resolution = pytest.importorskip('entity_resolution')
+    index = DedupIndex(resolver=entity_resolution.EntityResolver())
+    assert index.add(Business('Subway', '12 Main St, Austin, TX 78701', '512-555-0001', place(1)))
+    assert index.add(Business('Subway', '21 Main St, Austin, TX 78701', '512-555-0002', place(2)))
+    assert index.add(Business('Subway', '120 Main St, Austin, TX 78701', '512-555-0003', place(3)))
+    assert index.add(Business('Subway', '1200 Main St, Austin, TX 78701', '512-555-0004', place(4)))
@@ -0,0 +1,127 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('psutil')
+
+from driver_pool import DriverPool, driver_rss
+
+
+def sleeper():
+    process = subprocess.Popen([sys.executable, '-c', 'import time; print(flush=True); time.sleep(30)'],
+                               stdout=subprocess.PIPE)
+    # Measured once the interpreter has finished loading
+    process.stdout.readline()
+    return process
+
+
+def test_driver_rss_counts_browser_and_chromedriver_trees():
+    # undetected_chromedriver starts the browser outside the chromedriver tree
+    chromedriver, browser = sleeper(), sleeper()
+    try:
+        service = SimpleNamespace(process=SimpleNamespace(pid=chromedriver.pid))
+        chromedriver_only = driver_rss(SimpleNamespace(service=service))
+        both = driver_rss(SimpleNamespace(service=service, browser_pid=browser.pid))
+        assert chromedriver_only > 0
+        assert both > chromedriver_only * 1.5
+        # A process reached from both roots is counted once
+        same = driver_rss(SimpleNamespace(service=service, browser_pid=chromedriver.pid))
+        assert same < chromedriver_only * 1.5
+    finally:
+        for process in (chromedriver, browser):
+            process.kill()
+            process.wait()
+            process.stdout.close()
+
+
+def test_driver_rss_without_processes():
+    assert driver_rss(SimpleNamespace()) == 0
+    assert driver_rss(SimpleNamespace(browser_pid=2 ** 22 + 12345)) == 0
+
+
+class FakeDriver:
+    """Just enough of a WebDriver for the pool's health checks and resets"""
+
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.window_handles = ['main']
+        self.current = 'main'
+        self.cookies = True
+        self.url = 'https://www.google.com/maps'
+        self.switch_to = SimpleNamespace(window=self._switch)
+
+    def _switch(self, handle):
+        self.current = handle
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError('browser gone')
+        return 1
+
+    def close(self):
+        self.window_handles.remove(self.current)
+
+    def delete_all_cookies(self):
+        self.cookies = False
+
+    def get(self, url):
+        self.url = url
+
+    def quit(self):
+        self.alive = False
+
+
+def fake_pool(size=2, **kwargs):
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver(len(drivers)))
+        return drivers[-1]
+
+    pool = DriverPool(size, factory, max_rss=0, **kwargs)
+    pool.start().join()
+    return pool, drivers
+
+
+def test_acquire_and_release_reset_the_browser():
+    pool, drivers = fake_pool()
+    driver = pool.acquire(timeout=5)
+    driver.window_handles.append('popup')
+    pool.release(driver)
+    assert driver.window_handles == ['main'] and driver.current == 'main'
+    assert not driver.cookies and driver.url == 'about:blank'
+    assert len(drivers) == 2
+    pool.close()
+    assert not any(driver.alive for driver in drivers)
+
+
+def test_dead_browsers_are_discarded_and_replaced():
+    pool, drivers = fake_pool(size=1)
+    drivers[0].alive = False
+    driver = pool.acquire(timeout=5)
+    assert driver is drivers[1] and driver.alive
+    pool.close()
+
+
+def test_record_use_retires_after_max_uses():
+    pool, drivers = fake_pool(size=1, max_uses=3)
+    driver = pool.acquire(timeout=5)
+    assert pool.record_use(driver) is None
+    assert pool.record_use(driver) is None
+    assert pool.record_use(driver) == 'handled 3 places'
+    fresh = pool.recycle(driver, timeout=5)
+    assert fresh is not driver and not driver.alive
+    assert pool.record_use(fresh) is None
+    pool.close()
+
+
+def test_retire_check_applies_on_borrow():
+    retired = set()
+    pool, drivers = fake_pool(size=1, retire_check=lambda driver: 'benched' if driver.number in retired else None)
+    retired.add(0)
+    assert pool.acquire(timeout=5) is drivers[1]
+    assert not drivers[0].alive
+    pool.close()
@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('bs4')
+pytest.importorskip('requests')
+
+from enrichment import _scan, extract_page_info, is_valid_email, rank_contact_pages, scan_emails, valid_emails_in
+
+
+def test_scan_finds_plain_and_mailto_addresses():
+    body = b'<a href="mailto:Info@Shop.com?subject=hi">Mail</a> or sales@shop.com.'
+    assert scan_emails(body) == {'info@shop.com', 'sales@shop.com'}
+
+
+def test_scan_decodes_obfuscated_and_entity_encoded_addresses():
+    assert scan_emails(b'write to joe [at] shop [dot] com') == {'joe@shop.com'}
+    assert scan_emails(b'joe&#64;shop.com') == {'joe@shop.com'}
+
+
+def test_scan_joins_addresses_split_across_tags():
+    assert scan_emails(b'<p>joe@<span>shop.com</span></p>') == {'joe@shop.com'}
+    assert scan_emails(b'<p><b>joe</b>@shop.com</p>') == {'joe@shop.com'}
+    assert scan_emails(b'<style>@media print {}</style><p>no address</p>') == set()
+
+
+def test_scan_finds_each_address_once_in_page_order():
+    body = b'a@b.co x@y.com@z.org name (at) shop [dot] com mailto:c.d+e@f-g.io'
+    assert scan_emails(body) == {'a@b.co', 'x@y.com', 'name@shop.com', 'c.d+e@f-g.io'}
+
+
+def test_scan_skips_retina_assets_and_placeholder_domains():
+    body = b'<img src="logo@2x.png"> you@example.com real@shop.com'
+    assert valid_emails_in(body) == ['real@shop.com']
+    assert not is_valid_email('name@yourdomain.net')
+
+
+def test_partial_scan_waits_for_an_address_cut_at_the_end():
+    assert _scan(b'contact info@shop.co', partial=True) == set()
+    assert _scan(b'contact info@shop.com.', partial=True) == set()
+    assert _scan(b'contact info@shop.com</p>', partial=True) == {'info@shop.com'}
+    assert _scan(b'contact info@shop.co') == {'info@shop.co'}
+
+
+def test_rank_contact_pages_prefers_contact_links_on_the_same_site():
+    body = (b'<a href="/about-us">About</a>'
+            b'<a href="https://www.shop.com/contact">Get in touch</a>'
+            b'<a href="https://facebook.com/shop/contact">Facebook</a>'
+            b'<a href="/menu">Menu</a>'
+            b'<a href="mailto:joe@shop.com">contact</a>')
+    assert rank_contact_pages('https://www.shop.com/', body) == [
+        'https://www.shop.com/contact',
+        'https://www.shop.com/about-us',
+    ]
+
+
+def test_rank_contact_pages_reads_sitemap_locations():
+    sitemap = b'<urlset><url><loc> https://shop.com/team </loc></url><url><loc>https://shop.com/</loc></url></urlset>'
+    assert rank_contact_pages('https://shop.com', sitemap=sitemap) == ['https://shop.com/team']
+
+
+def test_page_info_categories_come_from_category_and_tag_paths():
+    body = '''<a href="/category/plumbers">Plumbers</a> <a href="tags/drains">Drains</a>
+        <a href="https://www.instagram.com/joesplumbing">Instagram</a>
+        <a href="https://www.facebook.com/joesplumbing">Facebook</a>
+        <a href="/vintage-catalog">Catalog</a>'''
+    social_media, _, categories = extract_page_info(body)
+    assert categories == ['Plumbers', 'Drains']
+    assert social_media['instagram'] == 'https://www.instagram.com/joesplumbing'
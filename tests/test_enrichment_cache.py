@@ -0,0 +1,44 @@
+from enrichment_cache import DomainCache, domain_key, registered_domain
+
+
+def test_domain_keys():
+    assert registered_domain('https://shop.example.com/page') == 'example.com'
+    assert registered_domain('www.shop.co.uk') == 'shop.co.uk'
+    assert domain_key('https://joes.wixsite.com/pizza') == 'joes.wixsite.com'
+    assert domain_key('https://www.facebook.com/JoesPizza/about') == 'facebook.com/joespizza'
+
+
+def test_branches_of_a_chain_share_an_entry(tmp_path):
+    cache = DomainCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put('https://denver.chain.com/', emails=['info@chain.com'], social_media={'facebook': None})
+    cached = cache.get('https://www.chain.com/boulder')
+    assert cached['emails'] == ['info@chain.com']
+    assert cached['social_media'] == {'facebook': None}
+    assert cache.get('https://other.com') is None
+
+
+def test_expired_entries_are_missing(tmp_path):
+    cache = DomainCache(str(tmp_path / 'cache.sqlite3'), ttl=-1)
+    cache.put('https://shop.com', emails=['a@shop.com'])
+    assert cache.get('https://shop.com') is None
+
+
+def test_put_replaces_every_field(tmp_path):
+    cache = DomainCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put('https://shop.com', emails=['old@shop.com'], business_hours='Mon-Fri')
+    cache.put('https://shop.com', emails=['new@shop.com'])
+    cached = cache.get('https://shop.com')
+    assert cached['emails'] == ['new@shop.com']
+    # Not found by the newer crawl, so not kept under its timestamp
+    assert cached['business_hours'] is None
+
+
+def test_least_recently_used_domains_are_evicted(tmp_path):
+    cache = DomainCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    for domain in ('a.com', 'b.com', 'c.com'):
+        cache.put(f'https://{domain}', emails=[])
+    cache.get('https://a.com')
+    cache.evict()
+    assert cache.get('https://a.com') is not None
+    assert cache.get('https://c.com') is not None
+    assert cache.get('https://b.com') is None
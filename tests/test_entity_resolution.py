@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip('pandas')
+
+from entity_resolution import EntityResolver, blocking_keys, house_number, make_entry, postal_code, same_location
+
+
+def record(name, address, phone=None, place_url=None):
+    return {'name': name, 'address': address, 'phone_number': phone, 'place_url': place_url}
+
+
+def test_postal_codes():
+    assert postal_code('123 Main St, Denver, CO 80202-1234') == '80202'
+    assert postal_code('1 Yonge St, Toronto, ON m5e 1w7') == 'M5E1W7'
+    assert postal_code('Main Street') is None
+
+
+def test_blocking_keys_ignore_apostrophes_and_stopwords():
+    left = make_entry(record("The Joe's Pizza LLC", '123 Main St, Denver, CO 80202'))
+    right = make_entry(record('Joes Pizza', '123 Main Street, Denver, CO 80202'))
+    assert set(blocking_keys(left)) == set(blocking_keys(right))
+
+
+def test_address_variants_resolve_to_one_entity():
+    resolver = EntityResolver()
+    first = resolver.add(record("Joe's Pizza", '123 Main St., Suite 200, Denver, CO 80202', '(303) 555-1234'))
+    assert resolver.add(record('Joes Pizza', '123 Main Street, Denver, CO 80202')) == first
+    assert resolver.add(record("Joe's Pizza Downtown", '123 Main St, Denver')) == first
+
+
+def test_different_businesses_stay_apart():
+    resolver = EntityResolver()
+    first = resolver.add(record("Joe's Pizza", '123 Main St, Denver, CO 80202', '303-555-1234'))
+    # Same phone, unrelated name
+    assert resolver.add(record('Pizza Hut', '123 Main St, Denver, CO 80202', '1-303-555-1234')) != first
+    # Same name, another town
+    assert resolver.add(record("Joe's Pizza", '9 Oak Ave, Boulder, CO 80301', '303-555-9999')) != first
+    assert resolver.match(record('Joes Pizza', '123 Main Street, Denver, CO 80202')) == first
+    assert len(resolver) == 3
+
+
+def test_a_record_matching_two_entities_joins_them():
+    resolver = EntityResolver()
+    by_phone = resolver.add(record('Acme Plumbing', '1 Elm St, Austin, TX 78702', '512-555-0000'))
+    by_address = resolver.add(record('Acme Plumbing & Heating', '77 Oak Ave, Austin, TX 78702'))
+    assert by_phone != by_address
+    joined = resolver.add(record('Acme Plumbing and Heating', '77 Oak Avenue, Austin, TX 78702', '5125550000'))
+    assert joined == by_phone
+    assert resolver.entity(1) == by_phone
+
+
+def test_comparisons_stay_inside_blocks():
+    resolver = EntityResolver()
+    for i in range(2000):
+        resolver.add(record(f'Business {i:04d}', f'{i} Main St, Town, TX 7{i % 100:04d}', f'512555{i:04d}'))
+    assert resolver.comparisons < 2000 * 50
+
+
+@pytest.mark.parametrize('left, right', [
+    ('12 Main St, Austin, TX', '21 Main St, Austin, TX'),
+    ('120 Main St, Austin, TX', '1200 Main St, Austin, TX'),
+    ('310 Broadway, Denver, CO', '318 Broadway, Denver, CO'),
+])
+def test_chain_locations_on_one_street_stay_apart(left, right):
+    resolver = EntityResolver()
+    first = resolver.add(record('Subway', left, '512-555-0001', 'https://www.google.com/maps?cid=1'))
+    assert resolver.add(record('Subway', right, '512-555-0002', 'https://www.google.com/maps?cid=2')) != first
+    # Without place ids the house numbers alone keep them apart
+    resolver = EntityResolver()
+    resolver.add(record('Subway', left))
+    assert resolver.match(record('Subway', right)) is None
+
+
+def test_house_numbers():
+    assert house_number('1200 main street') == '1200'
+    assert house_number('main street') is None
+    assert same_location('12 main street austin', '12 main street austin tx 78701')
+    assert not same_location('12 main street', '21 main street')
+
+
+def test_distinct_place_ids_never_match():
+    resolver = EntityResolver()
+    first = resolver.add(record('Subway', '12 Main St, Austin, TX 78701', '512-555-0001',
+                                'https://www.google.com/maps?cid=1'))
+    assert resolver.add(record('Subway', '12 Main St, Austin, TX 78701', '512-555-0001',
+                               'https://www.google.com/maps?cid=2')) != first
+    assert resolver.add(record('Subway', '12 Main Street, Austin, TX 78701', None,
+                               'https://www.google.com/maps?cid=1')) == first
@@ -0,0 +1,29 @@
+import pytest
+
+from host_scheduler import HostScheduler, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=2, burst=2)
+    start = bucket.updated
+    assert bucket.reserve(start) == 0.0
+    assert bucket.reserve(start) == 0.0
+    assert bucket.reserve(start) == pytest.approx(0.5)
+    # Reservations queue up behind each other
+    assert bucket.reserve(start) == pytest.approx(1.0)
+
+
+def test_token_bucket_refills_up_to_its_burst():
+    bucket = TokenBucket(rate=1, burst=2)
+    start = bucket.updated
+    bucket.reserve(start)
+    bucket.reserve(start)
+    assert bucket.reserve(start + 100) == 0.0
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def test_scheduler_only_spaces_out_the_same_host():
+    scheduler = HostScheduler(rate=1, burst=1)
+    assert scheduler.delay_for('https://www.a.com/1') == 0.0
+    assert scheduler.delay_for('https://b.com/1') == 0.0
+    assert scheduler.delay_for('https://a.com/2') > 0
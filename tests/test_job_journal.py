@@ -0,0 +1,80 @@
+import time
+from dataclasses import dataclass
+
+from job_journal import DETAILED, DONE, QUEUED, JobJournal, open_journal
+from query_planner import SubQuery
+from viewport_search import Tile
+
+
+@dataclass
+class Business:
+    name: str
+    place_url: str
+
+
+def open_job(path, **kwargs):
+    return open_journal('plumbers', 'Texas', 500, 'postal/dom', path=str(path), **kwargs)
+
+
+def record_progress(journal):
+    first = SubQuery('plumbers', '75001, Texas', '75001')
+    tile = SubQuery('plumbers', '31.1,-100.1 z6', url='https://maps/@31.1,-100.1,6z',
+                    tile=Tile(25.8, -106.6, 36.5, -93.5))
+    second = SubQuery('plumbers', '75002, Texas', '75002')
+    journal.plan([first, tile, second])
+    journal.search_done(first, 40, [])
+    journal.place_queued('cid:1', {'name': 'Joe', 'href': 'https://maps/place/1'})
+    journal.place_queued('cid:2', {'name': 'Ann', 'href': 'https://maps/place/2'})
+    return tile, second
+
+
+def test_resume_picks_up_pending_work(tmp_path):
+    journal = open_job(tmp_path / 'journal.sqlite3')
+    tile, second = record_progress(journal)
+    journal.place_detailed('cid:2', Business('Ann', 'https://maps/place/2'))
+    journal.place_done(Business('Ann', 'https://maps/place/2'))
+    journal.close()
+
+    journal = open_job(tmp_path / 'journal.sqlite3')
+    assert journal.planned
+    assert journal.pending_sub_queries() == [tile, second]
+    assert [work['name'] for work in journal.places(QUEUED)] == ['Joe']
+    assert journal.places(DETAILED) == []
+    assert [fields['name'] for fields in journal.places(DONE)] == ['Ann']
+    assert sorted(journal.place_keys()) == ['cid:1', 'cid:2']
+
+
+def test_finished_jobs_start_over(tmp_path):
+    journal = open_job(tmp_path / 'journal.sqlite3')
+    record_progress(journal)
+    journal.finish()
+    journal.close()
+
+    journal = open_job(tmp_path / 'journal.sqlite3')
+    assert not journal.planned
+    assert journal.place_keys() == []
+    assert journal.resumable()
+
+
+def test_stale_jobs_start_over(tmp_path):
+    journal = open_job(tmp_path / 'journal.sqlite3')
+    record_progress(journal)
+    journal.close()
+    assert open_job(tmp_path / 'journal.sqlite3', ttl=3600).planned
+
+    # An hour on, the first run is too old to resume
+    started = time.time() - 3601
+    journal = JobJournal(journal.job, str(tmp_path / 'journal.sqlite3'))
+    journal.conn.execute("UPDATE jobs SET started_at = ?", (started,))
+    journal.conn.commit()
+    journal.close()
+    journal = open_job(tmp_path / 'journal.sqlite3', ttl=3600)
+    assert not journal.planned
+    assert journal.resumable(ttl=3600)
+
+
+def test_resume_false_starts_over(tmp_path):
+    journal = open_job(tmp_path / 'journal.sqlite3')
+    record_progress(journal)
+    journal.close()
+    assert not open_job(tmp_path / 'journal.sqlite3', resume=False).planned
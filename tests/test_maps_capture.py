@@ -0,0 +1,63 @@
+import base64
+import json
+import os
+
+from maps_capture import NetworkCapture, decode_payload
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'maps_search_payload.json')
+
+
+def read_fixture():
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_decode_search_payload():
+    records = decode_payload(read_fixture())
+    # The third result repeats the first
+    assert [record['name'] for record in records] == ["Joe's Plumbing", 'Capital City Drain & Sewer']
+    joes, drains = records
+    assert joes['address'] == '1200 E 6th St, Austin, TX 78702'
+    assert joes['url'] == 'https://joesplumbing.example/'
+    assert joes['phone_number'] == '(512) 555-0143'
+    assert (joes['reviews_average'], joes['reviews_count']) == (4.7, 312)
+    assert joes['categories'] == ['Plumber', 'Water heater installation service']
+    assert joes['place_url'] == f"https://www.google.com/maps?cid={0x5f2ad4e3c1b09a77}"
+    assert (joes['latitude'], joes['longitude']) == (30.2641, -97.7301)
+    # Without the one-line address the parts are joined
+    assert drains['address'] == '88 Rainey St, Austin, TX 78701'
+    assert drains['url'] is None and drains['phone_number'] is None
+
+
+def test_decode_garbage():
+    assert decode_payload('') == []
+    assert decode_payload(")]}'\nnot json") == []
+
+
+class FakeDriver:
+    def __init__(self, events, bodies):
+        self.events = events
+        self.bodies = bodies
+
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Network.getResponseBody':
+            return self.bodies[params['requestId']]
+        return {}
+
+    def get_log(self, kind):
+        events, self.events = self.events, []
+        return [{'message': json.dumps({'message': event})} for event in events]
+
+
+def test_poll_decodes_base64_bodies():
+    url = 'https://www.google.com/search?tbm=map&q=plumbers'
+    events = [
+        {'method': 'Network.responseReceived', 'params': {'requestId': '1', 'response': {'url': url}}},
+        {'method': 'Network.loadingFinished', 'params': {'requestId': '1'}},
+    ]
+    body = base64.b64encode(read_fixture().encode('utf-8')).decode('ascii')
+    driver = FakeDriver([], {'1': {'body': body, 'base64Encoded': True}})
+    capture = NetworkCapture(driver)
+    driver.events = events
+    assert len(capture.poll()) == 2
+    assert capture.payloads == 1
@@ -0,0 +1,47 @@
+import json
+import os
+
+from maps_dom import extract_cards, parse_card, place_key
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'maps_cards.json')
+
+
+def read_fixture():
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FakeDriver:
+    def __init__(self, cards):
+        self.cards = cards
+
+    def execute_script(self, script):
+        return self.cards
+
+
+def test_parse_card_normalizes_numbers():
+    joes, schmidt, drains, unrated = (parse_card(raw) for raw in read_fixture())
+    assert (joes['rating'], joes['reviews'], joes['category']) == (4.7, 1204, 'Plumber')
+    # Decimal commas and dotted thousands
+    assert (schmidt['rating'], schmidt['reviews']) == (4.5, 2317)
+    # Only the star icon's label to go on
+    assert (drains['rating'], drains['reviews']) == (4.2, 87)
+    assert (unrated['rating'], unrated['reviews'], unrated['href']) == (None, None, None)
+
+
+def test_place_key_uses_the_place_id():
+    joes, schmidt, drains, unrated = read_fixture()
+    assert place_key(joes['href']) == '0x8644b5a1c0ffee01:0x5f2ad4e3c1b09a77'
+    # Tracking parameters don't change it
+    assert place_key(joes['href'].split('?')[0] + '?hl=fr') == place_key(joes['href'])
+    assert place_key(schmidt['href']) != place_key(joes['href'])
+    # Without a place id the link is the key, minus its query string
+    assert place_key(drains['href']) == 'https://www.google.com/maps/place/Capital+City+Drain/@30.26,-97.74,17z'
+    assert place_key(unrated['href']) is None
+
+
+def test_extract_cards_reads_the_feed_in_one_call():
+    cards = extract_cards(FakeDriver(read_fixture()))
+    assert [card['name'] for card in cards] == \
+        ["Joe's Plumbing", 'Klempnerei Schmidt', 'Capital City Drain & Sewer', 'Brand New Plumbers']
+    assert extract_cards(FakeDriver(None)) == []
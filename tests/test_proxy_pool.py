@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+pytest.importorskip('requests')
+
+from proxy_pool import ProxyPool, is_ban, proxy_url
+
+
+def test_helpers():
+    assert proxy_url('1.2.3.4:8080') == 'http://1.2.3.4:8080'
+    assert proxy_url('socks5://1.2.3.4:1080') == 'socks5://1.2.3.4:1080'
+    assert is_ban(429)
+    assert is_ban(url='https://www.google.com/sorry/index?continue=x')
+    assert not is_ban(200, 'https://www.google.com/maps')
+
+
+def test_acquire_prefers_fast_proxies():
+    pool = ProxyPool([f'p{i}' for i in range(10)])
+    for i in range(10):
+        pool.report_success(f'p{i}', latency=i + 1)
+    assert {pool.acquire() for _ in range(50)} <= {'p0', 'p1', 'p2'}
+
+
+def test_consecutive_failures_bench_a_proxy():
+    pool = ProxyPool(['a', 'b'], failure_threshold=2)
+    pool.report_failure('a')
+    assert pool.stats['a'].open_until == 0.0
+    pool.report_failure('a')
+    assert pool.stats['a'].open_until > time.time()
+    assert {pool.acquire() for _ in range(20)} == {'b'}
+
+
+def test_bans_trip_at_once_with_a_doubling_cooldown():
+    pool = ProxyPool(['a'], cooldown=10)
+    pool.report_failure('a', banned=True)
+    first = pool.stats['a'].open_until - time.time()
+    pool.stats['a'].open_until = 0.0
+    pool.report_failure('a', banned=True)
+    second = pool.stats['a'].open_until - time.time()
+    assert first == pytest.approx(10, abs=1)
+    assert second == pytest.approx(20, abs=1)
+    assert pool.acquire() is None
+
+
+def test_health_file_benches_dead_proxies():
+    pool = ProxyPool(['a', 'b'], health={'a': {'ok': False}, 'b': {'ok': True, 'latency': 0.3}})
+    assert pool.acquire() == 'b'
+    assert pool.stats['b'].latency == 0.3
+
+
+def test_from_health_keeps_failed_proxies_benched():
+    pool = ProxyPool.from_health({'a': {'ok': False}, 'b': {'ok': True, 'latency': 0.3}})
+    assert set(pool.stats) == {'a', 'b'}
+    assert pool.available() == ['b']
+
+
+def test_half_open_proxies_are_benched_again_by_one_failure():
+    pool = ProxyPool(['a'], failure_threshold=3, cooldown=10)
+    for _ in range(3):
+        pool.report_failure('a')
+    assert pool.is_benched('a')
+    # Failures of requests already in flight while benched only count
+    pool.report_failure('a')
+    assert pool.stats['a'].trips == 1
+
+    pool.stats['a'].open_until = 0.0
+    pool.report_failure('a')
+    assert pool.is_benched('a') and pool.stats['a'].trips == 2
+
+    pool.stats['a'].open_until = 0.0
+    pool.report_success('a', latency=0.5)
+    pool.report_failure('a')
+    assert not pool.is_benched('a')
+
+
+def test_is_benched():
+    pool = ProxyPool(['a'])
+    assert not pool.is_benched('a')
+    pool.report_failure('a', banned=True)
+    assert pool.is_benched('a')
+    assert not pool.is_benched('unknown')
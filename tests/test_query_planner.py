@@ -0,0 +1,44 @@
+from query_planner import (
+    MAX_SEARCH_ATTEMPTS, PLAN_HEADROOM, RESULTS_PER_QUERY, PostalPlanner, SubQuery, load_postal_codes,
+    plan_queries, plan_shortfall,
+)
+
+
+def test_small_jobs_run_one_query():
+    assert plan_queries('plumbers', 'Texas', RESULTS_PER_QUERY) == [SubQuery('plumbers', 'Texas')]
+
+
+def test_large_jobs_split_by_postal_code():
+    sub_queries = plan_queries('plumbers', 'texas ', 500)
+    assert [sub_query.postal_code for sub_query in sub_queries] == load_postal_codes()['Texas']
+    assert sub_queries[0].text == f"plumbers in {sub_queries[0].postal_code}, Texas"
+
+
+def test_shortfall():
+    assert plan_shortfall([SubQuery('plumbers', 'Austin')], RESULTS_PER_QUERY) == 0
+    sub_queries = [SubQuery('plumbers', f"{code}, Texas", code) for code in ('75001', '75002')]
+    assert plan_shortfall(sub_queries, 60) == 0
+    assert plan_shortfall(sub_queries, 500) == 500 - 2 * RESULTS_PER_QUERY // PLAN_HEADROOM
+    # Five bundled zips cannot be expected to cover a state-wide job
+    assert plan_shortfall(plan_queries('plumbers', 'Texas', 500), 500) > 0
+    assert plan_shortfall(plan_queries('plumbers', 'Delaware', 500), 500) == 0
+
+
+def test_postal_planner_finishes_when_every_query_reports():
+    sub_queries = plan_queries('plumbers', 'Delaware', 500)
+    planner = PostalPlanner(sub_queries)
+    assert planner.initial() == sub_queries
+    for sub_query in sub_queries:
+        assert not planner.finished
+        assert planner.report(sub_query, 120) == []
+    assert planner.finished
+
+
+def test_failed_searches_are_retried_then_given_up():
+    sub_query = SubQuery('plumbers', '19901, Delaware', '19901')
+    planner = PostalPlanner([sub_query])
+    for _ in range(MAX_SEARCH_ATTEMPTS - 1):
+        assert planner.failed(sub_query) == [sub_query]
+        assert not planner.finished
+    assert planner.failed(sub_query) == []
+    assert planner.finished
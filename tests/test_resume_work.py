@@ -0,0 +1,47 @@
+from threading import Thread
+
+import pytest
+
+from job_journal import open_journal
+from query_planner import SubQuery
+
+app = pytest.importorskip('MultiThreadVersion')
+
+
+class FakePool:
+    """The pool calls parallel_process makes for a browser that never breaks"""
+
+    def is_healthy(self, driver):
+        return True
+
+    def record_use(self, driver):
+        return None
+
+
+def test_detail_workers_wait_for_resumed_places(tmp_path, monkeypatch):
+    path = str(tmp_path / 'journal.sqlite3')
+    journal = open_journal('plumbers', 'Texas', 10, 'postal/dom', path=path)
+    sub_query = SubQuery('plumbers', '75001, Texas', '75001')
+    journal.plan([sub_query])
+    journal.search_done(sub_query, 2, [])
+    journal.place_queued('cid:1', {'name': 'Joe', 'href': 'https://maps/place/1'})
+    journal.close()
+    monkeypatch.setattr(app, 'process_business',
+                        lambda driver, work: app.Business(name=work['name'], place_url=work['href']))
+
+    # Every sub-query was searched, so the job starts no search workers
+    journal = open_journal('plumbers', 'Texas', 10, 'postal/dom', path=path)
+    planner = app.PostalPlanner([sub_query])
+    queue = app.BusinessQueue(10)
+    app.start_job(queue, planner, journal)
+    assert app.search_worker_count(planner) == 0
+    queue.active_searches = 1
+    queue.is_searching = True
+    worker = Thread(target=app.parallel_process, args=(FakePool(), [object()], 0, queue, 0), daemon=True)
+    worker.start()
+
+    app.resume_work(queue, journal)
+    worker.join(timeout=10)
+    assert not worker.is_alive() and not queue.is_searching
+    assert queue.processed.get_nowait().name == 'Joe'
+    journal.close()
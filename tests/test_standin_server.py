@@ -0,0 +1,38 @@
+import re
+from urllib.parse import urljoin
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from enrichment_cache import domain_key
+from standin_server import StandinConfig, start_server
+
+
+@pytest.fixture(params=[True, False], ids=['spread', 'single'])
+def server(request):
+    server = start_server(StandinConfig(failure_rate=0, site_latency=0, spread_hosts=request.param))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_sites_have_distinct_hosts_by_default():
+    assert StandinConfig().spread_hosts
+    server = start_server(StandinConfig(failure_rate=0, site_latency=0))
+    try:
+        keys = {domain_key(server.site_url(site)) for site in range(5)}
+        assert len(keys) == 5
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_site_links_stay_on_the_site(server):
+    home = server.site_url(3)
+    response = requests.get(home, timeout=5)
+    assert response.status_code == 200
+    links = [urljoin(home, href) for href in re.findall(r'<nav>.*?</nav>', response.text)[0].split('"')[1::2]]
+    assert links and all(link.startswith(home) for link in links)
+    for link in links:
+        assert requests.get(link, timeout=5).status_code == 200
@@ -0,0 +1,75 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+from utils import get_proxy_health, probe_proxies
+
+TEST_URL = 'http://maps.test/'  # Plain http, so requests sends it to the proxy as an absolute-form GET
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """Stand-in proxy: answers every request itself and counts them"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def proxy():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+    server.requests = []
+    server.status = 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def address(server):
+    return '%s:%d' % server.server_address
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return '127.0.0.1:%d' % sock.getsockname()[1]
+
+
+def test_probe_proxies_records_health(proxy):
+    dead = closed_port()
+    health = probe_proxies([address(proxy), dead], test_url=TEST_URL, timeout=2)
+    assert proxy.requests == [TEST_URL]
+    assert health[address(proxy)]['ok'] and health[address(proxy)]['latency'] is not None
+    assert not health[dead]['ok'] and health[dead]['latency'] is None
+
+    proxy.status = 407
+    assert not probe_proxies([address(proxy)], test_url=TEST_URL, timeout=2)[address(proxy)]['ok']
+
+
+def test_get_proxy_health_reprobes_only_stale_entries(proxy, tmp_path):
+    health_file = str(tmp_path / 'proxy_health.json')
+    stale = {'ok': False, 'latency': None, 'checked_at': time.time() - 7200}
+    fresh = {'ok': True, 'latency': 0.2, 'checked_at': time.time()}
+    with open(health_file, 'w') as f:
+        json.dump({address(proxy): stale, 'fresh:1': fresh}, f)
+
+    health = get_proxy_health([address(proxy), 'fresh:1'], health_file=health_file, test_url=TEST_URL, timeout=2)
+    assert health[address(proxy)]['ok'] and health['fresh:1'] == fresh
+    assert len(proxy.requests) == 1
+    with open(health_file) as f:
+        assert json.load(f)[address(proxy)]['ok']
+
+    get_proxy_health([address(proxy), 'fresh:1'], health_file=health_file, test_url=TEST_URL, timeout=2)
+    assert len(proxy.requests) == 1
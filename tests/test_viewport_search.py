@@ -0,0 +1,97 @@
+import logging
+
+from job_journal import open_journal
+from query_planner import MAX_SEARCH_ATTEMPTS, RESULTS_PER_QUERY, SubQuery
+from viewport_search import REGION_BOUNDS, ViewportPlanner, simulate, synthetic_density
+
+BASE_URL = 'https://www.google.com/maps'
+
+
+def counter(points):
+    def listed_in(tile):
+        return min(RESULTS_PER_QUERY, sum(1 for lat, lng in points if tile.contains(lat, lng)))
+    return listed_in
+
+
+def test_saturated_tile_splits_into_quadrants():
+    planner = ViewportPlanner('plumbers', REGION_BOUNDS['Colorado'], BASE_URL)
+    root, = planner.initial()
+    quadrants = planner.report(root, RESULTS_PER_QUERY)
+    assert len(quadrants) == 4
+    assert {sub_query.tile.depth for sub_query in quadrants} == {1}
+    assert all(sub_query.tile.zoom > root.tile.zoom for sub_query in quadrants)
+    assert all(sub_query.url.startswith(f"{BASE_URL}/search/plumbers/@") for sub_query in quadrants)
+    assert not planner.finished
+    for sub_query in quadrants:
+        assert planner.report(sub_query, 10) == []
+    assert planner.finished
+    assert (planner.searches, planner.splits) == (5, 1)
+
+
+def test_tile_below_the_cap_is_settled():
+    planner = ViewportPlanner('plumbers', REGION_BOUNDS['Colorado'], BASE_URL)
+    root, = planner.initial()
+    assert planner.report(root, planner.saturated_at - 1) == []
+    assert planner.finished
+
+
+def test_synthetic_region_is_fully_covered():
+    bounds = REGION_BOUNDS['California']
+    points = synthetic_density(bounds, businesses=5000)
+    planner = ViewportPlanner('plumbers', bounds, BASE_URL)
+    searched = simulate(planner, counter(points))
+    covered = sum(listed for tile, listed in searched if listed < planner.saturated_at)
+    assert covered == len(points)
+    assert not planner.saturated_leaves
+    # Far fewer searches than a uniform grid at the deepest level reached
+    assert len(searched) < 4 ** max(tile.depth for tile, _ in searched) / 10
+
+
+def test_saturated_leaves_are_logged_and_fall_back(caplog):
+    bounds = REGION_BOUNDS['Colorado']
+    fallback = [SubQuery('plumbers', f"{code}, Colorado", code) for code in ('80202', '80203')]
+    planner = ViewportPlanner('plumbers', bounds, BASE_URL, max_depth=2, fallback=fallback)
+    # Everything in one spot keeps the tiles over it saturated down to max_depth
+    points = [(39.74, -104.99)] * 500
+    with caplog.at_level(logging.WARNING):
+        searched = simulate(planner, counter(points))
+    assert len(planner.saturated_leaves) == 1
+    assert planner.saturated_leaves[0].depth == 2
+    assert 'still saturated' in caplog.text
+    # The fallback searches are released once and then run like any other
+    assert [tile for tile, _ in searched].count(None) == len(fallback)
+    assert planner.finished
+
+
+def test_resume_does_not_release_the_fallback_twice(tmp_path):
+    bounds = REGION_BOUNDS['Colorado']
+    fallback = [SubQuery('plumbers', f"{code}, Colorado", code) for code in ('80202', '80203')]
+    planner = ViewportPlanner('plumbers', bounds, BASE_URL, max_depth=0, fallback=fallback)
+    journal = open_journal('plumbers', 'Colorado', 500, 'viewport/dom', path=str(tmp_path / 'journal.sqlite3'))
+    root, = planner.initial()
+    journal.plan([root])
+    released = planner.report(root, RESULTS_PER_QUERY)
+    assert released == fallback
+    journal.search_done(root, RESULTS_PER_QUERY, released)
+    journal.search_done(fallback[0], 10, [])
+
+    # A second leaf saturating after the restart must not queue the postal codes again
+    resumed = ViewportPlanner('plumbers', bounds, BASE_URL, max_depth=0, fallback=fallback)
+    assert resumed.resume(journal.pending_sub_queries(), journal.sub_queries()) == [fallback[1]]
+    assert resumed.fallback == []
+    assert resumed.report(root, RESULTS_PER_QUERY) == []
+
+    fresh = ViewportPlanner('plumbers', bounds, BASE_URL, max_depth=0, fallback=fallback)
+    assert fresh.resume([root], [root]) == [root]
+    assert fresh.fallback == fallback
+    journal.close()
+
+
+def test_failed_tile_is_retried_then_given_up():
+    planner = ViewportPlanner('plumbers', REGION_BOUNDS['Colorado'], BASE_URL)
+    root, = planner.initial()
+    for _ in range(MAX_SEARCH_ATTEMPTS - 1):
+        assert planner.failed(root) == [root]
+        assert not planner.finished
+    assert planner.failed(root) == []
+    assert planner.finished
@@ -1,9 +1,39 @@
+import json
+import os
 import random
+import time
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-def get_proxies():
-    with open('proxies.txt', 'r') as f:
+# Shared list of browser user agents
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.190 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.141 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.3 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/86.0.4240.198 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.2 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/84.0.4147.135 Safari/537.36',
+]
+
+
+PROXY_TEST_URL = "https://www.google.com"
+PROXY_TIMEOUT = 5  # Seconds before a proxy counts as dead
+PROXY_HEALTH_FILE = 'proxy_health.json'
+PROXY_HEALTH_MAX_AGE = 3600  # Seconds before a proxy is probed again
+PROXY_PROBE_WORKERS = 32
+
+def get_proxies(path='proxies.txt'):
+    with open(path, 'r') as f:
         return [line.strip() for line in f if line.strip()]
 
 def get_random_proxy(proxies=None):
@@ -11,15 +41,65 @@ def get_random_proxy(proxies=None):
         proxies = get_working_proxies()
     return random.choice(proxies) if proxies else None
 
-def test_proxy(proxy):
+def probe_proxy(proxy, test_url=PROXY_TEST_URL, timeout=PROXY_TIMEOUT):
+    """Probe one proxy and return its health record"""
+    start = time.time()
     try:
-        response = requests.get("https://www.google.com", proxies={"http": proxy, "https": proxy}, timeout=5)
-        return response.status_code == 200
-    except:
-        return False
-
-def get_working_proxies():
-    all_proxies = get_proxies()
-    working_proxies = [proxy for proxy in all_proxies if test_proxy(proxy)]
-    logging.info("Found {} working proxies out of {}".format(len(working_proxies), len(all_proxies)))
+        response = requests.get(test_url, proxies={"http": proxy, "https": proxy}, timeout=timeout)
+        ok = response.status_code == 200
+    except Exception:
+        ok = False
+    return {
+        'ok': ok,
+        'latency': round(time.time() - start, 3) if ok else None,
+        'checked_at': time.time(),
+    }
+
+def test_proxy(proxy, test_url=PROXY_TEST_URL, timeout=PROXY_TIMEOUT):
+    return probe_proxy(proxy, test_url, timeout)['ok']
+
+def probe_proxies(proxies, test_url=PROXY_TEST_URL, timeout=PROXY_TIMEOUT, max_workers=PROXY_PROBE_WORKERS):
+    """Probe proxies concurrently, returning {proxy: health record}"""
+    if not proxies:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(proxies))) as executor:
+        records = executor.map(lambda proxy: probe_proxy(proxy, test_url, timeout), proxies)
+        return dict(zip(proxies, records))
+
+def load_proxy_health(path=PROXY_HEALTH_FILE):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_proxy_health(health, path=PROXY_HEALTH_FILE):
+    # Write to a temp file first so a crash never leaves a half-written cache
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(health, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def get_proxy_health(proxies=None, health_file=PROXY_HEALTH_FILE, max_age=PROXY_HEALTH_MAX_AGE,
+                     test_url=PROXY_TEST_URL, timeout=PROXY_TIMEOUT):
+    """Health records for every proxy, re-probing only missing or stale entries"""
+    if proxies is None:
+        proxies = get_proxies()
+    health = load_proxy_health(health_file)
+    now = time.time()
+    stale = [proxy for proxy in proxies
+             if proxy not in health or now - health[proxy].get('checked_at', 0) > max_age]
+    if stale:
+        logging.info("Probing {} of {} proxies".format(len(stale), len(proxies)))
+        health.update(probe_proxies(stale, test_url, timeout))
+        save_proxy_health(health, health_file)
+    return {proxy: health[proxy] for proxy in proxies}
+
+def get_working_proxies(proxies=None, health_file=PROXY_HEALTH_FILE, max_age=PROXY_HEALTH_MAX_AGE,
+                        test_url=PROXY_TEST_URL, timeout=PROXY_TIMEOUT):
+    """Working proxies, fastest first"""
+    health = get_proxy_health(proxies, health_file, max_age, test_url, timeout)
+    working_proxies = sorted((proxy for proxy, record in health.items() if record['ok']),
+                             key=lambda proxy: health[proxy]['latency'])
+    logging.info("Found {} working proxies out of {}".format(len(working_proxies), len(health)))
     return working_proxies
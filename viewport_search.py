@@ -0,0 +1,304 @@
+"""Cover a region with Maps searches by splitting only saturated map tiles.
+
+A search URL of the form /maps/search/<term>/@lat,lng,zoomz returns the
+results for that viewport, up to Maps' cap of about 120. ViewportPlanner
+starts with the region's bounding box as one tile and, whenever a tile's
+result list comes back saturated, queues its four quadrants at a closer
+zoom. Sparse countryside is settled by a single wide search while dense
+downtowns keep being split, so a state needs far fewer searches than one
+per zip code.
+
+The planner is pure logic: feed it result counts with ``report`` and it
+hands out the next tiles. ``simulate`` drives it against any density
+function, which is what the demo does:
+    python viewport_search.py Colorado
+"""
+import logging
+import math
+import random
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from query_planner import MAX_SEARCH_ATTEMPTS, RESULTS_PER_QUERY, SubQuery
+
+SATURATION_RATIO = 0.9  # A tile listing this share of the cap is assumed to have been cut off
+MAX_DEPTH = 10  # Quadrant splits below the region's box; depth 10 tiles are ~1/1000 of its width
+MAX_ZOOM = 18
+MIN_ZOOM = 3
+VIEWPORT_PX = (960, 900)  # Map area next to the results panel in a 1366x900 window
+
+# (south, west, north, east) of every location in the picker
+REGION_BOUNDS: Dict[str, Tuple[float, float, float, float]] = {
+    'Alabama': (30.14, -88.47, 35.01, -84.89),
+    'Alaska': (51.21, -179.15, 71.39, -129.98),
+    'Arizona': (31.33, -114.82, 37.00, -109.04),
+    'Arkansas': (33.00, -94.62, 36.50, -89.64),
+    'California': (32.53, -124.41, 42.01, -114.13),
+    'Colorado': (36.99, -109.06, 41.00, -102.04),
+    'Connecticut': (40.98, -73.73, 42.05, -71.79),
+    'Delaware': (38.45, -75.79, 39.84, -75.05),
+    'Florida': (24.40, -87.63, 31.00, -80.03),
+    'Georgia': (30.36, -85.61, 35.00, -80.84),
+    'Hawaii': (18.91, -160.25, 22.24, -154.81),
+    'Idaho': (41.99, -117.24, 49.00, -111.04),
+    'Illinois': (36.97, -91.51, 42.51, -87.50),
+    'Indiana': (37.77, -88.10, 41.76, -84.78),
+    'Iowa': (40.38, -96.64, 43.50, -90.14),
+    'Kansas': (36.99, -102.05, 40.00, -94.59),
+    'Kentucky': (36.50, -89.57, 39.15, -81.96),
+    'Louisiana': (28.93, -94.04, 33.02, -88.82),
+    'Maine': (43.06, -71.08, 47.46, -66.95),
+    'Maryland': (37.91, -79.49, 39.72, -75.05),
+    'Massachusetts': (41.24, -73.51, 42.89, -69.93),
+    'Michigan': (41.70, -90.42, 48.31, -82.41),
+    'Minnesota': (43.50, -97.24, 49.38, -89.49),
+    'Mississippi': (30.17, -91.66, 35.00, -88.10),
+    'Missouri': (35.99, -95.77, 40.61, -89.10),
+    'Montana': (44.36, -116.05, 49.00, -104.04),
+    'Nebraska': (40.00, -104.05, 43.00, -95.31),
+    'Nevada': (35.00, -120.01, 42.00, -114.04),
+    'New Hampshire': (42.70, -72.56, 45.31, -70.61),
+    'New Jersey': (38.93, -75.56, 41.36, -73.89),
+    'New Mexico': (31.33, -109.05, 37.00, -103.00),
+    'New York': (40.50, -79.76, 45.02, -71.86),
+    'North Carolina': (33.84, -84.32, 36.59, -75.46),
+    'North Dakota': (45.94, -104.05, 49.00, -96.55),
+    'Ohio': (38.40, -84.82, 41.98, -80.52),
+    'Oklahoma': (33.62, -103.00, 37.00, -94.43),
+    'Oregon': (41.99, -124.57, 46.29, -116.46),
+    'Pennsylvania': (39.72, -80.52, 42.27, -74.69),
+    'Rhode Island': (41.15, -71.86, 42.02, -71.12),
+    'South Carolina': (32.03, -83.35, 35.22, -78.54),
+    'South Dakota': (42.48, -104.06, 45.95, -96.44),
+    'Tennessee': (34.98, -90.31, 36.68, -81.65),
+    'Texas': (25.84, -106.65, 36.50, -93.51),
+    'Utah': (37.00, -114.05, 42.00, -109.04),
+    'Vermont': (42.73, -73.44, 45.02, -71.46),
+    'Virginia': (36.54, -83.68, 39.47, -75.24),
+    'Washington': (45.54, -124.85, 49.00, -116.92),
+    'West Virginia': (37.20, -82.64, 40.64, -77.72),
+    'Wisconsin': (42.49, -92.89, 47.31, -86.25),
+    'Wyoming': (40.99, -111.06, 45.01, -104.05),
+    'Alberta': (48.99, -120.00, 60.00, -110.00),
+    'British Columbia': (48.30, -139.06, 60.00, -114.03),
+    'Manitoba': (48.99, -102.03, 60.00, -88.94),
+    'New Brunswick': (44.60, -69.06, 48.07, -63.77),
+    'Newfoundland and Labrador': (46.61, -67.80, 60.38, -52.62),
+    'Northwest Territories': (60.00, -136.45, 78.76, -101.98),
+    'Nova Scotia': (43.42, -66.33, 47.03, -59.69),
+    'Nunavut': (51.64, -120.68, 83.11, -61.08),
+    'Ontario': (41.68, -95.16, 56.86, -74.32),
+    'Prince Edward Island': (45.95, -64.42, 47.06, -61.97),
+    'Quebec': (44.99, -79.76, 62.59, -57.10),
+    'Saskatchewan': (48.99, -110.00, 60.00, -101.36),
+    'Yukon': (60.00, -141.00, 69.65, -123.82),
+}
+
+
+def _mercator_y(lat):
+    lat = max(min(lat, 85.0), -85.0)
+    return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+
+@dataclass(frozen=True)
+class Tile:
+    south: float
+    west: float
+    north: float
+    east: float
+    depth: int = 0
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def zoom(self) -> int:
+        """Closest Maps zoom level at which the whole tile fits in the viewport"""
+        width, height = VIEWPORT_PX
+        zoom_x = math.log2(360 * width / (256 * (self.east - self.west)))
+        # Vertical extent in Mercator units; a zoom-0 world is 2*pi units tall
+        zoom_y = math.log2(2 * math.pi * height / (256 * (_mercator_y(self.north) - _mercator_y(self.south))))
+        return max(MIN_ZOOM, min(MAX_ZOOM, math.floor(min(zoom_x, zoom_y))))
+
+    def split(self) -> List['Tile']:
+        lat, lng = self.center
+        depth = self.depth + 1
+        return [
+            Tile(lat, self.west, self.north, lng, depth),
+            Tile(lat, lng, self.north, self.east, depth),
+            Tile(self.south, self.west, lat, lng, depth),
+            Tile(self.south, lng, lat, self.east, depth),
+        ]
+
+    def contains(self, lat, lng):
+        return self.south <= lat < self.north and self.west <= lng < self.east
+
+    def url(self, base_url, term):
+        lat, lng = self.center
+        return f"{base_url}/search/{quote(term)}/@{lat:.6f},{lng:.6f},{self.zoom}z"
+
+
+def region_bounds(location) -> Optional[Tuple[float, float, float, float]]:
+    regions = {region.lower(): bounds for region, bounds in REGION_BOUNDS.items()}
+    return regions.get(location.strip().lower())
+
+
+class ViewportPlanner:
+    """Quadtree of map tiles for one search term, split where results saturate.
+
+    ``initial`` returns the first sub-queries; each finished search is fed
+    back through ``report`` with the number of results it listed, which
+    returns the follow-up sub-queries (the tile's quadrants, or nothing).
+    A failed search goes through ``failed`` instead, which hands the tile
+    back for another try until MAX_SEARCH_ATTEMPTS. The plan is
+    ``finished`` once every issued tile has been reported, or given up on,
+    and none needed splitting. Thread-safe.
+
+    A tile still saturated at ``max_depth`` or MAX_ZOOM cannot be split,
+    so some of its results are out of reach. It is logged and kept in
+    ``saturated_leaves``, and the first one releases the ``fallback``
+    sub-queries (e.g. the region's postal code searches).
+    """
+
+    def __init__(self, term, bounds, base_url, cap=RESULTS_PER_QUERY,
+                 saturation=SATURATION_RATIO, max_depth=MAX_DEPTH, fallback=None):
+        self.term = term
+        self.root = Tile(*bounds)
+        self.base_url = base_url
+        self.saturated_at = int(cap * saturation)
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.outstanding = 0
+        self.searches = 0
+        self.splits = 0
+        self.attempts: Dict[SubQuery, int] = {}
+        self.fallback: List[SubQuery] = list(fallback or [])
+        self.saturated_leaves: List[Tile] = []
+
+    def _sub_query(self, tile):
+        lat, lng = tile.center
+        return SubQuery(self.term, f"{lat:.4f},{lng:.4f} z{tile.zoom}",
+                        url=tile.url(self.base_url, self.term), tile=tile)
+
+    def _issue(self, sub_queries):
+        # Callers hold the lock, so outstanding never dips to zero between a report and its follow-ups
+        self.outstanding += len(sub_queries)
+        self.searches += len(sub_queries)
+        return sub_queries
+
+    def initial(self) -> List[SubQuery]:
+        with self.lock:
+            return self._issue([self._sub_query(self.root)])
+
+    def resume(self, pending: List[SubQuery], planned: Iterable[SubQuery] = ()) -> List[SubQuery]:
+        """Pick up a journaled plan: ``pending`` are the tiles issued but never reported.
+
+        ``planned`` is every sub-query the plan ever issued; if the fallback
+        is among them it was already released and is not handed out again.
+        """
+        planned = set(planned)
+        with self.lock:
+            if any(sub_query in planned for sub_query in self.fallback):
+                self.fallback = []
+            self.outstanding = len(pending)
+            self.searches += len(pending)
+            return list(pending)
+
+    def report(self, sub_query, listed) -> List[SubQuery]:
+        """Record how many results a tile listed; returns its quadrants if it was saturated"""
+        tile = sub_query.tile
+        with self.lock:
+            self.outstanding -= 1
+            # Fallback searches have no tile to split
+            if tile is None or listed < self.saturated_at:
+                return []
+            if tile.depth >= self.max_depth or tile.zoom >= MAX_ZOOM:
+                self.saturated_leaves.append(tile)
+                logging.warning(f"Tile {sub_query.location} still saturated at depth {tile.depth}, "
+                                f"zoom {tile.zoom}; {len(self.fallback)} fallback searches queued")
+                fallback, self.fallback = self.fallback, []
+                return self._issue(fallback)
+            self.splits += 1
+            return self._issue([self._sub_query(quadrant) for quadrant in tile.split()])
+
+    def failed(self, sub_query) -> List[SubQuery]:
+        """Record a search that failed; returns it to be retried, or nothing once it is given up on"""
+        with self.lock:
+            self.attempts[sub_query] = self.attempts.get(sub_query, 0) + 1
+            if self.attempts[sub_query] < MAX_SEARCH_ATTEMPTS:
+                return [sub_query]
+            self.outstanding -= 1
+            return []
+
+    @property
+    def finished(self):
+        return self.outstanding <= 0
+
+
+def simulate(planner, listed_in: Callable[[Tile], int]) -> List[Tuple[Tile, int]]:
+    """Run a plan to the end against ``listed_in(tile)``, breadth first; returns (tile, listed) per search.
+
+    Fallback sub-queries have no tile and are taken to list nothing.
+    """
+    searched = []
+    pending = planner.initial()
+    while pending:
+        sub_query = pending.pop(0)
+        listed = listed_in(sub_query.tile) if sub_query.tile is not None else 0
+        searched.append((sub_query.tile, listed))
+        pending.extend(planner.report(sub_query, listed))
+    return searched
+
+
+def synthetic_density(bounds, cities=12, businesses=20000, rural_share=0.1, seed=1) -> List[Tuple[float, float]]:
+    """Business locations clustered around random cities, with a thin rural spread"""
+    rng = random.Random(seed)
+    south, west, north, east = bounds
+    centers = [(rng.uniform(south, north), rng.uniform(west, east), rng.uniform(0.02, 0.3))
+               for _ in range(cities)]
+    weights = [rng.paretovariate(1.2) for _ in centers]
+    points = []
+    for _ in range(businesses):
+        if rng.random() < rural_share:
+            points.append((rng.uniform(south, north), rng.uniform(west, east)))
+        else:
+            lat, lng, spread = rng.choices(centers, weights)[0]
+            # Redraw rather than clamp: clamped points pile up on the border, denser than any zoom can split
+            while True:
+                point = rng.gauss(lat, spread), rng.gauss(lng, spread)
+                if south <= point[0] < north and west <= point[1] < east:
+                    break
+            points.append(point)
+    return points
+
+
+def main():
+    location = ' '.join(sys.argv[1:]) or 'Colorado'
+    bounds = region_bounds(location)
+    if bounds is None:
+        sys.exit(f"No bounds for {location}")
+    points = synthetic_density(bounds)
+    planner = ViewportPlanner('plumbers', bounds, 'https://www.google.com/maps')
+
+    def listed_in(tile):
+        return min(RESULTS_PER_QUERY, sum(1 for lat, lng in points if tile.contains(lat, lng)))
+
+    searched = simulate(planner, listed_in)
+    # Leaf tiles under the cap listed everything inside them
+    covered = sum(listed for tile, listed in searched if listed < planner.saturated_at)
+    print(f"{location}: {len(points)} synthetic businesses")
+    deepest = max(tile.depth for tile, _ in searched)
+    print(f"{planner.searches} searches, {planner.splits} splits, deepest tile {deepest} "
+          f"(a uniform grid that fine would take {4 ** deepest} searches)")
+    print(f"{covered} businesses in unsaturated tiles ({covered / len(points):.0%}), "
+          f"{covered / planner.searches:.1f} per search")
+    if planner.saturated_leaves:
+        print(f"{len(planner.saturated_leaves)} tiles still saturated at the deepest split")
+
+
+if __name__ == '__main__':
+    main()